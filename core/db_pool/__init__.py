@@ -0,0 +1,15 @@
+"""
+PostgreSQL backend with a per-process connection pool (psycopg2)
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.db_pool',
+            ...
+            'CONN_MAX_AGE': 0,
+            'POOL': {'MAX_SIZE': 4, 'MAX_AGE': 600, 'PRE_PING': True, 'TIMEOUT': 5},
+        }
+    }
+
+Django still "closes" the connection at the end of every request; the backend
+hands it back to the pool instead. See core.db_pool.pool for the options.
+"""
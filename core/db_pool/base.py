@@ -0,0 +1,37 @@
+"""
+Django database backend: django.db.backends.postgresql with pooled connections
+"""
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+
+from core.db_pool.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def connection_pool(self):
+        # The _nodb connection (used to create the test database) is never pooled
+        if self.alias == NO_DB_ALIAS or is_psycopg3:
+            return None
+        return get_pool(self.alias, self.settings_dict.get('POOL'))
+
+    def get_new_connection(self, conn_params):
+        pool = self.connection_pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        connection = pool.checkout(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        # super() sets this only for brand-new connections
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = IsolationLevel(isolation_level) if isolation_level is not None else IsolationLevel.READ_COMMITTED
+        return connection
+
+    def _close(self):
+        pool = self.connection_pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        connection, self.connection = self.connection, None
+        with self.wrap_database_errors:
+            pool.checkin(connection)
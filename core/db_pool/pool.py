@@ -0,0 +1,271 @@
+"""
+Per-process pool of psycopg2 connections
+
+One pool per database alias and worker process. Connections are reused until
+MAX_AGE, checked with a `SELECT 1` before being handed out (PRE_PING) and
+never shared across fork(): the parent closes its idle connections before
+forking and the child forgets the inherited ones without touching their
+sockets.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+DEFAULTS = {
+    'MAX_SIZE': 4,        # connections per process (idle + in use)
+    'MAX_AGE': 600,       # seconds before a connection is replaced
+    'MAX_IDLE': 300,      # seconds an idle connection is kept
+    'PRE_PING': True,     # SELECT 1 before handing out a reused connection
+    'TIMEOUT': 5,         # seconds to wait for a free connection
+}
+
+STAT_COUNTERS = ('checkouts', 'connects', 'reuses', 'waits', 'timeouts', 'reconnects', 'expired', 'discarded')
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Every connection of the pool is in use and none was returned in time"""
+
+
+class ConnectionPool:
+    def __init__(self, alias, options=None):
+        self.alias = alias
+        self.options = dict(DEFAULTS, **(options or {}))
+        self.condition = threading.Condition()
+        self.pid = os.getpid()
+        self.idle = deque()        # (connection, created_at, returned_at)
+        self.created = {}          # id(connection) -> (connection, created_at), every open connection
+        self.stats_counters = dict.fromkeys(STAT_COUNTERS, 0)
+        self.wait_time = 0.0
+
+    # -- checkout / checkin --------------------------------------------------
+
+    def checkout(self, connect):
+        """Return a healthy connection; `connect()` opens a new one"""
+        self._check_pid()
+        deadline = None
+        with self.condition:
+            self.stats_counters['checkouts'] += 1
+        while True:
+            connection = placeholder = None
+            discarded = []
+            try:
+                with self.condition:
+                    while True:
+                        connection = self._pop_idle(discarded)
+                        if connection is not None:
+                            break
+                        if len(self.created) < self.options['MAX_SIZE']:
+                            # Reserve the slot, connect outside the lock
+                            placeholder = object()
+                            self.created[id(placeholder)] = (None, None)
+                            break
+
+                        if deadline is None:
+                            self.stats_counters['waits'] += 1
+                            wait_started = time.monotonic()
+                            deadline = wait_started + self.options['TIMEOUT']
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.stats_counters['timeouts'] += 1
+                            self.wait_time += time.monotonic() - wait_started
+                            raise PoolTimeout(
+                                f"No free database connection for '{self.alias}' within {self.options['TIMEOUT']}s "
+                                f"(pool size {self.options['MAX_SIZE']})"
+                            )
+                        self.condition.wait(remaining)
+            finally:
+                for stale in discarded:
+                    self._close(stale)
+
+            if connection is None:
+                break
+            # Outside the lock: a slow or hung server only holds up this checkout
+            if not self.options['PRE_PING'] or self._ping(connection):
+                with self.condition:
+                    self.stats_counters['reuses'] += 1
+                return connection
+            with self.condition:
+                self.created.pop(id(connection), None)
+                self.stats_counters['reconnects'] += 1
+                self.condition.notify()
+            self._close(connection)
+
+        if deadline is not None:
+            with self.condition:
+                self.wait_time += time.monotonic() - wait_started
+        try:
+            connection = connect()
+        except Exception:
+            with self.condition:
+                del self.created[id(placeholder)]
+                self.condition.notify()
+            raise
+        with self.condition:
+            del self.created[id(placeholder)]
+            self.created[id(connection)] = (connection, time.monotonic())
+            self.stats_counters['connects'] += 1
+        return connection
+
+    def checkin(self, connection):
+        """Give a connection back; it is rolled back or closed if it is not clean"""
+        self._check_pid()
+        if any(connection is inherited for inherited in _inherited):
+            # Opened by the parent before fork: its socket belongs to the parent
+            return
+        now = time.monotonic()
+        with self.condition:
+            _, created_at = self.created.get(id(connection), (None, None))
+        if created_at is None:
+            # Not from this pool
+            self._close(connection)
+            return
+
+        reusable = self._reset(connection) and now - created_at < self.options['MAX_AGE']
+        with self.condition:
+            if reusable:
+                self.idle.append((connection, created_at, now))
+            else:
+                self.created.pop(id(connection), None)
+                self.stats_counters['discarded'] += 1
+            self.condition.notify()
+        if not reusable:
+            self._close(connection)
+
+    def _pop_idle(self, discarded):
+        """
+        Most recently used idle connection that is neither expired nor closed
+        (called with the lock held). The ones dropped on the way are removed
+        from the pool and added to `discarded`, for the caller to close
+        outside the lock; the pre-ping is the caller's too.
+        """
+        now = time.monotonic()
+        while self.idle:
+            connection, created_at, returned_at = self.idle.pop()
+            if now - created_at >= self.options['MAX_AGE'] or now - returned_at >= self.options['MAX_IDLE']:
+                self.stats_counters['expired'] += 1
+            elif connection.closed:
+                self.stats_counters['reconnects'] += 1
+            else:
+                return connection
+            self.created.pop(id(connection), None)
+            discarded.append(connection)
+        return None
+
+    # -- connection helpers ---------------------------------------------------
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @staticmethod
+    def _reset(connection):
+        """Leave the connection idle outside a transaction, or report it unusable"""
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_INERROR):
+            try:
+                connection.rollback()
+                return True
+            except psycopg2.Error:
+                return False
+        # ACTIVE (a query still running) or UNKNOWN (broken socket)
+        return False
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    # -- fork handling ----------------------------------------------------------
+
+    def close_idle(self):
+        """Close every idle connection (before fork, at shutdown)"""
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+            for connection, _, _ in idle:
+                self.created.pop(id(connection), None)
+        for connection, _, _ in idle:
+            self._close(connection)
+
+    def forget_inherited(self):
+        """
+        In a forked child: start empty. The inherited connections are kept
+        referenced forever, because closing them (even by garbage collection)
+        would terminate the parent's sessions.
+        """
+        _inherited.extend(connection for connection, _ in self.created.values() if connection is not None)
+        self.idle = deque()
+        self.created = {}
+        self.condition = threading.Condition()
+        self.stats_counters = dict.fromkeys(STAT_COUNTERS, 0)
+        self.wait_time = 0.0
+        self.pid = os.getpid()
+
+    def _check_pid(self):
+        if os.getpid() != self.pid:
+            self.forget_inherited()
+
+    # -- metrics ---------------------------------------------------------------
+
+    def stats(self):
+        with self.condition:
+            open_connections = len(self.created)
+            idle = len(self.idle)
+            stats = dict(self.stats_counters)
+        stats.update({
+            'alias': self.alias,
+            'pid': self.pid,
+            'max_size': self.options['MAX_SIZE'],
+            'open': open_connections,
+            'idle': idle,
+            'in_use': open_connections - idle,
+            'wait_time': round(self.wait_time, 4),
+        })
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_inherited = []
+
+
+def get_pool(alias, options=None):
+    pool = _pools.get(alias)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(alias, ConnectionPool(alias, options))
+    return pool
+
+
+def all_stats():
+    """Stats of every pool in this process"""
+    return [pool.stats() for pool in list(_pools.values())]
+
+
+def _before_fork():
+    for pool in list(_pools.values()):
+        pool.close_idle()
+
+
+def _after_fork_in_child():
+    for pool in list(_pools.values()):
+        pool.forget_inherited()
+
+
+os.register_at_fork(before=_before_fork, after_in_child=_after_fork_in_child)
@@ -0,0 +1,226 @@
+"""
+Tests of the connection pool against a real PostgreSQL
+
+They need a server: DB_POOL_TEST_DSN (e.g. 'postgresql://postgres@localhost/postgres'),
+or the pgserver package, which starts a throwaway one. Without either they
+are skipped. The pool does not use Django, so plain unittest runs them:
+
+    python -m unittest core.db_pool.tests
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+try:
+    import psycopg2
+except ImportError:  # pragma: no cover
+    psycopg2 = None
+
+if psycopg2 is not None:
+    from core.db_pool import pool as db_pool
+
+DSN = os.environ.get('DB_POOL_TEST_DSN')
+_server = None
+_pgdata = None
+
+
+def setUpModule():
+    global DSN, _server, _pgdata
+    if psycopg2 is None:
+        raise unittest.SkipTest('psycopg2 is not installed')
+    if not DSN:
+        try:
+            import pgserver
+        except ImportError:
+            raise unittest.SkipTest('No PostgreSQL: set DB_POOL_TEST_DSN or install pgserver')
+        _pgdata = tempfile.mkdtemp(prefix='db_pool_tests_')
+        _server = pgserver.get_server(_pgdata, cleanup_mode='stop')
+        DSN = _server.get_uri()
+    try:
+        psycopg2.connect(DSN).close()
+    except psycopg2.Error as e:
+        raise unittest.SkipTest(f'PostgreSQL is not reachable: {e}')
+
+
+def tearDownModule():
+    if _server is not None:
+        _server.cleanup()
+    if _pgdata is not None:
+        shutil.rmtree(_pgdata, ignore_errors=True)
+
+
+def backend_pid(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        return cursor.fetchone()[0]
+
+
+class PoolTestCase(unittest.TestCase):
+    options = {}
+
+    def setUp(self):
+        self.pool = db_pool.ConnectionPool('test', dict(self.options))
+        self.addCleanup(self.close_all)
+
+    def close_all(self):
+        for connection, _ in list(self.pool.created.values()):
+            if connection is not None:
+                connection.close()
+
+    def connect(self):
+        return psycopg2.connect(DSN)
+
+    def terminate(self, pid):
+        admin = psycopg2.connect(DSN)
+        try:
+            admin.autocommit = True
+            with admin.cursor() as cursor:
+                cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+        finally:
+            admin.close()
+
+
+class CheckoutTests(PoolTestCase):
+    options = {'MAX_SIZE': 2, 'TIMEOUT': 0.2}
+
+    def test_checkin_makes_the_connection_reusable(self):
+        connection = self.pool.checkout(self.connect)
+        self.pool.checkin(connection)
+        self.assertIs(self.pool.checkout(self.connect), connection)
+        stats = self.pool.stats()
+        self.assertEqual((stats['connects'], stats['reuses'], stats['in_use']), (1, 1, 1))
+
+    def test_checkin_rolls_back_an_open_transaction(self):
+        connection = self.pool.checkout(self.connect)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertEqual(connection.get_transaction_status(), psycopg2.extensions.TRANSACTION_STATUS_INTRANS)
+        self.pool.checkin(connection)
+        self.assertEqual(connection.get_transaction_status(), psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+        self.assertEqual(self.pool.stats()['idle'], 1)
+
+    def test_exhausted_pool_times_out(self):
+        self.pool.checkout(self.connect)
+        self.pool.checkout(self.connect)
+        with self.assertRaises(db_pool.PoolTimeout):
+            self.pool.checkout(self.connect)
+        self.assertEqual(self.pool.stats()['timeouts'], 1)
+
+    def test_waiting_checkout_gets_a_returned_connection(self):
+        first = self.pool.checkout(self.connect)
+        self.pool.checkout(self.connect)
+        timer = threading.Timer(0.05, self.pool.checkin, [first])
+        timer.start()
+        self.addCleanup(timer.join)
+        self.assertIs(self.pool.checkout(self.connect), first)
+        self.assertEqual(self.pool.stats()['waits'], 1)
+
+
+class PrePingTests(PoolTestCase):
+    options = {'MAX_SIZE': 2, 'PRE_PING': True}
+
+    def test_dead_connection_is_replaced(self):
+        connection = self.pool.checkout(self.connect)
+        pid = backend_pid(connection)
+        self.pool.checkin(connection)
+        self.terminate(pid)
+
+        replacement = self.pool.checkout(self.connect)
+        self.assertIsNot(replacement, connection)
+        self.assertNotEqual(backend_pid(replacement), pid)
+        self.assertTrue(connection.closed)
+        stats = self.pool.stats()
+        self.assertEqual((stats['reconnects'], stats['connects'], stats['open']), (1, 2, 1))
+
+    def test_ping_does_not_hold_the_lock(self):
+        self.pool.checkin(self.pool.checkout(self.connect))
+        pinging = threading.Event()
+        release = threading.Event()
+        ping = db_pool.ConnectionPool._ping
+
+        def slow_ping(connection):
+            pinging.set()
+            release.wait(5)
+            return ping(connection)
+
+        with mock.patch.object(self.pool, '_ping', side_effect=slow_ping):
+            thread = threading.Thread(target=self.pool.checkout, args=(self.connect,))
+            thread.start()
+            self.assertTrue(pinging.wait(5))
+            # The idle connection is being pinged; another checkout opens a new one meanwhile
+            started = time.monotonic()
+            other = self.pool.checkout(self.connect)
+            self.assertLess(time.monotonic() - started, 1)
+            release.set()
+            thread.join()
+        self.assertEqual(self.pool.stats()['open'], 2)
+        self.pool.checkin(other)
+
+
+class RecyclingTests(PoolTestCase):
+
+    def test_connection_older_than_max_age_is_replaced(self):
+        self.pool.options.update(MAX_AGE=0.1, MAX_IDLE=60)
+        connection = self.pool.checkout(self.connect)
+        self.pool.checkin(connection)
+        time.sleep(0.15)
+        self.assertIsNot(self.pool.checkout(self.connect), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.pool.stats()['expired'], 1)
+
+    def test_connection_past_max_age_is_closed_on_checkin(self):
+        self.pool.options.update(MAX_AGE=0.1, MAX_IDLE=60)
+        connection = self.pool.checkout(self.connect)
+        time.sleep(0.15)
+        self.pool.checkin(connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual((self.pool.stats()['discarded'], self.pool.stats()['open']), (1, 0))
+
+    def test_connection_idle_longer_than_max_idle_is_replaced(self):
+        self.pool.options.update(MAX_AGE=60, MAX_IDLE=0.1)
+        connection = self.pool.checkout(self.connect)
+        self.pool.checkin(connection)
+        time.sleep(0.15)
+        self.assertIsNot(self.pool.checkout(self.connect), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.pool.stats()['expired'], 1)
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'needs fork()')
+class ForkTests(PoolTestCase):
+
+    def setUp(self):
+        # The fork hooks only see pools registered with get_pool
+        self.pool = db_pool.get_pool(f'test-fork-{id(self)}', {'MAX_SIZE': 2})
+        self.addCleanup(self.close_all)
+        self.addCleanup(db_pool._pools.pop, self.pool.alias, None)
+
+    def test_child_starts_with_an_empty_pool(self):
+        in_use = self.pool.checkout(self.connect)
+        idle = self.pool.checkout(self.connect)
+        self.pool.checkin(idle)
+        parent_pid = backend_pid(in_use)
+
+        pid = os.fork()
+        if pid == 0:
+            # Child: report through the exit code, never run the test runner's cleanup
+            code = 1
+            try:
+                stats = self.pool.stats()
+                connection = self.pool.checkout(self.connect)
+                if stats['open'] == 0 and connection is not in_use and backend_pid(connection) != parent_pid:
+                    self.pool.checkin(connection)
+                    code = 0
+            finally:
+                os._exit(code)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        # Idle connections were closed before the fork, the one in use still works
+        self.assertTrue(idle.closed)
+        self.assertEqual(self.pool.stats()['idle'], 0)
+        self.assertEqual(backend_pid(in_use), parent_pid)
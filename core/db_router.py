@@ -0,0 +1,125 @@
+"""
+Database router: public reads go to the replicas, everything else to the primary
+
+    DATABASES = {'default': {...primary...}, 'replica': {...}}
+    DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+    DATABASE_REPLICAS = ['replica']
+    MIDDLEWARE = [..., 'home.middleware.ReplicaRoutingMiddleware', ...]
+
+Reads only use a replica inside requests ReplicaRoutingMiddleware marked as
+eligible (GET/HEAD outside the admin, session not pinned). Management
+commands, the admin, POSTs and anything after a write in the same request
+read from the primary.
+
+Settings:
+    REPLICA_MAX_LAG              seconds of replay lag before a replica is skipped (default 10)
+    REPLICA_LAG_CHECK_INTERVAL   seconds between lag checks per replica (default 5)
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# True while the current request may read from a replica
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+# Set by db_for_write so the middleware can pin the session
+_wrote = contextvars.ContextVar('wrote', default=False)
+
+LAG_SQL = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+_lag_state = {}            # alias -> (checked_at, healthy)
+_lag_lock = threading.Lock()
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def replica_is_healthy(alias):
+    """Replay lag below REPLICA_MAX_LAG, checked at most every REPLICA_LAG_CHECK_INTERVAL seconds"""
+    now = time.monotonic()
+    checked_at, healthy = _lag_state.get(alias, (0, True))
+    if now - checked_at < getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5):
+        return healthy
+
+    # Only one thread per process runs the check, the others use the last result
+    if not _lag_lock.acquire(blocking=False):
+        return healthy
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0] or 0
+        healthy = float(lag) <= getattr(settings, 'REPLICA_MAX_LAG', 10)
+        if not healthy:
+            logger.warning(f"Replica {alias} is {float(lag):.1f}s behind, reading from the primary")
+    except Exception as e:
+        healthy = False
+        logger.warning(f"Replica {alias} lag check failed, reading from the primary: {e}")
+    finally:
+        _lag_state[alias] = (now, healthy)
+        _lag_lock.release()
+    return healthy
+
+
+def begin_replica_reads():
+    """Called by the middleware for requests that may read from a replica"""
+    return _replica_reads.set(True), _wrote.set(False)
+
+
+def begin_primary_reads():
+    """Called by the middleware for requests that must read from the primary"""
+    return _replica_reads.set(False), _wrote.set(False)
+
+
+def end_routing(tokens):
+    """Restore the previous state; returns True if the request wrote to the primary"""
+    wrote = _wrote.get()
+    replica_token, wrote_token = tokens
+    _replica_reads.reset(replica_token)
+    _wrote.reset(wrote_token)
+    return wrote
+
+
+def mark_write():
+    _wrote.set(True)
+    # Read-your-writes inside the same request
+    _replica_reads.set(False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        # Reads inside a transaction on the primary must see its uncommitted rows
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = [alias for alias in get_replicas() if replica_is_healthy(alias)]
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        mark_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
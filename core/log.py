@@ -0,0 +1,275 @@
+"""
+Non-blocking, structured logging
+
+Request threads only put records on an in-memory queue; a background
+QueueListener formats them as JSON lines and writes them to a file or stderr.
+When the queue is full (the disk stalls) records are dropped instead of
+blocking the request; the next record that gets through carries `dropped`. Every record carries the request id, method,
+path and the time since the request started (RequestLogMiddleware in
+home.middleware sets them).
+
+    from core.log import build_logging_config
+    LOGGING = build_logging_config(BASE_DIR / 'logs' / 'app.log')
+    MIDDLEWARE = ['home.middleware.RequestLogMiddleware', ...]
+
+Hot-path records are kept in check by two filters: RateLimitFilter lets at
+most `rate` records per call site through every `per` seconds (and reports
+how many it suppressed), SamplingFilter keeps a fraction of DEBUG records.
+"""
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+# Request context, set by RequestLogMiddleware
+_request_id = contextvars.ContextVar('log_request_id', default=None)
+_request_method = contextvars.ContextVar('log_request_method', default=None)
+_request_path = contextvars.ContextVar('log_request_path', default=None)
+_request_started = contextvars.ContextVar('log_request_started', default=None)
+
+# Attributes every LogRecord has; anything else was passed with extra=
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+CONTEXT_ATTRS = ('request_id', 'method', 'path', 'elapsed_ms')
+
+_exception_formatter = logging.Formatter()
+
+
+def begin_request(request_id, method, path):
+    return (
+        _request_id.set(request_id),
+        _request_method.set(method),
+        _request_path.set(path),
+        _request_started.set(time.perf_counter()),
+    )
+
+
+def end_request(tokens):
+    for var, token in zip((_request_id, _request_method, _request_path, _request_started), tokens):
+        var.reset(token)
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+def level_number(level):
+    """logging.INFO for logging.INFO, 20 or 'INFO' (the filters are configured from dictConfig strings)"""
+    if isinstance(level, int):
+        return level
+    number = logging.getLevelName(str(level).upper())
+    if not isinstance(number, int):
+        raise ValueError(f"Unknown logging level: {level!r}")
+    return number
+
+
+class RequestContextFilter(logging.Filter):
+    """Copy the request context onto the record (must run on the request thread)"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        record.method = _request_method.get()
+        record.path = _request_path.get()
+        started = _request_started.get()
+        record.elapsed_ms = round((time.perf_counter() - started) * 1000, 2) if started else None
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    At most `rate` records per call site (file and line) every `per` seconds.
+    The first record after a suppressed stretch carries `suppressed=<count>`.
+    Records at or above `max_level` are never limited.
+    """
+
+    def __init__(self, rate=10, per=60, max_level=logging.ERROR):
+        super().__init__()
+        self.rate = rate
+        self.per = per
+        self.max_level = level_number(max_level)
+        self.windows = {}      # (pathname, lineno) -> [window_start, count, suppressed]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= self.max_level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.per:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.rate:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class SamplingFilter(logging.Filter):
+    """Keep `rate` of the records below `level` (DEBUG by default), all others"""
+
+    def __init__(self, rate=0.01, level=logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.level = level_number(level)
+
+    def filter(self, record):
+        return record.levelno >= self.level or random.random() < self.rate
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+        }
+        for attr in CONTEXT_ATTRS:
+            value = getattr(record, attr, None)
+            if value is not None:
+                data[attr] = value
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and key not in CONTEXT_ATTRS and key not in data:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = record.stack_info
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class QueueLogHandler(logging.Handler):
+    """
+    Queue in front of a JSON file (or stderr) handler written by a background
+    thread. Usable directly from LOGGING:
+
+        'handlers': {'queue': {'class': 'core.log.QueueLogHandler', 'filename': '/path/app.log'}}
+
+    It owns its queue and listener rather than subclassing QueueHandler:
+    since Python 3.12 dictConfig builds the queue and listener of QueueHandler
+    subclasses itself and would pass the queue as a second `filename`.
+    """
+
+    def __init__(self, filename=None, maxsize=10000):
+        super().__init__()
+        self.queue = queue.Queue(maxsize)
+        self.filename = str(filename) if filename else None
+        self.dropped = 0
+        self.addFilter(RequestContextFilter())
+        self.listener = None
+        self.start()
+        _handlers.append(self)
+
+    def build_target(self):
+        if self.filename:
+            os.makedirs(os.path.dirname(self.filename) or '.', exist_ok=True)
+            # Reopens the file when logrotate moves it
+            target = logging.handlers.WatchedFileHandler(self.filename, encoding='utf-8')
+        else:
+            target = logging.StreamHandler(sys.stderr)
+        target.setFormatter(JSONFormatter())
+        return target
+
+    def start(self):
+        self.listener = logging.handlers.QueueListener(self.queue, self.build_target())
+        self.listener.start()
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+
+    def prepare(self, record):
+        # Render message and traceback on the request thread: args may change
+        # after the call and exc_info keeps the frames alive
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        # extra= values such as Django's `request` are rendered now as well
+        for key, value in list(vars(record).items()):
+            if key not in RESERVED_ATTRS and not isinstance(value, (str, int, float, bool, type(None))):
+                setattr(record, key, str(value))
+        return record
+
+    def enqueue(self, record):
+        if self.dropped:
+            record.dropped = self.dropped
+        try:
+            self.queue.put_nowait(record)
+            self.dropped = 0
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def after_fork_in_child(self):
+        # The listener thread does not survive fork and the queue's locks may be held
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.dropped = 0
+        self.start()
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+_handlers = []
+
+
+def _after_fork_in_child():
+    for handler in _handlers:
+        if handler.listener is not None:
+            handler.after_fork_in_child()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def build_logging_config(filename=None, level='INFO', rate=10, per=60, debug_sample_rate=0.01):
+    """A LOGGING dict routing every logger through one QueueLogHandler"""
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'filters': {
+            'rate_limit': {'()': 'core.log.RateLimitFilter', 'rate': rate, 'per': per},
+            'sample_debug': {'()': 'core.log.SamplingFilter', 'rate': debug_sample_rate},
+        },
+        'handlers': {
+            'queue': {
+                'class': 'core.log.QueueLogHandler',
+                'filename': str(filename) if filename else None,
+                'filters': ['sample_debug', 'rate_limit'],
+            },
+        },
+        'root': {'handlers': ['queue'], 'level': level},
+        'loggers': {
+            'django': {'handlers': ['queue'], 'level': level, 'propagate': False},
+        },
+    }
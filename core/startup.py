@@ -0,0 +1,30 @@
+"""
+Process start-up helpers for the WSGI/ASGI entry points
+
+Must run before Django (and anything that may pull in numpy/OpenBLAS) is
+imported: native libraries size their thread pools from these variables
+once, at import time. Every Passenger/gunicorn worker otherwise starts one
+BLAS thread per core and runs into RLIMIT_NPROC
+("OpenBLAS blas_thread_init: pthread_create failed").
+"""
+import os
+
+# Environment variables read by the common native thread pools
+NATIVE_THREAD_VARIABLES = (
+    'OPENBLAS_NUM_THREADS',
+    'OMP_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'RAYON_NUM_THREADS',
+)
+
+
+def limit_native_threads():
+    """
+    Cap native thread pools to WORKER_NATIVE_THREADS (default 1) per process.
+    Values already set in the environment win.
+    """
+    threads = os.environ.get('WORKER_NATIVE_THREADS', '1')
+    for name in NATIVE_THREAD_VARIABLES:
+        os.environ.setdefault(name, threads)
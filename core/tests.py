@@ -0,0 +1,82 @@
+"""
+Tests of the logging pipeline (core.log)
+
+They do not need Django, so plain unittest runs them:
+
+    python -m unittest core.tests
+"""
+import json
+import logging
+import logging.config
+import os
+import shutil
+import tempfile
+import unittest
+
+from core import log
+
+
+class LoggingConfigTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='core_log_tests_')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.filename = os.path.join(self.directory, 'logs', 'app.log')
+        root = logging.getLogger()
+        saved = (root.level, list(root.handlers))
+        self.addCleanup(self.restore_root, *saved)
+
+    def restore_root(self, level, handlers):
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+
+    def configure(self, **kwargs):
+        logging.config.dictConfig(log.build_logging_config(self.filename, **kwargs))
+        handler = logging.getLogger().handlers[0]
+        self.assertIsInstance(handler, log.QueueLogHandler)
+        return handler
+
+    def read_lines(self, handler):
+        # Stopping the listener flushes the queue to the file
+        handler.stop()
+        with open(self.filename, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_dict_config_writes_json_lines(self):
+        handler = self.configure()
+        logging.getLogger('core.tests').warning('সংবাদ %s', 42, extra={'story': 7})
+        lines = self.read_lines(handler)
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['message'], 'সংবাদ 42')
+        self.assertEqual((lines[0]['level'], lines[0]['story']), ('WARNING', 7))
+
+    def test_dict_config_applies_level_and_filters(self):
+        handler = self.configure(level='WARNING', rate=2)
+        logger = logging.getLogger('core.tests')
+        logger.info('below the level')
+        for i in range(5):
+            logger.warning('same call site %s', i)
+        self.assertEqual([line['message'] for line in self.read_lines(handler)],
+                         ['same call site 0', 'same call site 1'])
+
+    def test_without_filename_logs_to_stderr(self):
+        logging.config.dictConfig(log.build_logging_config())
+        handler = logging.getLogger().handlers[0]
+        self.assertIsNone(handler.filename)
+        self.assertIsInstance(handler.listener.handlers[0], logging.StreamHandler)
+
+
+class LevelNumberTests(unittest.TestCase):
+
+    def test_names_and_numbers(self):
+        self.assertEqual(log.level_number('warning'), logging.WARNING)
+        self.assertEqual(log.level_number(logging.DEBUG), logging.DEBUG)
+
+    def test_unknown_name(self):
+        with self.assertRaises(ValueError):
+            log.level_number('LOUD')
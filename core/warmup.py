@@ -0,0 +1,106 @@
+"""
+Pre-fork warm-up
+
+Run once in the master process after the WSGI application is created and
+before the workers are forked (`gunicorn --preload`, uWSGI without lazy-apps).
+Everything built here is inherited copy-on-write, so a fresh worker serves its
+first request without compiling templates or querying navigation data.
+
+    from core.warmup import warm_up
+    warm_up()
+
+core.wsgi calls it when DJANGO_WARMUP=1. Leave it off where each worker
+imports the application itself (Passenger runs no preloader for Python): it
+then shares nothing and only delays the worker's first request.
+Template compilation is only kept when the cached template loader is active
+(the default when DEBUG is False).
+"""
+import gc
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.xml', '.txt')
+
+_warmed_up = False
+
+
+def iter_template_names(engine):
+    """Every template name the Django engine can load from its dirs and app dirs"""
+    from django.template.utils import get_app_template_dirs
+
+    template_dirs = list(engine.dirs)
+    if engine.app_dirs:
+        template_dirs.extend(get_app_template_dirs('templates'))
+
+    for template_dir in template_dirs:
+        template_dir = str(template_dir)
+        for root, _, files in os.walk(template_dir):
+            for filename in files:
+                if filename.endswith(TEMPLATE_EXTENSIONS):
+                    yield os.path.relpath(os.path.join(root, filename), template_dir).replace(os.sep, '/')
+
+
+def precompile_templates():
+    """Load every template once so the cached loader keeps the compiled version"""
+    from django.template import engines
+    from django.template.backends.django import DjangoTemplates
+
+    compiled = failed = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in iter_template_names(backend.engine):
+            try:
+                backend.engine.get_template(name)
+                compiled += 1
+            except Exception as e:
+                # Broken or partial templates only fail when they are rendered
+                failed += 1
+                logger.debug(f"Warm-up could not compile template {name}: {e}")
+    return compiled, failed
+
+
+def populate_url_resolver():
+    """Build the resolver's pattern and reverse lookup tables"""
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+    return len(resolver.reverse_dict)
+
+
+def warm_up():
+    """Build the read-only caches, then leave no connection or garbage behind for the fork"""
+    global _warmed_up
+    from django.db import connections
+    from home import snapshots
+
+    if _warmed_up:
+        return None
+    _warmed_up = True
+
+    started = time.perf_counter()
+    steps = {}
+    try:
+        steps['templates'] = precompile_templates()
+        steps['urls'] = populate_url_resolver()
+        snapshots.load_all()
+        steps['snapshots'] = len(snapshots.SNAPSHOTS)
+    except Exception as e:
+        # A cold worker is still better than a worker that does not start
+        logger.error(f"Warm-up failed: {e}")
+    finally:
+        # Sockets must not be shared between the forked workers
+        connections.close_all()
+
+    # Move everything built so far into the permanent generation: the GC then
+    # never touches (and never un-shares) these pages in the workers
+    gc.collect()
+    gc.freeze()
+
+    logger.info(f"Warm-up done in {time.perf_counter() - started:.2f}s: {steps}")
+    return steps
@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from core.startup import limit_native_threads
+
+# Before Django and any native library is imported
+limit_native_threads()
+
+from django.core.wsgi import get_wsgi_application  # noqa: E402
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Set by deployments that import this module in a pre-forking master (gunicorn --preload)
+if os.environ.get('DJANGO_WARMUP') == '1':
+    from core.warmup import warm_up
+    warm_up()
@@ -0,0 +1,130 @@
+"""
+Bangla digits, month names, dates and "time since"
+
+One place for the conversions the template filters (bangla_filters,
+custom_filters.to_bengali), the context processor and the views use.
+Digits go through a precomputed str.maketrans table, dates are formatted
+once per (date, format) and timesince works on the time delta instead of
+translating django's English output word by word.
+
+    >>> digits(2024)
+    '২০২৪'
+    >>> date(datetime(2024, 12, 31))
+    '৩১ ডিসেম্বর ২০২৪'
+    >>> timesince(now() - timedelta(days=1, hours=3))
+    '১ দিন, ৩ ঘণ্টা আগে'
+
+`python manage.py bench_bangla` measures the per-call cost.
+"""
+import datetime as dt
+from functools import lru_cache
+
+from django.utils import timezone
+
+DIGITS = str.maketrans('0123456789', '০১২৩৪৫৬৭৮৯')
+
+MONTHS = (
+    '', 'জানুয়ারি', 'ফেব্রুয়ারি', 'মার্চ', 'এপ্রিল', 'মে', 'জুন',
+    'জুলাই', 'আগস্ট', 'সেপ্টেম্বর', 'অক্টোবর', 'নভেম্বর', 'ডিসেম্বর',
+)
+
+# Units of timesince, largest first; years and months are calendar ones
+# as in django.utils.timesince, the rest fixed lengths
+TIMESINCE_UNITS = ('বছর', 'মাস', 'সপ্তাহ', 'দিন', 'ঘণ্টা', 'মিনিট')
+TIMESINCE_CHUNKS = (60 * 60 * 24 * 7, 60 * 60 * 24, 60 * 60, 60)
+MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+AGO = 'আগে'
+
+# Date formats by name; the day is zero-padded like strftime's %d
+DATE = 'date'
+DATE_FORMATS = {
+    DATE: '{day:02d} {month} {year}',
+}
+
+
+def digits(value):
+    """Every ASCII digit of str(value) in Bangla, the rest unchanged"""
+    return str(value).translate(DIGITS)
+
+
+def digits_only(value):
+    """Only the digits of str(value), in Bangla ('12:30' -> '১২৩০')"""
+    text = str(value)
+    if not text.isdigit():
+        text = ''.join(filter(str.isdigit, text))
+    return text.translate(DIGITS)
+
+
+def month_name(month):
+    """Bangla name of month 1-12, '' for anything else"""
+    try:
+        return MONTHS[month] if month >= 1 else ''
+    except (IndexError, TypeError):
+        return ''
+
+
+@lru_cache(maxsize=4096)
+def _format_date(day, fmt):
+    return DATE_FORMATS[fmt].format(day=day.day, month=MONTHS[day.month], year=day.year).translate(DIGITS)
+
+
+@lru_cache(maxsize=4096)
+def _format_datetime(value, tz, fmt):
+    if timezone.is_aware(value):
+        value = value.astimezone(tz)
+    return _format_date(value.date(), fmt)
+
+
+def date(value, fmt=DATE):
+    """'৩১ ডিসেম্বর ২০২৪' for a date or datetime (aware ones in TIME_ZONE)"""
+    if not value:
+        return ''
+    if isinstance(value, dt.datetime):
+        # The same article timestamps are rendered over and over. The site's
+        # TIME_ZONE: no view activates another one, and looking up the
+        # active zone costs more than the whole conversion
+        return _format_datetime(value, timezone.get_default_timezone(), fmt)
+    return _format_date(value, fmt)
+
+
+def timesince(value, now=None, depth=2):
+    """
+    '৫ মিনিট আগে', '১ দিন, ৩ ঘণ্টা আগে': up to `depth` adjacent units, the
+    same split as django's timesince. Future times give '০ মিনিট আগে'.
+    """
+    if not value:
+        return ''
+    if not isinstance(value, dt.datetime):
+        value = dt.datetime(value.year, value.month, value.day)
+    if now is None:
+        now = timezone.now() if timezone.is_aware(value) else dt.datetime.now()
+    elif not isinstance(now, dt.datetime):
+        now = dt.datetime(now.year, now.month, now.day)
+    if timezone.is_aware(value) != timezone.is_aware(now):
+        now = timezone.make_aware(now) if timezone.is_aware(value) else timezone.make_naive(now)
+
+    counts = [0] * len(TIMESINCE_UNITS)
+    if now > value:
+        total_months = (now.year - value.year) * 12 + now.month - value.month
+        if (value.day, value.time()) > (now.day, now.time()):
+            total_months -= 1
+        counts[0], counts[1] = divmod(total_months, 12)
+        pivot = value
+        if total_months:
+            year, month = divmod(value.month - 1 + total_months, 12)
+            pivot = value.replace(year=value.year + year, month=month + 1, day=min(MONTH_DAYS[month], value.day))
+        remaining = int((now - pivot).total_seconds())
+        for index, chunk in enumerate(TIMESINCE_CHUNKS, start=2):
+            counts[index], remaining = divmod(remaining, chunk)
+
+    parts = []
+    for index, count in enumerate(counts):
+        if count:
+            for unit, unit_count in zip(TIMESINCE_UNITS[index:index + depth], counts[index:index + depth]):
+                if not unit_count:
+                    break
+                parts.append(f'{unit_count} {unit}')
+            break
+    if not parts:
+        parts.append(f'0 {TIMESINCE_UNITS[-1]}')
+    return f"{', '.join(parts)} {AGO}".translate(DIGITS)
@@ -0,0 +1,38 @@
+"""
+Work collected during a transaction and done once it commits
+
+One admin save fires many signals (the object, its inlines, m2m changes);
+purge, sitemap_builder and seo collect what they affect and act once. The
+items live in the on_commit callback itself, so rolling back the
+transaction, or the savepoint they were added in, drops them with it.
+"""
+from django.db import transaction
+
+
+class Batch:
+    """on_commit callback calling flush(items) with everything added to it"""
+
+    def __init__(self, flush):
+        self.flush = flush
+        self.items = set()
+
+    def __call__(self):
+        self.flush(self.items)
+
+
+def add(flush, items):
+    """
+    Call flush(items) once the current transaction commits, together with the
+    items added for the same flush under the same savepoints. Outside a
+    transaction flush runs at once.
+    """
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        savepoints = set(connection.savepoint_ids)
+        for sids, callback, _ in connection.run_on_commit:
+            if isinstance(callback, Batch) and callback.flush == flush and sids == savepoints:
+                callback.items.update(items)
+                return
+    batch = Batch(flush)
+    batch.items.update(items)
+    transaction.on_commit(batch)
@@ -0,0 +1,175 @@
+"""
+Conditional GET (ETag / Last-Modified) for the public views
+
+A view declares what its response depends on with a cheap function that
+runs before the view and returns the freshness inputs (updated_at values,
+ids, short strings), or None to skip validation:
+
+    def article_inputs(request, section_slug, news_id, **kwargs):
+        ...
+        return [news.updated_at, section_lastmod]
+
+    @conditional(article_inputs)
+    def news_detail(request, section_slug, news_id): ...
+
+The ETag hashes the inputs and the release (CONDITIONAL_VERSION, by default
+the newest template mtime); Last-Modified is the newest datetime among the
+inputs and that template mtime. A deploy therefore invalidates every
+validator.
+
+When the client's copy is current the decorator answers 304 Not Modified
+without running the view, so nothing is queried or rendered.
+
+Pages are validated for anonymous GET/HEAD requests only: logged-in users
+see personalised parts. Site-wide blocks that are not inputs (most read,
+videos of other sections) may stay stale in a revalidated copy until one of
+the inputs changes.
+"""
+import hashlib
+import os
+from datetime import datetime
+from functools import lru_cache, wraps
+
+from django.apps import apps
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+
+from home import freshness
+
+
+@lru_cache(maxsize=None)
+def template_version():
+    """Newest modification time of the project and app templates (seconds)"""
+    directories = [str(directory) for engine in settings.TEMPLATES for directory in engine.get('DIRS', [])]
+    directories += [os.path.join(app.path, 'templates') for app in apps.get_app_configs()]
+    newest = 0
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                try:
+                    newest = max(newest, os.stat(os.path.join(root, name)).st_mtime)
+                except OSError:
+                    continue
+    return int(newest)
+
+
+def get_version():
+    return getattr(settings, 'CONDITIONAL_VERSION', None) or str(template_version())
+
+
+def make_validators(inputs):
+    """(etag, last_modified timestamp or None) for a list of freshness inputs"""
+    version = get_version()
+    digest = hashlib.blake2b(repr((version, inputs)).encode('utf-8'), digest_size=12).hexdigest()
+    timestamps = [value.timestamp() for value in inputs if isinstance(value, datetime)]
+    if not timestamps:
+        return quote_etag(digest), None
+    if not getattr(settings, 'CONDITIONAL_VERSION', None):
+        timestamps.append(template_version())
+    return quote_etag(digest), int(max(timestamps))
+
+
+def conditional(get_inputs, anonymous_only=True):
+    """Answer 304 from `get_inputs(request, *args, **kwargs)` before running the view"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or (anonymous_only and request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            inputs = get_inputs(request, *args, **kwargs)
+            if inputs is None:
+                return view(request, *args, **kwargs)
+
+            etag, last_modified = make_validators(list(inputs))
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                if not response.has_header('ETag'):
+                    response['ETag'] = etag
+                if last_modified is not None and not response.has_header('Last-Modified'):
+                    response['Last-Modified'] = http_date(last_modified)
+                if not response.has_header('Cache-Control'):
+                    # Revalidate every time instead of heuristic browser caching
+                    patch_cache_control(response, max_age=0)
+            return response
+        return wrapper
+    return decorator
+
+
+# -- freshness inputs of the views ---------------------------------------------------
+
+def news_detail_inputs(request, section_slug, news_id, subsection_slug=None):
+    """
+    The article and the newest article of its section (the section boxes).
+    Reviews and reactions are fragments of their own (home.fragment_views).
+    """
+    from home.models import News
+
+    row = News.objects.filter(id=news_id).values_list('updated_at', 'scheduled_publish_at', 'section_id').first()
+    if row is None:
+        return None
+    updated_at, scheduled_publish_at, section_id = row
+    if scheduled_publish_at and scheduled_publish_at > timezone.now():
+        # Scheduled: 404 or a staff preview, let the view decide
+        return None
+    return [news_id, updated_at, freshness.get('section').get(section_id)]
+
+
+def news_reviews_inputs(request, news_id):
+    """The newest review of the article and how many there are"""
+    from django.db.models import Count, Max
+    from home.models import Review
+
+    reviews = Review.objects.filter(news_id=news_id).aggregate(latest=Max('id'), count=Count('id'))
+    if not reviews['count']:
+        # Also covers missing and unpublished articles, let the view decide
+        return None
+    return [news_id, reviews['latest'], reviews['count']]
+
+
+def news_listing_inputs(request, section_slug, subsection_slug=None):
+    """The newest article of the section (or subsection) and the newest video"""
+    from django.db.models import Max
+    from home import snapshots
+    from home.models import VideoPost
+
+    # Everything but the active sections and subsections is left to the view
+    navigation = snapshots.navigation()
+    if any(page.slug == section_slug for page in navigation['default_pages']):
+        return None
+    section = next((item for item in navigation['navbar_items'] if item.get_slug() == section_slug), None)
+    if section is None or not section.english_title:
+        return None
+    if subsection_slug:
+        subsection = next(
+            (sub for sub in navigation['subsection_map'].get(section.id, ()) if sub.get_slug() == subsection_slug),
+            None,
+        )
+        if subsection is None or not subsection.english_title:
+            return None
+        lastmod = freshness.get('sub_section').get(subsection.pk)
+    else:
+        lastmod = freshness.get('section').get(section.pk)
+    latest_video = VideoPost.objects.aggregate(latest=Max('id'))['latest']
+    return [section.pk, subsection_slug, lastmod, latest_video]
+
+
+def robots_txt_inputs(request):
+    """The active robots.txt row, or the host the default one names"""
+    from home.models import RobotsTxt
+
+    updated_at = RobotsTxt.objects.filter(is_active=True).values_list('updated_at', flat=True).first()
+    if updated_at:
+        return [updated_at]
+    return [request.get_host(), request.is_secure()]
+
+
+def scoreboard_inputs(request):
+    """The latest election score row"""
+    from home.models import ElectionLiveScore
+
+    row = ElectionLiveScore.objects.order_by('-updated_at').values_list('id', 'updated_at').first()
+    return list(row) if row else ['empty']
@@ -1,20 +1,18 @@
 
 from home.templatetags.bangla_filters import convert_to_bangla_number
-from .models import *
+from home import snapshots
 from datetime import datetime
-from collections import defaultdict
 def default(request):
-    site_info = SiteInfo.objects.first()
-    navbar_item = NavbarItem.objects.filter(is_active=True).order_by('position')
-    default_pages = Default_pages.objects.all()
+    # Navigation and site info come from the process-wide snapshots (home.snapshots)
+    site_info = snapshots.site_info()
+    navigation = snapshots.navigation()
+    navbar_item = navigation['navbar_items']
+    default_pages = navigation['default_pages']
     current_date = datetime.now()
     bangla_date = f"{convert_to_bangla_number(current_date.day)}"
 
-    # Group subsections by section
-    subsection_map = defaultdict(list)
-    for sub in SubSection.objects.filter(is_active=True).select_related('section').order_by('position'):
-        if sub.section:
-            subsection_map[sub.section.id].append(sub)
+    # Subsections grouped by section id
+    subsection_map = navigation['subsection_map']
 
     return {
         'site_info': site_info,
@@ -0,0 +1,115 @@
+"""
+Per-user and fast-changing parts of the article page
+
+The article HTML (views._news_detail_handler) is the same for every
+anonymous reader, so it validates with ETags and can be cached by the
+proxy (home.purge). What differs per reader or changes every minute is
+fetched by the page script after it loads:
+
+    GET  /news/<id>/reactions/     reaction totals (JSON)
+    GET  /news/<id>/reviews/       latest reviews (HTML)
+    GET  /news/<id>/review-form/   review form or login prompt (HTML, never cached)
+    POST /news/<id>/review/        add a review
+    POST /news/<id>/view/          count a read ("most read"), sent with sendBeacon
+
+The reactions, review form and review list are still commented out in
+pages/news_detail.html, as before; uncomment their containers to turn them
+on (each one is a request per article view). The review form endpoint is
+also where the share button gets its CSRF cookie.
+"""
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db.models import Count, F
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
+
+from home import conditional
+from home.forms import ReviewForm
+from home.models import News, NewsReaction, NewsView, Review
+
+# Reviews shown under an article
+REVIEWS_LIMIT = 5
+
+LOGIN_REQUIRED_MESSAGE = "মন্তব্য করতে হলে আপনাকে লগইন করতে হবে।"
+
+
+def wants_json(request):
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+@require_safe
+def news_reactions(request, news_id):
+    """{'counts': {'love': 10, 'clap': 5, ...}, 'total': 15}"""
+    get_object_or_404(News.published.only('id'), id=news_id)
+    rows = NewsReaction.objects.filter(news_id=news_id).values_list('reaction').annotate(count=Count('id'))
+    counts = dict(rows)
+    response = JsonResponse({'counts': counts, 'total': sum(counts.values())})
+    # Totals may lag a few seconds; the page asks with cache: 'no-store' after reacting
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'REACTIONS_MAX_AGE', 15))
+    return response
+
+
+@require_safe
+@conditional.conditional(conditional.news_reviews_inputs, anonymous_only=False)
+def news_reviews(request, news_id):
+    news = get_object_or_404(News.published.only('id'), id=news_id)
+    reviews = (
+        Review.objects.filter(news=news)
+        .select_related('user')
+        .order_by('-created_at')[:REVIEWS_LIMIT]
+    )
+    return render(request, 'fragments/news_reviews.html', {'reviews': reviews})
+
+
+@require_safe
+@never_cache
+def news_review_form(request, news_id):
+    """The review form for logged-in readers, or a login link"""
+    news = get_object_or_404(News.published.select_related('section', 'sub_section'), id=news_id)
+    # The cached article sets no cookie; its share and reaction buttons post
+    # with the CSRF cookie handed out here
+    get_token(request)
+    return render(request, 'fragments/news_review_form.html', {'news': news})
+
+
+@require_POST
+def post_review(request, news_id):
+    news = get_object_or_404(News.published, id=news_id)
+    if not request.user.is_authenticated:
+        if wants_json(request):
+            return JsonResponse({'status': 'error', 'message': LOGIN_REQUIRED_MESSAGE}, status=403)
+        return redirect_to_login(news.get_absolute_url())
+
+    form = ReviewForm(request.POST)
+    if not form.is_valid():
+        if wants_json(request):
+            return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
+        return redirect(news.get_absolute_url())
+
+    review = form.save(commit=False)
+    review.news = news
+    review.user = request.user
+    review.save()
+    if wants_json(request):
+        return JsonResponse({'status': 'ok', 'id': review.id})
+    return redirect(f'{news.get_absolute_url()}#reviews')
+
+
+@csrf_exempt
+@require_POST
+def news_view(request, news_id):
+    """
+    Count one read of the article. The article HTML may come from a 304 or
+    the proxy cache, so the page reports the read itself. No CSRF token:
+    the cached page has no cookie and a forged count is all it could do.
+    """
+    if not NewsView.objects.filter(news_id=news_id).update(count=F('count') + 1):
+        news = get_object_or_404(News.objects.only('id'), id=news_id)
+        NewsView.objects.get_or_create(news=news)
+        NewsView.objects.filter(news=news).update(count=F('count') + 1)
+    return HttpResponse(status=204)
@@ -0,0 +1,93 @@
+"""
+When did the published news of each tag, category, section and subsection
+last change?
+
+The sitemaps need that for every item's <lastmod>. It used to take one or
+two queries per tag; now one aggregate query per kind computes the whole
+map ({id: latest updated_at}, only ids with published news), which is kept
+in the cache for FRESHNESS_TTL seconds.
+
+Saving or deleting an article, or changing its tags or categories,
+invalidates the maps once the transaction commits (home.signals); the next
+get() recomputes them. The maps are stored under a generation number that
+invalidate() increments, so a recompute that read the rows before the
+commit stores its map under the old generation, where nobody looks.
+
+With a per-process cache (LocMemCache) only the process that saved the
+article sees the change right away; the others catch up within the TTL.
+The TTL also picks up scheduled articles going live, which fire no signal.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'home:freshness:{kind}:{generation}'
+GENERATION_KEY = 'home:freshness:{kind}:generation'
+
+# kind -> News field it groups by
+KINDS = {
+    'tag': 'tags',
+    'category': 'category',
+    'section': 'section',
+    'sub_section': 'sub_section',
+}
+
+
+def compute(kind):
+    """{id: latest updated_at} over published news, one query"""
+    from home.models import News
+
+    field = KINDS[kind]
+    rows = (
+        News.published
+        .filter(**{f'{field}__isnull': False})
+        .order_by()
+        .values_list(field)
+        .annotate(lastmod=Max('updated_at'))
+    )
+    return dict(rows)
+
+
+def _generation(kind):
+    key = GENERATION_KEY.format(kind=kind)
+    generation = cache.get(key)
+    if generation is None:
+        # A new start, not 1: maps of an evicted generation may still be cached
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key, 0)
+    return generation
+
+
+def get(kind):
+    """The freshness map of `kind`, from the cache when possible"""
+    try:
+        key = CACHE_KEY.format(kind=kind, generation=_generation(kind))
+        lastmods = cache.get(key)
+    except Exception:
+        return compute(kind)
+    if lastmods is None:
+        lastmods = compute(kind)
+        try:
+            cache.set(key, lastmods, getattr(settings, 'FRESHNESS_TTL', 15 * 60))
+        except Exception as e:
+            logger.warning(f"Could not cache the {kind} freshness map: {e}")
+    return lastmods
+
+
+def invalidate(*kinds):
+    """Drop the maps of these kinds (all by default) in every process sharing the cache"""
+    for kind in kinds or KINDS:
+        key = GENERATION_KEY.format(kind=kind)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Not set yet (or evicted): any new value leaves the old maps behind
+                cache.set(key, time.time_ns(), None)
+        except Exception as e:
+            logger.warning(f"Could not invalidate the {kind} freshness map: {e}")
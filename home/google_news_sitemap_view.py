@@ -1,93 +1,99 @@
 """
 Custom view for Google News sitemap with proper XML format
 """
-from django.template.response import TemplateResponse
-from django.contrib.sites.shortcuts import get_current_site
-from django.utils import timezone
-from datetime import timedelta
-from .sitemaps import GoogleNewsSitemap
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.template.loader import get_template
 from .models import News
+from .sitemaps import GoogleNewsSitemap
+from . import sitemap_builder
 import logging
+import zlib
 
 logger = logging.getLogger(__name__)
 
 
-def google_news_sitemap(request):
+# One rendered <url> entry per article version; `salt` covers the site URL
+# and publication name the entry embeds
+ENTRY_KEY = 'home:gnews:{id}:{version}:{salt}'
+
+
+def entry_key(news_id, updated_at, salt):
+    return ENTRY_KEY.format(id=news_id, version=int(updated_at.timestamp() * 1000000), salt=salt)
+
+
+def render_entry(template, sitemap, item, site_url, publication_name, publication_language):
+    image_url = sitemap.get_image_url(item)
+    if image_url and image_url.startswith('/'):
+        image_url = f"{site_url}{image_url}"
+    return template.render({
+        'item_data': {
+            'location': f"{site_url}{sitemap.location(item)}",
+            'publication_date': sitemap.get_news_publication_date(item),
+            'title': sitemap.get_news_title(item),
+            'keywords': sitemap.get_news_keywords(item),
+            'image_url': image_url,
+            'image_caption': sitemap.get_image_caption(item),
+        },
+        'publication_name': publication_name,
+        'publication_language': publication_language,
+    })
+
+
+def google_news_context(site_url):
     """
-    Custom view for Google News sitemap that includes:
+    Context for google_news_sitemap.xml:
     - Google News namespace
     - Image namespace
     - Proper news:news tags
+
+    Entries are cached per article version (id, updated_at), so only new or
+    edited articles are fetched (with their section, subsection and
+    categories in two queries) and rendered. Database errors are raised:
+    sitemap_builder then keeps the previous file instead of an empty one.
     """
+    sitemap = GoogleNewsSitemap()
+    publication_name = sitemap.get_publication_name()
+    publication_language = sitemap.get_publication_language()
+    salt = zlib.crc32(f"{site_url}|{publication_name}".encode('utf-8'))
+
+    versions = sitemap.versions()
+    keys = {news_id: entry_key(news_id, updated_at, salt) for news_id, updated_at in versions}
     try:
-        sitemap = GoogleNewsSitemap()
-        
-        # Debug: Check what we're querying
-        now = timezone.now()
-        cutoff_time = now - timedelta(hours=48)
-        
-        # Get total published news count for debugging
-        total_published = News.published.count()
-        recent_news = News.published.filter(created_at__gte=cutoff_time).count()
-        
-        logger.info(f"Google News sitemap debug: Total published={total_published}, Recent (48h)={recent_news}, Cutoff={cutoff_time}, Now={now}")
-        
-        items = list(sitemap.items())
-        
-        # Debug: Log how many items we found
-        logger.info(f"Google News sitemap: Found {len(items)} items from last 48 hours")
-        
-        # Get site info
-        current_site = get_current_site(request)
-        protocol = 'https' if request.is_secure() else 'http'
-        site_url = f"{protocol}://{current_site.domain}"
-        
-        # Prepare items with all necessary data
-        sitemap_items = []
-        for item in items:
+        cached = cache.get_many(list(keys.values()))
+    except Exception:
+        cached = {}
+    entries = {news_id: cached[key] for news_id, key in keys.items() if key in cached}
+    logger.debug(f"Google News sitemap: {len(versions)} items from the last 48 hours, {len(entries)} cached")
+
+    missing = [news_id for news_id in keys if news_id not in entries]
+    if missing:
+        template = get_template('google_news_sitemap_entry.xml')
+        rendered = {}
+        for item in sitemap.with_related(News.published.filter(pk__in=missing)):
             try:
-                image_url = sitemap.get_image_url(item, request)
-                sitemap_items.append({
-                    'item': item,
-                    'location': f"{site_url}{sitemap.location(item)}",
-                    'publication_date': sitemap.get_news_publication_date(item),
-                    'title': sitemap.get_news_title(item),
-                    'keywords': sitemap.get_news_keywords(item),
-                    'image_url': image_url,
-                    'image_caption': sitemap.get_image_caption(item),
-                })
+                entry = render_entry(template, sitemap, item, site_url, publication_name, publication_language)
+            except DatabaseError:
+                raise
             except Exception as e:
                 logger.error(f"Error processing news item {item.id}: {e}")
                 continue
-        
-        context = {
-            'items': sitemap_items,
-            'publication_name': sitemap.get_publication_name(),
-            'publication_language': sitemap.get_publication_language(),
-            'site_url': site_url,
-        }
-        
-        return TemplateResponse(
-            request,
-            'google_news_sitemap.xml',
-            context,
-            content_type='application/xml'
-        )
-    except Exception as e:
-        logger.error(f"Error generating Google News sitemap: {e}", exc_info=True)
-        # Return empty sitemap on error
-        current_site = get_current_site(request)
-        protocol = 'https' if request.is_secure() else 'http'
-        site_url = f"{protocol}://{current_site.domain}"
-        return TemplateResponse(
-            request,
-            'google_news_sitemap.xml',
-            {
-                'items': [],
-                'publication_name': 'জাগরণ নিউজ',
-                'publication_language': 'bn',
-                'site_url': site_url,
-            },
-            content_type='application/xml'
-        )
+            entries[item.id] = entry
+            rendered[entry_key(item.id, item.updated_at, salt)] = entry
+        try:
+            cache.set_many(rendered, getattr(settings, 'GOOGLE_NEWS_ENTRY_TTL', 49 * 60 * 60))
+        except Exception as e:
+            logger.warning(f"Could not cache Google News sitemap entries: {e}")
 
+    return {
+        'entries': [entries[news_id] for news_id, _ in versions if news_id in entries],
+        'publication_name': publication_name,
+        'publication_language': publication_language,
+        'site_url': site_url,
+    }
+
+
+def google_news_sitemap(request):
+    """Google News sitemap (articles from the last 48 hours), served from the pre-built file"""
+    return sitemap_builder.serve(request, 'news-sitemap.xml')
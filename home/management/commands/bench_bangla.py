@@ -0,0 +1,111 @@
+"""
+Micro-benchmark of the Bangla conversions (home.bangla)
+
+Compares the per-call cost of the template filters as they were (a dict of
+str.replace calls per digit, English timesince output translated word by
+word) with the table-driven home.bangla, on the values a listing page
+feeds them: article timestamps of the last weeks, counters and years.
+
+Usage:
+    python manage.py bench_bangla --calls 100000
+"""
+import random
+import timeit
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.timesince import timesince as django_timesince
+
+from home import bangla
+
+LEGACY_NUMBERS = {
+    '0': '০', '1': '১', '2': '২', '3': '৩', '4': '৪',
+    '5': '৫', '6': '৬', '7': '৭', '8': '৮', '9': '৯'
+}
+LEGACY_MONTHS = {
+    'January': 'জানুয়ারি', 'February': 'ফেব্রুয়ারি', 'March': 'মার্চ', 'April': 'এপ্রিল',
+    'May': 'মে', 'June': 'জুন', 'July': 'জুলাই', 'August': 'আগস্ট',
+    'September': 'সেপ্টেম্বর', 'October': 'অক্টোবর', 'November': 'নভেম্বর', 'December': 'ডিসেম্বর'
+}
+LEGACY_UNITS = {
+    'year': 'বছর', 'years': 'বছর', 'month': 'মাস', 'months': 'মাস',
+    'week': 'সপ্তাহ', 'weeks': 'সপ্তাহ', 'day': 'দিন', 'days': 'দিন',
+    'hour': 'ঘণ্টা', 'hours': 'ঘণ্টা', 'minute': 'মিনিট', 'minutes': 'মিনিট',
+    'second': 'সেকেন্ড', 'seconds': 'সেকেন্ড', 'ago': 'আগে'
+}
+
+
+# -- the filters before home.bangla, for comparison ---------------------------------
+
+def legacy_number(number):
+    return ''.join(LEGACY_NUMBERS.get(char, char) for char in str(number))
+
+
+def legacy_to_bengali(value):
+    digits = ['০', '১', '২', '৩', '৪', '৫', '৬', '৭', '৮', '৯']
+    return ''.join([digits[int(digit)] for digit in str(value) if digit.isdigit()])
+
+
+def legacy_date(value):
+    value = timezone.localtime(value)
+    day, month, year = value.strftime('%d %B %Y').split()
+    return f"{''.join(LEGACY_NUMBERS[d] for d in day)} {LEGACY_MONTHS[month]} {''.join(LEGACY_NUMBERS[d] for d in year)}"
+
+
+def legacy_timesince(value):
+    time_diff = django_timesince(value, timezone.now())
+    for eng, ban in LEGACY_NUMBERS.items():
+        time_diff = time_diff.replace(eng, ban)
+    parts = []
+    for part in time_diff.split(', '):
+        for eng, ban in LEGACY_UNITS.items():
+            part = part.replace(f"{eng}s", eng)
+            part = part.replace(eng, ban)
+        parts.append(part)
+    result = ', '.join(parts)
+    if 'আগে' not in result:
+        result = f"{result} আগে"
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Per-call cost of the Bangla digit, date and timesince conversions (before and after home.bangla)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=100000, help='Calls per conversion (default: 100000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per conversion, the best one counts (default: 3)')
+
+    def handle(self, *args, **options):
+        calls = options['calls']
+        rng = random.Random(42)
+        now = timezone.now()
+        # A listing page: timestamps of the last three weeks, counters, years
+        timestamps = [now - timedelta(seconds=rng.randrange(60, 21 * 24 * 3600)) for _ in range(500)]
+        numbers = [rng.randrange(0, 100000) for _ in range(500)]
+
+        def per_call(function, values):
+            count = len(values)
+            loops = max(calls // count, 1)
+
+            def run():
+                for value in values:
+                    function(value)
+            best = min(timeit.repeat(run, number=loops, repeat=options['repeat']))
+            return best / (loops * count) * 1e9
+
+        conversions = [
+            ('bangla_number', legacy_number, bangla.digits, numbers),
+            ('to_bengali', legacy_to_bengali, bangla.digits_only, numbers),
+            ('bangla_date', legacy_date, bangla.date, timestamps),
+            ('bangla_timesince', legacy_timesince, bangla.timesince, timestamps),
+        ]
+
+        header = f'{"conversion":<18} {"before ns/call":>15} {"after ns/call":>14} {"speedup":>8}'
+        self.stdout.write(f'{calls} calls per conversion, best of {options["repeat"]}\n')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, before, after, values in conversions:
+            before_ns = per_call(before, values)
+            after_ns = per_call(after, values)
+            self.stdout.write(f'{name:<18} {before_ns:>15.0f} {after_ns:>14.0f} {before_ns / after_ns:>7.1f}x')
@@ -0,0 +1,142 @@
+"""
+Benchmark worker throughput when serving large PDF attachments
+
+Compares django.views.static.serve with home.media_views.serve for the way
+browsers actually fetch News.pdf_file: a full download, a PDF viewer reading
+the file in Range chunks, and cache revalidation.
+
+Usage:
+    python manage.py bench_media_serving --size-mb 20 --iterations 20
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils.http import http_date
+from django.views.static import serve as django_serve
+
+from home.media_views import file_etag, serve as media_serve
+
+SENDFILE_CHUNK = 0x7FFFF000
+
+
+def drain(response, devnull_fd, use_sendfile):
+    """
+    Consume a response the way a WSGI worker would.
+    Returns (bytes_sent, bytes_copied_through_python).
+    """
+    filelike = getattr(response, 'file_to_stream', None)
+    if use_sendfile and filelike is not None and hasattr(filelike, 'fileno'):
+        # Same as gunicorn's wsgi.file_wrapper: os.sendfile from the current offset
+        fd = filelike.fileno()
+        offset = os.lseek(fd, 0, os.SEEK_CUR)
+        length = int(response['Content-Length'])
+        sent = 0
+        while sent < length:
+            count = os.sendfile(devnull_fd, fd, offset + sent, min(length - sent, SENDFILE_CHUNK))
+            if not count:
+                break
+            sent += count
+        response.close()
+        return sent, 0
+
+    sent = 0
+    if response.streaming:
+        for chunk in response.streaming_content:
+            sent += len(chunk)
+    else:
+        sent = len(response.content)
+    response.close()
+    return sent, sent
+
+
+class Command(BaseCommand):
+    help = 'Benchmark media serving throughput for large PDFs (old static.serve vs home.media_views.serve)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=20, help='Size of the generated PDF (default: 20)')
+        parser.add_argument('--iterations', type=int, default=20, help='Requests per scenario (default: 20)')
+        parser.add_argument('--chunk-kb', type=int, default=256, help='Range chunk size a PDF viewer asks for (default: 256)')
+        parser.add_argument(
+            '--no-sendfile', action='store_true',
+            help='Stream every body through Python instead of emulating wsgi.file_wrapper/os.sendfile',
+        )
+
+    def handle(self, *args, **options):
+        size = options['size_mb'] * 1024 * 1024
+        iterations = options['iterations']
+        chunk = options['chunk_kb'] * 1024
+        use_sendfile = not options['no_sendfile'] and hasattr(os, 'sendfile')
+
+        document_root = tempfile.mkdtemp(prefix='bench-media-')
+        path = 'news_pdfs/attachment.pdf'
+        fullpath = os.path.join(document_root, path)
+        os.makedirs(os.path.dirname(fullpath))
+        with open(fullpath, 'wb') as f:
+            f.write(b'%PDF-1.7\n')
+            remaining = size
+            while remaining > 0:
+                block = min(remaining, 1024 * 1024)
+                f.write(os.urandom(block))
+                remaining -= block
+
+        factory = RequestFactory()
+        stat = os.stat(fullpath)
+        last_modified = http_date(stat.st_mtime)
+        etag = file_etag(stat)
+        devnull_fd = os.open(os.devnull, os.O_WRONLY)
+
+        views = {
+            'static.serve': lambda request: django_serve(request, path, document_root=document_root),
+            'media_views.serve': lambda request: media_serve(request, path, document_root=document_root, kind='media'),
+        }
+
+        def full_request():
+            return factory.get('/media/' + path)
+
+        def range_request():
+            start = random.randrange(0, max(size - chunk, 1))
+            return factory.get('/media/' + path, HTTP_RANGE=f'bytes={start}-{start + chunk - 1}')
+
+        def revalidate_request():
+            # Old view only understands If-Modified-Since; new view prefers the ETag
+            return factory.get('/media/' + path, HTTP_IF_MODIFIED_SINCE=last_modified, HTTP_IF_NONE_MATCH=etag)
+
+        scenarios = [
+            ('full download', full_request),
+            (f'range {options["chunk_kb"]} KB', range_request),
+            ('revalidate', revalidate_request),
+        ]
+
+        self.stdout.write(
+            f'File: {options["size_mb"]} MB, {iterations} requests per scenario, '
+            f'sendfile emulation: {"on" if use_sendfile else "off"}\n'
+        )
+        header = f'{"scenario":<18} {"view":<18} {"req/s":>10} {"MB sent":>10} {"MB via Python":>14} {"status":>7}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        try:
+            for scenario, make_request in scenarios:
+                for view_name, view in views.items():
+                    sent_total = python_total = 0
+                    status = None
+                    started = time.perf_counter()
+                    for _ in range(iterations):
+                        response = view(make_request())
+                        status = response.status_code
+                        sent, copied = drain(response, devnull_fd, use_sendfile)
+                        sent_total += sent
+                        python_total += copied
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f'{scenario:<18} {view_name:<18} {iterations / elapsed:>10.1f} '
+                        f'{sent_total / 1048576:>10.1f} {python_total / 1048576:>14.1f} {status:>7}'
+                    )
+        finally:
+            os.close(devnull_fd)
+            shutil.rmtree(document_root, ignore_errors=True)
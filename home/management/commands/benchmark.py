@@ -0,0 +1,422 @@
+"""
+Benchmark the hot public endpoints against the current database
+
+Run it on a corpus from `generate_corpus` so the numbers mean something.
+Every scenario is requested through Django's test client (in process) or
+through a local wsgiref server (`--wsgi`, full WSGI stack and real sockets).
+For each scenario the latency distribution, queries per request and the peak
+memory allocated per request (tracemalloc, measured in a separate pass so it
+does not slow down the timed one) are reported and can be saved as JSON.
+Both transports send the first ALLOWED_HOSTS entry as Host, and the run
+fails when a scenario answers with a 4xx or 5xx.
+
+Usage:
+    python manage.py benchmark --iterations 100 --output bench/main.json
+    python manage.py benchmark --compare bench/main.json --threshold 10
+    python manage.py benchmark --only home,news_detail --wsgi
+
+With --compare the command fails when a scenario's p50 or p95 got slower by
+more than --threshold percent (and more than --min-delta-ms), or when it runs
+more queries than before.
+
+With --conditional every URL is fetched once and the timed requests replay
+its ETag / Last-Modified the way a crawler or CDN revalidates, so a run
+with and without the flag shows what revalidation costs:
+    python manage.py benchmark --conditional --only news_detail,news_page_section
+"""
+import http.client
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+
+from home.models import NavbarItem, News, ShortURL, SubSection, Tag
+from home.request_stats import RequestTimings, percentile
+from home.sitemaps import NewsSitemap
+
+SCENARIOS = (
+    'home', 'news_detail', 'news_page_section', 'news_page_subsection', 'topic_news_page', 'search_news',
+    'sitemap_index', 'google_news_sitemap', 'regular_news_sitemap', 'news_sitemap_shard', 'section_sitemap',
+    'topic_sitemap',
+    'election_scoreboard_api', 'redirect_short_url',
+)
+BENCH_SHORT_CODE = 'bench'
+SEARCH_TERMS = ('সরকার', 'নির্বাচন', 'বাজেট', 'ক্রিকেট', 'ঢাকা', 'বন্যা')
+
+
+def count_queries(get_response):
+    """Call get_response() with every DB connection of this thread counted"""
+    timings = RequestTimings()
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(timings))
+        response = get_response()
+    return response, timings
+
+
+def benchmark_host():
+    """A host ALLOWED_HOSTS accepts, sent by both transports"""
+    if settings.ALLOWED_HOSTS and settings.ALLOWED_HOSTS[0] != '*':
+        return settings.ALLOWED_HOSTS[0].lstrip('.')
+    return 'localhost'
+
+
+def conditional_headers(headers):
+    """Revalidation headers for a response's validators"""
+    replay = {}
+    if headers.get('ETag'):
+        replay['If-None-Match'] = headers['ETag']
+    if headers.get('Last-Modified'):
+        replay['If-Modified-Since'] = headers['Last-Modified']
+    return replay
+
+
+class CountingWSGIApp:
+    """Wraps the Django application so queries are counted in the server thread"""
+
+    def __init__(self, application):
+        self.application = application
+        self.last_timings = None
+
+    def __call__(self, environ, start_response):
+        def get_body():
+            response = self.application(environ, start_response)
+            try:
+                return b''.join(response)
+            finally:
+                # Sends request_finished, as the server would
+                response.close()
+
+        body, self.last_timings = count_queries(get_body)
+        return [body]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency, queries and memory of the hot endpoints; save or compare the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per scenario (default: 50)')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per scenario first (default: 5)')
+        parser.add_argument(
+            '--memory-iterations', type=int, default=5,
+            help='Requests per scenario in the tracemalloc pass, 0 to skip it (default: 5)',
+        )
+        parser.add_argument('--only', help='Comma-separated scenarios to run (default: all)')
+        parser.add_argument('--wsgi', action='store_true', help='Go through a local wsgiref server instead of the test client')
+        parser.add_argument(
+            '--conditional', action='store_true',
+            help='Revalidate with If-None-Match / If-Modified-Since like a crawler (validators from a first fetch)',
+        )
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Compare with the results of an earlier run (JSON file)')
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Percent slowdown of p50/p95 reported as a regression (default: 10)',
+        )
+        parser.add_argument(
+            '--min-delta-ms', type=float, default=1.0,
+            help='Ignore slowdowns smaller than this many milliseconds (default: 1)',
+        )
+
+    def handle(self, *args, **options):
+        names = SCENARIOS
+        if options['only']:
+            names = [name.strip() for name in options['only'].split(',') if name.strip()]
+            unknown = set(names) - set(SCENARIOS)
+            if unknown:
+                raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}. Available: {", ".join(SCENARIOS)}')
+
+        if not News.published.exists():
+            raise CommandError('No published news; run `manage.py generate_corpus` first')
+
+        # Rows created for the run (the short URL) are removed afterwards
+        self.created_rows = []
+        try:
+            scenarios = self.build_scenarios(names)
+            results = self.run_scenarios(scenarios, options)
+        finally:
+            for row in self.created_rows:
+                row.delete()
+
+        # Error pages are fast: a run that timed them must not become a baseline
+        failed = {name: result['status_codes'] for name, result in results.items() if result['errors']}
+        if failed:
+            raise CommandError('Scenarios answered with errors: ' + '; '.join(
+                f'{name} ({", ".join(str(code) for code in codes)})' for name, codes in failed.items()
+            ))
+
+        report = {'meta': self.metadata(options), 'results': results}
+        if options['output']:
+            os.makedirs(os.path.dirname(os.path.abspath(options['output'])), exist_ok=True)
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            self.stdout.write(f'\nResults written to {options["output"]}')
+
+        if options['compare']:
+            self.compare(report, options)
+
+    # -- scenarios -----------------------------------------------------------------
+
+    def run_scenarios(self, scenarios, options):
+        fetch, cleanup = self.start_wsgi_server() if options['wsgi'] else self.start_test_client()
+
+        header = (
+            f'{"scenario":<24} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8} '
+            f'{"queries":>8} {"db ms":>7} {"body KB":>8} {"peak KB":>8} {"status":>7}'
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        results = {}
+        try:
+            for name, urls in scenarios.items():
+                result = self.run_scenario(fetch, urls, options)
+                results[name] = result
+                self.stdout.write(
+                    f'{name:<24} {result["requests_per_second"]:>8.1f} {result["p50_ms"]:>8.2f} '
+                    f'{result["p95_ms"]:>8.2f} {result["p99_ms"]:>8.2f} {result["max_ms"]:>8.2f} '
+                    f'{result["queries_avg"]:>8.1f} {result["db_ms_avg"]:>7.2f} {result["body_kb_avg"]:>8.1f} '
+                    f'{result["peak_kb"] if result["peak_kb"] is not None else "-":>8} '
+                    f'{",".join(str(code) for code in result["status_codes"]):>7}'
+                )
+        finally:
+            cleanup()
+        return results
+
+    def build_scenarios(self, names):
+        """{name: [urls]}; each scenario cycles through a sample of real URLs"""
+        popular = list(
+            News.published.select_related('section', 'sub_section')
+            .order_by('-views__count', '-created_at')[:20]
+        )
+        recent = list(News.published.select_related('section', 'sub_section').order_by('-created_at')[:20])
+        sections = [item for item in NavbarItem.objects.filter(is_active=True) if item.get_slug()][:10]
+        subsections = [
+            item for item in SubSection.objects.filter(is_active=True, section__is_active=True).select_related('section')
+            if item.get_slug() and item.section.get_slug()
+        ][:10]
+        tags = list(Tag.objects.filter(news__isnull=False).distinct()[:10])
+
+        candidates = {
+            'home': ['/'],
+            # Half popular articles (mostly cached in production), half fresh ones
+            'news_detail': [news.get_absolute_url() for news in popular + recent],
+            'news_page_section': [section.get_absolute_url() for section in sections],
+            'news_page_subsection': [subsection.get_absolute_url() for subsection in subsections],
+            'topic_news_page': [f'/topic/{quote(tag.name)}/' for tag in tags],
+            'search_news': [f'/search/?q={quote(term)}' for term in SEARCH_TERMS],
+            'sitemap_index': ['/sitemap.xml'],
+            'google_news_sitemap': ['/sitemaps/news-sitemap.xml'],
+            'regular_news_sitemap': ['/sitemaps/regular-news-sitemap.xml'],
+            'news_sitemap_shard': [
+                f"/sitemaps/news-{shard['year']:04d}-{shard['month']:02d}.xml"
+                for shard in NewsSitemap().shards()[:3] if shard['page'] == 1
+            ],
+            'section_sitemap': ['/sitemaps/section-sitemap.xml'],
+            'topic_sitemap': ['/sitemaps/topic-sitemap.xml'],
+            'election_scoreboard_api': ['/api/election/scoreboard/'],
+            'redirect_short_url': [f'/s/{self.get_short_code()}/'] if 'redirect_short_url' in names else [],
+        }
+
+        scenarios = {}
+        for name in names:
+            urls = candidates[name]
+            if not urls:
+                self.stdout.write(self.style.WARNING(f'Skipping {name}: no matching rows in the database'))
+                continue
+            scenarios[name] = urls
+        return scenarios
+
+    def get_short_code(self):
+        short_url = ShortURL.objects.filter(short_code=BENCH_SHORT_CODE).first()
+        if short_url is None:
+            target = News.published.order_by('-created_at').first()
+            short_url = ShortURL.objects.create(original_url=f'https://example.com{target.get_absolute_url()}', short_code=BENCH_SHORT_CODE)
+            self.created_rows.append(short_url)
+        return short_url.short_code
+
+    # -- transports ----------------------------------------------------------------
+
+    def start_test_client(self):
+        client = Client(HTTP_HOST=benchmark_host())
+
+        def get(url, headers):
+            response = client.get(url, headers=headers)
+            # Streamed responses run their queries while being consumed
+            if response.streaming:
+                response.size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                response.size = len(response.content)
+            return response
+
+        def fetch(url, headers=None):
+            response, timings = count_queries(lambda: get(url, headers))
+            return response.status_code, timings, response.headers, response.size
+
+        return fetch, lambda: None
+
+    def start_wsgi_server(self):
+        from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+        from django.core.wsgi import get_wsgi_application
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        application = CountingWSGIApp(get_wsgi_application())
+        server = make_server('127.0.0.1', 0, application, handler_class=QuietHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        host = benchmark_host()
+        port = server.server_address[1]
+
+        def fetch(url, headers=None):
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            conn.request('GET', url, headers={'Host': host, **(headers or {})})
+            response = conn.getresponse()
+            size = len(response.read())
+            conn.close()
+            return response.status, application.last_timings, response.headers, size
+
+        def cleanup():
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(f'Local WSGI server on 127.0.0.1:{port}\n')
+        return fetch, cleanup
+
+    # -- measuring -----------------------------------------------------------------
+
+    def run_scenario(self, fetch, urls, options):
+        replay = {}
+        if options['conditional']:
+            for url in urls:
+                replay[url] = conditional_headers(fetch(url)[2])
+
+        for index in range(options['warmup']):
+            url = urls[index % len(urls)]
+            fetch(url, replay.get(url))
+
+        latencies = []
+        queries = []
+        db_times = []
+        sizes = []
+        status_codes = set()
+        errors = 0
+        started = time.perf_counter()
+        for index in range(options['iterations']):
+            url = urls[index % len(urls)]
+            request_started = time.perf_counter()
+            status, timings, _, size = fetch(url, replay.get(url))
+            latencies.append((time.perf_counter() - request_started) * 1000)
+            queries.append(timings.queries if timings else 0)
+            db_times.append(timings.db_time * 1000 if timings else 0)
+            sizes.append(size)
+            status_codes.add(status)
+            errors += status >= 400
+        elapsed = time.perf_counter() - started
+
+        peak_kb = None
+        if options['memory_iterations']:
+            peaks = []
+            tracemalloc.start()
+            try:
+                for index in range(options['memory_iterations']):
+                    tracemalloc.reset_peak()
+                    baseline = tracemalloc.get_traced_memory()[0]
+                    url = urls[index % len(urls)]
+                    fetch(url, replay.get(url))
+                    peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            finally:
+                tracemalloc.stop()
+            peak_kb = round(max(peaks) / 1024)
+
+        ordered = sorted(latencies)
+        return {
+            'urls': len(urls),
+            'requests': len(latencies),
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'min_ms': round(ordered[0], 3),
+            'p50_ms': round(percentile(ordered, 0.50), 3),
+            'p90_ms': round(percentile(ordered, 0.90), 3),
+            'p95_ms': round(percentile(ordered, 0.95), 3),
+            'p99_ms': round(percentile(ordered, 0.99), 3),
+            'max_ms': round(ordered[-1], 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'stdev_ms': round(statistics.pstdev(latencies), 3),
+            'queries_avg': round(statistics.fmean(queries), 2),
+            'queries_max': max(queries),
+            'db_ms_avg': round(statistics.fmean(db_times), 3),
+            'body_kb_avg': round(statistics.fmean(sizes) / 1024, 2),
+            'peak_kb': peak_kb,
+            'status_codes': sorted(status_codes),
+            'errors': errors,
+        }
+
+    def metadata(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+                cwd=str(getattr(settings, 'BASE_DIR', '.')),
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': commit,
+            'transport': 'wsgi' if options['wsgi'] else 'test-client',
+            'conditional': options['conditional'],
+            'iterations': options['iterations'],
+            'database': connection.vendor,
+            'news_count': News.objects.count(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'debug': settings.DEBUG,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    def compare(self, report, options):
+        try:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read {options["compare"]}: {e}')
+
+        self.stdout.write(f'\nCompared with {options["compare"]} (commit {baseline.get("meta", {}).get("commit")}):')
+        regressions = []
+        for name, result in report['results'].items():
+            old = baseline.get('results', {}).get(name)
+            if old is None:
+                continue
+            for metric in ('p50_ms', 'p95_ms'):
+                delta = result[metric] - old[metric]
+                change = delta / old[metric] * 100 if old[metric] else 0
+                line = f'  {name:<24} {metric:<7} {old[metric]:>9.2f} -> {result[metric]:>9.2f} ({change:+.1f}%)'
+                if change > options['threshold'] and delta > options['min_delta_ms']:
+                    regressions.append(line)
+                    self.stdout.write(self.style.ERROR(line))
+                else:
+                    self.stdout.write(line)
+            if result['queries_max'] > old['queries_max']:
+                line = f'  {name:<24} queries {old["queries_max"]:>9} -> {result["queries_max"]:>9}'
+                regressions.append(line)
+                self.stdout.write(self.style.ERROR(line))
+
+        if regressions:
+            raise CommandError(f'{len(regressions)} regression(s) above the {options["threshold"]}% threshold')
+        self.stdout.write(self.style.SUCCESS('No regressions'))
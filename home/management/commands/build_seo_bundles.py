@@ -0,0 +1,64 @@
+"""
+Rebuild every precomputed SEO bundle (see home.seo)
+
+Saves and deletes keep the bundles current on their own, and a missing or
+outdated bundle is built when its page is first rendered; run this after
+bulk imports that bypass the model signals, or after a deploy to build the
+bundles before the crawlers come:
+    python manage.py build_seo_bundles
+    python manage.py build_seo_bundles --kind news
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from home import seo
+from home.models import SEOBundle
+
+# Related rows the builders read, per kind
+RELATED = {
+    seo.NEWS: (('section', 'sub_section', 'seo'), ('category',)),
+    seo.SECTION: (('seo',), ()),
+    seo.SUBSECTION: (('section', 'seo'), ()),
+    seo.PAGE: (('seo',), ()),
+}
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the SEO meta tags and JSON-LD stored for news, sections, subsections and pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=list(seo.KINDS), action='append', help='Only these kinds (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        version = seo.version()
+        for kind in options['kind'] or seo.KINDS:
+            select, prefetch = RELATED[kind]
+            objects = (
+                seo.KINDS[kind].objects.select_related(*select).prefetch_related(*prefetch)
+                .order_by('pk').iterator(chunk_size=options['batch_size'])
+            )
+            batch = []
+            built = 0
+            for obj in objects:
+                batch.append(SEOBundle(kind=kind, object_id=obj.pk, version=version, **seo.render(kind, obj)))
+                if len(batch) >= options['batch_size']:
+                    built += self.store(batch)
+                    batch = []
+            built += self.store(batch)
+            # Bundles of objects deleted while the signals were bypassed
+            removed, _ = (
+                SEOBundle.objects.filter(kind=kind)
+                .exclude(object_id__in=seo.KINDS[kind].objects.values('pk')).delete()
+            )
+            self.stdout.write(f'{kind}: {built} built, {removed} removed')
+        self.stdout.write(self.style.SUCCESS(f'Built the SEO bundles ({time.perf_counter() - started:.1f}s)'))
+
+    def store(self, batch):
+        SEOBundle.objects.bulk_create(
+            batch, update_conflicts=True, unique_fields=['kind', 'object_id'],
+            update_fields=['version', 'meta_tags', 'json_ld', 'updated_at'],
+        )
+        return len(batch)
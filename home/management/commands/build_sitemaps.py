@@ -0,0 +1,26 @@
+"""
+Rebuild every pre-built sitemap file (see home.sitemap_builder)
+
+Saves and deletes keep the files current on their own; run this after
+bulk imports that bypass the model signals, or from cron as a safety net:
+    python manage.py build_sitemaps
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from home import sitemap_builder
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the sitemap files served from SITEMAP_ROOT'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        built, removed = sitemap_builder.build_all()
+        for name in removed:
+            self.stdout.write(f'removed: {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {len(built)} sitemap files in {sitemap_builder.sitemap_root()} '
+            f'({time.perf_counter() - started:.1f}s)'
+        ))
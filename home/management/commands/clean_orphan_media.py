@@ -0,0 +1,216 @@
+"""
+Find media files that nothing in the database references any more
+
+Usage:
+    python manage.py clean_orphan_media                  # report only
+    python manage.py clean_orphan_media --quarantine     # move orphans aside
+    python manage.py clean_orphan_media --quarantine --dry-run
+"""
+import hashlib
+import os
+import shutil
+import time
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlparse
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+
+from home import sitemap_builder
+
+
+def path_key(relative_path):
+    """
+    64-bit fingerprint of a media-relative path.
+    Keeping ints instead of strings keeps the reference set small even with
+    millions of rows. A collision can only make us keep a file, never delete one.
+    """
+    normalized = relative_path.replace('\\', '/').lstrip('/')
+    return int.from_bytes(hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class MediaReferenceParser(HTMLParser):
+    """Collect media URLs from rich text (CKEditor) content"""
+    URL_ATTRIBUTES = ('src', 'href', 'data-src', 'poster', 'data')
+
+    def __init__(self, media_prefix):
+        super().__init__(convert_charrefs=True)
+        self.media_prefix = media_prefix
+        self.paths = []
+
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if not value:
+                continue
+            if name in self.URL_ATTRIBUTES:
+                self._add(value)
+            elif name == 'srcset':
+                # srcset="a.webp 1x, b.webp 2x"
+                for candidate in value.split(','):
+                    candidate = candidate.strip().split(' ')[0]
+                    if candidate:
+                        self._add(candidate)
+
+    handle_startendtag = handle_starttag
+
+    def _add(self, url):
+        path = unquote(urlparse(url).path)
+        if path.startswith(self.media_prefix):
+            self.paths.append(path[len(self.media_prefix):])
+
+
+def iter_media_files(root, skip_dirs):
+    """
+    Walk the media tree with os.scandir, yielding (relative_path, stat) per file.
+    Uses an explicit stack so only one directory listing is open at a time.
+    """
+    stack = ['']
+    while stack:
+        relative_dir = stack.pop()
+        absolute_dir = os.path.join(root, relative_dir)
+        try:
+            with os.scandir(absolute_dir) as entries:
+                for entry in entries:
+                    relative_path = f'{relative_dir}/{entry.name}' if relative_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if os.path.realpath(entry.path) not in skip_dirs:
+                                stack.append(relative_path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield relative_path, entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+class Command(BaseCommand):
+    help = 'Report or quarantine media files that are not referenced by any model field or rich text content'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--quarantine', action='store_true',
+            help='Move orphaned files into the quarantine directory instead of only reporting them',
+        )
+        parser.add_argument(
+            '--quarantine-dir', default=None,
+            help='Where orphans are moved (default: <MEDIA_ROOT>/../media_quarantine/<timestamp>)',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Show what would be quarantined without touching any file',
+        )
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Only consider files older than this many hours, so in-flight uploads are left alone (default: 24)',
+        )
+        parser.add_argument(
+            '--exclude', action='append', default=[],
+            help='Media sub-directory to skip (can be given multiple times)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Rows fetched per round trip from the server-side cursor (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        media_root = os.path.realpath(settings.MEDIA_ROOT or '')
+        if not settings.MEDIA_ROOT or not os.path.isdir(media_root):
+            raise CommandError(f'MEDIA_ROOT does not exist: {settings.MEDIA_ROOT!r}')
+
+        quarantine = options['quarantine']
+        dry_run = options['dry_run']
+        quarantine_dir = options['quarantine_dir'] or os.path.join(
+            os.path.dirname(media_root), 'media_quarantine', time.strftime('%Y%m%d-%H%M%S')
+        )
+        quarantine_dir = os.path.realpath(quarantine_dir)
+
+        # Generated sitemaps are not referenced by any row either
+        skip_dirs = {quarantine_dir, os.path.realpath(sitemap_builder.sitemap_root())}
+        for excluded in options['exclude']:
+            skip_dirs.add(os.path.realpath(os.path.join(media_root, excluded)))
+
+        self.stdout.write('Collecting referenced media paths...')
+        referenced = self.collect_references(options['chunk_size'])
+        self.stdout.write(f'Found {len(referenced)} referenced paths')
+
+        cutoff = time.time() - options['min_age'] * 3600
+        scanned = orphan_count = orphan_bytes = moved = 0
+
+        for relative_path, stat in iter_media_files(media_root, skip_dirs):
+            scanned += 1
+            if path_key(relative_path) in referenced or stat.st_mtime > cutoff:
+                continue
+
+            orphan_count += 1
+            orphan_bytes += stat.st_size
+
+            if quarantine and not dry_run:
+                target = os.path.join(quarantine_dir, relative_path)
+                try:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.move(os.path.join(media_root, relative_path), target)
+                    moved += 1
+                except OSError as e:
+                    self.stderr.write(f'Could not move {relative_path}: {e}')
+                    continue
+
+            if options['verbosity'] >= 1:
+                prefix = 'would move' if quarantine and dry_run else ('moved' if quarantine else 'orphan')
+                self.stdout.write(f'{prefix}: {relative_path} ({stat.st_size} bytes)')
+
+        summary = (
+            f'Scanned {scanned} files, {orphan_count} orphaned '
+            f'({orphan_bytes / 1024 / 1024:.1f} MB)'
+        )
+        if quarantine and not dry_run:
+            summary += f', moved {moved} to {quarantine_dir}'
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def collect_references(self, chunk_size):
+        """Build the set of path keys referenced by file fields and rich text"""
+        referenced = set()
+        media_prefix = urlparse(settings.MEDIA_URL or '/media/').path
+
+        for model in apps.get_models():
+            if model._meta.proxy or not model._meta.managed:
+                continue
+
+            file_fields = []
+            text_fields = []
+            for field in model._meta.concrete_fields:
+                if isinstance(field, models.FileField):
+                    file_fields.append(field.attname)
+                elif field.get_internal_type() == 'TextField':
+                    # CKEditor5Field is a plain Field with a TextField column
+                    text_fields.append(field.attname)
+
+            if file_fields:
+                rows = model._base_manager.values_list(*file_fields).iterator(chunk_size=chunk_size)
+                for row in rows:
+                    for value in row:
+                        if value:
+                            referenced.add(path_key(value))
+
+            for field_name in text_fields:
+                # Only rows that mention the media URL at all need to be parsed
+                rows = (
+                    model._base_manager
+                    .filter(**{f'{field_name}__contains': media_prefix})
+                    .values_list(field_name, flat=True)
+                    .iterator(chunk_size=chunk_size)
+                )
+                for content in rows:
+                    parser = MediaReferenceParser(media_prefix)
+                    try:
+                        parser.feed(content)
+                        parser.close()
+                    except Exception:
+                        # Keep whatever was collected before the markup broke
+                        pass
+                    for path in parser.paths:
+                        referenced.add(path_key(path))
+
+        return referenced
@@ -0,0 +1,368 @@
+"""
+Fill the database with a synthetic Bangla news corpus for load tests and benchmarks
+
+Usage:
+    python manage.py generate_corpus --news 100000
+    python manage.py generate_corpus --news 5000 --days 30 --seed 7
+    python manage.py generate_corpus --clear                  # remove a previous corpus
+
+Rows are written with bulk_create in batches, so no save() or signal runs:
+no image processing, no snapshot invalidation, no sitemap rebuild (run
+`build_sitemaps` afterwards). Generated articles are marked
+by their reporter (CORPUS_REPORTER) so --clear only removes them. Sections
+and subsections come from the active NavbarItem/SubSection rows (a default
+set is created when there are none) and every article uses one of a few
+placeholder images written to MEDIA_ROOT/news/corpus/.
+"""
+import contextlib
+import os
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from home.models import Category, NavbarItem, News, NewsReaction, NewsView, Review, SubSection, Tag
+
+CORPUS_REPORTER = 'জাগরণ সংবাদ ডেস্ক (synthetic)'
+
+# Category name -> share of the articles that get it
+CATEGORY_SHARES = {
+    'প্রধান খবর': 0.05,
+    'নির্বাচিত খবর': 0.05,
+    'Hot Topic': 0.05,
+    'লাইভ': 0.005,
+}
+
+DEFAULT_SECTIONS = [
+    ('জাতীয়', 'national', ['রাজধানী', 'সারাদেশ']),
+    ('রাজনীতি', 'politics', ['নির্বাচন', 'সংসদ']),
+    ('আন্তর্জাতিক', 'international', ['এশিয়া', 'ইউরোপ']),
+    ('অর্থনীতি', 'economy', ['শেয়ারবাজার', 'ব্যাংক']),
+    ('খেলা', 'sports', ['ক্রিকেট', 'ফুটবল']),
+    ('বিনোদন', 'entertainment', ['চলচ্চিত্র', 'সংগীত']),
+    ('প্রযুক্তি', 'technology', []),
+    ('শিক্ষা', 'education', []),
+]
+SUBSECTION_SLUGS = {
+    'রাজধানী': 'capital', 'সারাদেশ': 'country', 'নির্বাচন': 'election', 'সংসদ': 'parliament',
+    'এশিয়া': 'asia', 'ইউরোপ': 'europe', 'শেয়ারবাজার': 'stock-market', 'ব্যাংক': 'bank',
+    'ক্রিকেট': 'cricket', 'ফুটবল': 'football', 'চলচ্চিত্র': 'cinema', 'সংগীত': 'music',
+}
+
+SUBJECTS = [
+    'সরকার', 'প্রধানমন্ত্রী', 'নির্বাচন কমিশন', 'বাংলাদেশ ব্যাংক', 'শিক্ষা মন্ত্রণালয়', 'ঢাকা সিটি করপোরেশন',
+    'জাতীয় দল', 'পুলিশ', 'আদালত', 'বিশ্বব্যাংক', 'কৃষকেরা', 'শিক্ষার্থীরা', 'ব্যবসায়ীরা', 'স্বাস্থ্য অধিদপ্তর',
+    'আবহাওয়া অফিস', 'রেলওয়ে', 'বিমানবন্দর কর্তৃপক্ষ', 'পোশাকশ্রমিকেরা', 'বিরোধী দল', 'জাতিসংঘ',
+]
+OBJECTS = [
+    'নতুন বাজেট', 'বন্যা পরিস্থিতি', 'দ্রব্যমূল্য', 'সড়ক নিরাপত্তা', 'ডিজিটাল সেবা', 'বিদ্যুৎ সরবরাহ',
+    'রপ্তানি আয়', 'টেস্ট সিরিজ', 'ভর্তি পরীক্ষা', 'ডেঙ্গু সংক্রমণ', 'মেট্রোরেল', 'পদ্মা সেতু', 'জলবায়ু পরিবর্তন',
+    'রেমিট্যান্স প্রবাহ', 'স্থানীয় সরকার নির্বাচন', 'চালের দাম', 'নদীভাঙন', 'বিনিয়োগ', 'তথ্যপ্রযুক্তি খাত', 'পর্যটন',
+]
+VERBS = [
+    'নিয়ে বৈঠক করেছে', 'বিষয়ে নতুন সিদ্ধান্ত নিয়েছে', 'নিয়ে উদ্বেগ প্রকাশ করেছে', 'নিয়ে প্রতিবেদন প্রকাশ করেছে',
+    'মোকাবিলায় প্রস্তুতি নিচ্ছে', 'নিয়ে আলোচনা শুরু করেছে', 'বিষয়ে সতর্ক করেছে', 'নিয়ে পরিকল্পনা ঘোষণা করেছে',
+    'বাস্তবায়নে সময় চেয়েছে', 'নিয়ে মতবিনিময় করেছে',
+]
+PLACES = [
+    'ঢাকায়', 'চট্টগ্রামে', 'রাজশাহীতে', 'খুলনায়', 'সিলেটে', 'বরিশালে', 'রংপুরে', 'ময়মনসিংহে', 'কুমিল্লায়', 'গাজীপুরে',
+]
+DETAILS = [
+    'সংশ্লিষ্ট কর্মকর্তারা বিষয়টি নিশ্চিত করেছেন', 'এ বিষয়ে আগামী সপ্তাহে আরও আলোচনা হবে',
+    'বিশেষজ্ঞরা বলছেন পরিস্থিতি দ্রুত বদলাচ্ছে', 'স্থানীয় বাসিন্দারা দ্রুত সমাধান দাবি করেছেন',
+    'গত বছরের তুলনায় এ সংখ্যা উল্লেখযোগ্যভাবে বেড়েছে', 'প্রাথমিক হিসাবে ক্ষতির পরিমাণ কয়েক কোটি টাকা',
+    'বিস্তারিত তথ্য এখনো পাওয়া যায়নি', 'কর্তৃপক্ষ জানিয়েছে কাজ নির্ধারিত সময়েই শেষ হবে',
+    'সংবাদ সম্মেলনে এসব তথ্য জানানো হয়', 'বিষয়টি তদন্তে একটি কমিটি গঠন করা হয়েছে',
+]
+REVIEW_COMMENTS = [
+    'খুব গুরুত্বপূর্ণ সংবাদ', 'ধন্যবাদ জাগরণকে', 'বিস্তারিত জানতে চাই', 'সময়োপযোগী প্রতিবেদন',
+    'এ বিষয়ে আরও অনুসন্ধান দরকার', 'ভালো লিখেছেন', 'সরকারের দ্রুত পদক্ষেপ নেওয়া উচিত', 'তথ্যবহুল লেখা',
+]
+TAG_WORDS = [
+    'বাজেট', 'নির্বাচন', 'ক্রিকেট', 'ফুটবল', 'বন্যা', 'ডেঙ্গু', 'মেট্রোরেল', 'শেয়ারবাজার', 'রেমিট্যান্স', 'জলবায়ু',
+    'শিক্ষা', 'স্বাস্থ্য', 'প্রযুক্তি', 'কৃষি', 'বাণিজ্য', 'আদালত', 'সংসদ', 'পরিবেশ', 'সড়ক', 'বিদ্যুৎ',
+    'রোহিঙ্গা', 'পোশাকশিল্প', 'পর্যটন', 'চলচ্চিত্র', 'সংগীত', 'ঈদ', 'পদ্মা', 'ঢাকা', 'চট্টগ্রাম', 'সিলেট',
+]
+PLACEHOLDER_COLORS = [(180, 30, 40), (30, 90, 160), (40, 130, 70), (200, 120, 20), (90, 60, 140), (60, 60, 60)]
+
+
+@contextlib.contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we set"""
+    changed = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                changed.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in changed:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic Bangla news corpus (news, tags, categories, views, reactions, reviews) with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=1000, help='Number of articles to create (default: 1000)')
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='Spread publication dates over this many days before now (default: 365)',
+        )
+        parser.add_argument('--tags', type=int, default=500, help='Size of the tag vocabulary (default: 500)')
+        parser.add_argument(
+            '--max-views', type=int, default=200000,
+            help='View count of the most read article; the others follow a Zipf distribution (default: 200000)',
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1, help='Zipf exponent of the view distribution (default: 1.1)',
+        )
+        parser.add_argument(
+            '--scheduled', type=float, default=0.01,
+            help='Share of articles scheduled in the future (default: 0.01)',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk insert (default: 2000)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for a reproducible corpus')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete the articles of a previous run (and their views, reactions and reviews) and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = News.objects.filter(reporter=CORPUS_REPORTER).delete()
+            Tag.objects.filter(slug__startswith='corpus-').delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} rows of the synthetic corpus'))
+            return
+
+        if options['news'] <= 0:
+            raise CommandError('--news must be positive')
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        sections = self.get_sections()
+        categories = self.get_categories()
+        tag_ids = self.create_tags(options['tags'])
+        images = self.create_placeholder_images()
+        self.sentences = self.build_sentences(2000)
+
+        articles = []
+        total = options['news']
+        with explicit_timestamps(News):
+            for offset in range(0, total, self.batch_size):
+                count = min(self.batch_size, total - offset)
+                articles.extend(self.create_news_batch(count, sections, images, options))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'  {offset + count}/{total} articles ({(offset + count) / elapsed:.0f}/s)')
+
+        news_ids = [news_id for news_id, _ in articles]
+        self.create_relations(news_ids, categories, tag_ids)
+        views = self.create_views(news_ids, options['max_views'], options['zipf'])
+        with explicit_timestamps(NewsReaction, Review):
+            reactions, reviews = self.create_engagement(articles, views)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(news_ids)} articles, {len(tag_ids)} tags, {reactions} reactions and '
+            f'{reviews} reviews in {elapsed:.1f}s ({len(news_ids) / elapsed:.0f} articles/s)'
+        ))
+
+    # -- reference data --------------------------------------------------------
+
+    def get_sections(self):
+        """[(section, [subsections])] of the active navigation"""
+        sections = list(NavbarItem.objects.filter(is_active=True).exclude(english_title__isnull=True).order_by('position'))
+        if not sections:
+            self.stdout.write('No sections found, creating the default set')
+            for position, (title, slug, subsections) in enumerate(DEFAULT_SECTIONS, start=1):
+                section = NavbarItem.objects.create(title=title, english_title=slug, link=f'/{slug}/', position=position)
+                for sub_position, sub_title in enumerate(subsections, start=1):
+                    SubSection.objects.create(
+                        section=section, title=sub_title, english_title=SUBSECTION_SLUGS[sub_title], position=sub_position,
+                    )
+                sections.append(section)
+
+        subsections = {}
+        for subsection in SubSection.objects.filter(is_active=True, section__in=sections):
+            subsections.setdefault(subsection.section_id, []).append(subsection)
+        return [(section, subsections.get(section.id, [])) for section in sections]
+
+    def get_categories(self):
+        """[(category, share)] with the categories the home page looks for"""
+        categories = []
+        for name, share in CATEGORY_SHARES.items():
+            category = Category.objects.filter(name=name).first() or Category.objects.create(name=name)
+            categories.append((category, share))
+        return categories
+
+    def create_tags(self, count):
+        names = set(Tag.objects.values_list('name', flat=True))
+        tags = []
+        index = 0
+        while len(tags) < count:
+            index += 1
+            words = self.random.sample(TAG_WORDS, 2 if index > len(TAG_WORDS) else 1)
+            name = ' '.join(words)
+            if name in names:
+                name = f'{name} {index}'
+            if name in names:
+                continue
+            names.add(name)
+            tags.append(Tag(name=name, slug=f'corpus-{index}'))
+        Tag.objects.bulk_create(tags, batch_size=self.batch_size, ignore_conflicts=True)
+        return list(Tag.objects.filter(slug__startswith='corpus-').values_list('id', flat=True))
+
+    def create_placeholder_images(self):
+        """A few solid-color JPEGs shared by every generated article"""
+        try:
+            from PIL import Image, ImageDraw
+        except ImportError:
+            raise CommandError('Pillow is required for the placeholder images')
+
+        directory = os.path.join(settings.MEDIA_ROOT, 'news', 'corpus')
+        os.makedirs(directory, exist_ok=True)
+        names = []
+        for index, color in enumerate(PLACEHOLDER_COLORS):
+            name = f'news/corpus/placeholder-{index}.jpg'
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            if not os.path.exists(path):
+                image = Image.new('RGB', (1280, 720), color)
+                draw = ImageDraw.Draw(image)
+                draw.rectangle((80, 80, 1200, 640), outline=(255, 255, 255), width=12)
+                image.save(path, 'JPEG', quality=70)
+            names.append(name)
+        return names
+
+    def build_sentences(self, count):
+        """A pool of sentences; articles are assembled from it instead of from single words"""
+        sentences = []
+        for _ in range(count):
+            sentence = (
+                f'{self.random.choice(PLACES)} {self.random.choice(SUBJECTS)} {self.random.choice(OBJECTS)} '
+                f'{self.random.choice(VERBS)}। {self.random.choice(DETAILS)}।'
+            )
+            sentences.append(sentence)
+        return sentences
+
+    # -- articles ----------------------------------------------------------------
+
+    def make_title(self):
+        return f'{self.random.choice(SUBJECTS)} {self.random.choice(OBJECTS)} {self.random.choice(VERBS)}'
+
+    def make_body(self):
+        paragraphs = []
+        for _ in range(self.random.randint(4, 10)):
+            paragraphs.append('<p>' + ' '.join(self.random.choices(self.sentences, k=self.random.randint(2, 5))) + '</p>')
+        return '\n'.join(paragraphs)
+
+    def create_news_batch(self, count, sections, images, options):
+        now = timezone.now()
+        span = options['days'] * 86400
+        rows = []
+        for _ in range(count):
+            section, subsections = self.random.choice(sections)
+            # Newer articles are more frequent, as in a real archive
+            created_at = now - timedelta(seconds=int(span * self.random.random() ** 1.5))
+            scheduled_at = None
+            if self.random.random() < options['scheduled']:
+                scheduled_at = now + timedelta(hours=self.random.randint(1, 72))
+            rows.append(News(
+                section=section,
+                sub_section=self.random.choice(subsections) if subsections and self.random.random() < 0.6 else None,
+                top_sub_title=self.random.choice(PLACES) if self.random.random() < 0.3 else None,
+                title=self.make_title(),
+                sub_title=self.random.choice(DETAILS) if self.random.random() < 0.4 else None,
+                sub_content=' '.join(self.random.choices(self.sentences, k=2)),
+                news_content=self.make_body(),
+                heading_image=self.random.choice(images),
+                heading_image_title=self.random.choice(OBJECTS),
+                reporter=CORPUS_REPORTER,
+                created_at=created_at,
+                updated_at=created_at + timedelta(minutes=self.random.randint(0, 240)),
+                scheduled_publish_at=scheduled_at,
+            ))
+
+        with transaction.atomic():
+            created = News.objects.bulk_create(rows)
+        if created and created[0].pk is not None:
+            return [(news.pk, news.created_at) for news in created]
+        # Backends without RETURNING: the batch got the highest ids of the marker rows
+        rows = News.objects.filter(reporter=CORPUS_REPORTER).order_by('-id').values_list('id', 'created_at')[:count]
+        return sorted(rows)
+
+    def create_relations(self, news_ids, categories, tag_ids):
+        CategoryLink = News.category.through
+        TagLink = News.tags.through
+        category_links = []
+        tag_links = []
+        for news_id in news_ids:
+            for category, share in categories:
+                if self.random.random() < share:
+                    category_links.append(CategoryLink(news_id=news_id, category_id=category.id))
+            if tag_ids:
+                for tag_id in self.random.sample(tag_ids, min(len(tag_ids), self.random.randint(1, 5))):
+                    tag_links.append(TagLink(news_id=news_id, tag_id=tag_id))
+
+        with transaction.atomic():
+            CategoryLink.objects.bulk_create(category_links, batch_size=self.batch_size)
+            TagLink.objects.bulk_create(tag_links, batch_size=self.batch_size)
+        self.stdout.write(f'  {len(category_links)} category and {len(tag_links)} tag links')
+
+    def create_views(self, news_ids, max_views, exponent):
+        """Zipf-distributed view counts over a random popularity ranking; returns {news_id: views}"""
+        ranking = list(news_ids)
+        self.random.shuffle(ranking)
+        views = {news_id: max(int(max_views / rank ** exponent), 1) for rank, news_id in enumerate(ranking, start=1)}
+        with transaction.atomic():
+            NewsView.objects.bulk_create(
+                [NewsView(news_id=news_id, count=count) for news_id, count in views.items()],
+                batch_size=self.batch_size,
+            )
+        return views
+
+    def create_engagement(self, articles, views):
+        """Reactions and reviews roughly proportional to the views, dated after publication"""
+        now = timezone.now()
+        reaction_names = [name for name, _ in NewsReaction.REACTIONS]
+        reactions = []
+        reviews = []
+        reaction_count = review_count = 0
+
+        def flush():
+            with transaction.atomic():
+                NewsReaction.objects.bulk_create(reactions, batch_size=self.batch_size)
+                Review.objects.bulk_create(reviews, batch_size=self.batch_size)
+            reactions.clear()
+            reviews.clear()
+
+        for news_id, created_at in articles:
+            article_views = views[news_id]
+            age = max(int((now - created_at).total_seconds()), 1)
+            for _ in range(min(article_views // 500, 200)):
+                reactions.append(NewsReaction(
+                    news_id=news_id,
+                    reaction=self.random.choice(reaction_names),
+                    created_at=created_at + timedelta(seconds=self.random.randint(0, age)),
+                ))
+            for _ in range(min(article_views // 5000, 30)):
+                reviews.append(Review(
+                    news_id=news_id,
+                    comment=self.random.choice(REVIEW_COMMENTS),
+                    created_at=created_at + timedelta(seconds=self.random.randint(0, age)),
+                ))
+            if len(reactions) + len(reviews) >= self.batch_size * 5:
+                reaction_count += len(reactions)
+                review_count += len(reviews)
+                flush()
+
+        reaction_count += len(reactions)
+        review_count += len(reviews)
+        flush()
+        return reaction_count, review_count
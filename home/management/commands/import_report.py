@@ -0,0 +1,105 @@
+"""
+Report what a web worker pays at start-up: import time per module, RSS and threads
+
+Starts a fresh interpreter with `python -X importtime`, loads the WSGI
+application and the URLconf (what a worker does before its first request),
+then summarizes the import log.
+
+Usage:
+    python manage.py import_report
+    python manage.py import_report --top 40 --entry core.asgi
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+HEAVY_PACKAGES = ('numpy', 'scipy', 'rembg', 'onnxruntime', 'bs4', 'fontTools')
+
+IMPORT_LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+# Runs in the child interpreter
+CHILD_SCRIPT = """
+import importlib, sys
+importlib.import_module({entry!r})
+from django.urls import get_resolver
+get_resolver().url_patterns
+status = {{}}
+try:
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            status[key] = value.strip()
+except OSError:
+    pass
+print('RSS=' + status.get('VmRSS', '?'))
+print('THREADS=' + status.get('Threads', '?'))
+print('MODULES=%d' % len(sys.modules))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Show per-module import cost, RSS and thread count of a freshly started worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entry', default='core.wsgi', help='Module the worker imports (default: core.wsgi)')
+        parser.add_argument('--top', type=int, default=25, help='Number of modules to list (default: 25)')
+
+    def handle(self, *args, **options):
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(settings.BASE_DIR), env.get('PYTHONPATH')]))
+
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT.format(entry=options['entry'])],
+            cwd=str(settings.BASE_DIR), env=env, capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - started
+        if result.returncode != 0:
+            raise CommandError(f'Worker start-up failed:\n{result.stderr[-4000:]}')
+
+        self_times = {}
+        cumulative_times = {}
+        package_times = defaultdict(int)
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE_RE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, _, module = match.groups()
+            self_times[module] = int(self_us)
+            cumulative_times[module] = int(cumulative_us)
+            package_times[module.split('.')[0]] += int(self_us)
+
+        facts = dict(line.split('=', 1) for line in result.stdout.splitlines() if '=' in line)
+        total_ms = sum(self_times.values()) / 1000
+
+        self.stdout.write(f'Entry point: {options["entry"]}')
+        self.stdout.write(
+            f'Start-up: {wall * 1000:.0f} ms wall, {total_ms:.0f} ms importing, '
+            f'{facts.get("MODULES", "?")} modules, RSS {facts.get("RSS", "?")}, '
+            f'threads {facts.get("THREADS", "?")}\n'
+        )
+
+        self.stdout.write(f'{"package":<40} {"self ms":>10}')
+        for package, us in sorted(package_times.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'{package:<40} {us / 1000:>10.1f}')
+
+        self.stdout.write(f'\n{"module":<50} {"self ms":>10} {"cumul. ms":>10}')
+        for module, us in sorted(self_times.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'{module:<50} {us / 1000:>10.1f} {cumulative_times[module] / 1000:>10.1f}')
+
+        # Heavy optional dependencies should only load in the code paths that need them.
+        # PIL.Image itself is cheap (django_ckeditor_5.views imports it), its format plugins are not.
+        heavy = sorted(
+            name for name in self_times
+            if name.split('.')[0] in HEAVY_PACKAGES or (name.startswith('PIL.') and name.endswith('ImagePlugin'))
+        )
+        if heavy:
+            self.stdout.write(self.style.WARNING(f'\nImported at start-up: {", ".join(heavy)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nNo heavy optional dependency imported at start-up'))
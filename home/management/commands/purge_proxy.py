@@ -0,0 +1,191 @@
+"""
+A small caching reverse proxy that understands surrogate-key purges, for
+trying home.purge locally without a CDN:
+
+    python manage.py runserver 8000
+    python manage.py purge_proxy --upstream http://127.0.0.1:8000 --port 8080
+
+and in the settings:
+    PURGE_ENDPOINT = 'http://127.0.0.1:8080/.purge'
+
+Anonymous GET responses that carry surrogate keys are kept for their
+s-maxage, or --ttl seconds without one (X-Cache: HIT/MISS tells which).
+A POST to the purge path with {"keys": [...]} drops every cached page
+tagged with one of the keys.
+Requests with a session cookie and everything else go straight upstream.
+"""
+import http.client
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Not forwarded in either direction
+HOP_BY_HOP = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade',
+}
+
+S_MAXAGE_RE = re.compile(r's-maxage=(\d+)')
+
+
+class SurrogateCache:
+    """url -> response, with an index from surrogate key to urls"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.keys = {}
+
+    def get(self, url):
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None or entry['expires'] < time.monotonic():
+                return None
+            return entry
+
+    def put(self, url, status, headers, body, keys, ttl=None):
+        with self.lock:
+            self.entries[url] = {
+                'status': status, 'headers': headers, 'body': body,
+                'keys': keys, 'expires': time.monotonic() + (self.ttl if ttl is None else ttl),
+            }
+            for key in keys:
+                self.keys.setdefault(key, set()).add(url)
+
+    def purge(self, keys):
+        """Drop every url tagged with one of the keys; returns how many"""
+        with self.lock:
+            urls = set()
+            for key in keys:
+                urls |= self.keys.pop(key, set())
+            for url in urls:
+                entry = self.entries.pop(url, None)
+                for key in entry['keys'] if entry else ():
+                    if key in self.keys:
+                        self.keys[key].discard(url)
+            return len(urls)
+
+
+def make_handler(upstream, purge_path, key_header, cache, stdout):
+    target = urlsplit(upstream)
+    session_cookie = getattr(settings, 'SESSION_COOKIE_NAME', 'sessionid')
+
+    class ProxyHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            stdout.write(f'{self.address_string()} {format % args}')
+
+        def send(self, status, headers, body, cache_status=None):
+            self.send_response(status)
+            for name, value in headers:
+                if name.lower() not in HOP_BY_HOP and name.lower() != 'content-length':
+                    self.send_header(name, value)
+            if cache_status:
+                self.send_header('X-Cache', cache_status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def forward(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else None
+            headers = {name: value for name, value in self.headers.items() if name.lower() not in HOP_BY_HOP}
+            headers['Host'] = self.headers.get('Host', target.netloc)
+            headers['X-Forwarded-For'] = self.client_address[0]
+            connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+            try:
+                connection.request(self.command, self.path, body=body, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.getheaders(), response.read()
+            finally:
+                connection.close()
+
+        def cacheable(self, status, headers):
+            names = {name.lower(): value for name, value in headers}
+            cache_control = names.get('cache-control', '').lower()
+            return (
+                status == 200
+                and key_header.lower() in names
+                and 'set-cookie' not in names
+                and 'private' not in cache_control
+                and 'no-store' not in cache_control
+            )
+
+        def do_GET(self):
+            if f'{session_cookie}=' in self.headers.get('Cookie', ''):
+                self.send(*self.forward(), cache_status='PASS')
+                return
+            entry = cache.get(self.path)
+            if entry is not None:
+                self.send(entry['status'], entry['headers'], entry['body'], cache_status='HIT')
+                return
+            status, headers, body = self.forward()
+            if self.command == 'GET' and self.cacheable(status, headers):
+                names = {name.lower(): value for name, value in headers}
+                match = S_MAXAGE_RE.search(names.get('cache-control', ''))
+                cache.put(
+                    self.path, status, headers, body, names[key_header.lower()].split(),
+                    int(match.group(1)) if match else None,
+                )
+            self.send(status, headers, body, cache_status='MISS')
+
+        do_HEAD = do_GET
+
+        def do_POST(self):
+            if self.path != purge_path:
+                self.send(*self.forward())
+                return
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                keys = json.loads(self.rfile.read(length) or b'{}').get('keys') or []
+            except ValueError:
+                keys = []
+            keys = keys or self.headers.get(key_header, '').split()
+            purged = cache.purge(keys)
+            stdout.write(f'purge {" ".join(keys)}: {purged} pages')
+            self.send(200, [('Content-Type', 'application/json')], json.dumps({'purged': purged}).encode('utf-8'))
+
+        def do_other(self):
+            self.send(*self.forward())
+
+        do_PUT = do_PATCH = do_DELETE = do_OPTIONS = do_other
+
+    return ProxyHandler
+
+
+class Command(BaseCommand):
+    help = 'Run a caching proxy in front of the site that purges by surrogate key (for local tests)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--upstream', default='http://127.0.0.1:8000', help='URL of the Django server')
+        parser.add_argument('--port', type=int, default=8080)
+        parser.add_argument('--bind', default='127.0.0.1')
+        parser.add_argument('--purge-path', default='/.purge', help='Path that accepts purge requests')
+        parser.add_argument('--ttl', type=int, default=300, help='Seconds a page is kept')
+
+    def handle(self, *args, **options):
+        cache = SurrogateCache(options['ttl'])
+        handler = make_handler(
+            options['upstream'], options['purge_path'],
+            getattr(settings, 'SURROGATE_KEY_HEADER', 'Surrogate-Key'), cache, self.stdout,
+        )
+        server = ThreadingHTTPServer((options['bind'], options['port']), handler)
+        self.stdout.write(self.style.SUCCESS(
+            f"Caching {options['upstream']} on http://{options['bind']}:{options['port']}/, "
+            f"purges at {options['purge_path']}"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
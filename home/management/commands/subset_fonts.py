@@ -0,0 +1,152 @@
+"""
+Subset the Bangla web fonts to the glyphs the site actually uses
+
+Writes one WOFF2 file per font and unicode-range (Bangla, Latin) to
+static/fonts/subset/ plus the matching @font-face rules to
+static/fonts/subset/fonts.css. The browser only downloads the range files
+whose characters appear on the page.
+
+Build-time only (the output is committed):
+    pip install fonttools brotli
+    python manage.py subset_fonts
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Fonts base.html uses: (source file, family, weight)
+FONT_FACES = [
+    ('NotoSerifBengali-Medium.ttf', 'Noto Serif Bengali', 600),
+    ('NotoSerifBengali-Bold.ttf', 'Noto Serif Bengali', 700),
+]
+
+# name -> list of (first, last) code points
+UNICODE_RANGES = {
+    'bangla': [
+        (0x0964, 0x0965),  # danda, double danda
+        (0x0980, 0x09FF),  # Bengali block
+        (0x200C, 0x200D),  # ZWNJ / ZWJ, needed for conjunct control
+        (0x25CC, 0x25CC),  # dotted circle for stray vowel signs
+    ],
+    'latin': [
+        (0x0020, 0x007E),  # ASCII digits, letters, punctuation
+        (0x00A0, 0x00A0),
+        (0x2013, 0x2014),  # en / em dash
+        (0x2018, 0x201D),  # curly quotes
+        (0x2026, 0x2026),  # ellipsis
+    ],
+}
+
+CSS_TEMPLATE = """@font-face {{
+    font-family: '{family}';
+    src: url('{filename}') format('woff2');
+    font-weight: {weight};
+    font-style: normal;
+    font-display: swap;
+    unicode-range: {unicode_range};
+}}
+"""
+
+
+def format_unicode_range(ranges):
+    """CSS unicode-range value, e.g. U+0980-09FF, U+25CC"""
+    parts = []
+    for first, last in ranges:
+        if first == last:
+            parts.append(f'U+{first:04X}')
+        else:
+            parts.append(f'U+{first:04X}-{last:04X}')
+    return ', '.join(parts)
+
+
+class Command(BaseCommand):
+    help = 'Subset static/fonts to Bangla + Latin glyphs and emit WOFF2 files with unicode-range @font-face rules'
+
+    def add_arguments(self, parser):
+        default_source = os.path.join(settings.BASE_DIR, 'static', 'fonts')
+        parser.add_argument('--source', default=default_source, help='Directory with the original .ttf files')
+        parser.add_argument(
+            '--output', default=None,
+            help='Where the WOFF2 files and fonts.css are written (default: <source>/subset)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from fontTools import subset
+            import brotli  # noqa: F401 - fontTools needs it for WOFF2
+        except ImportError:
+            raise CommandError('subset_fonts needs fonttools and brotli: pip install fonttools brotli')
+
+        source = options['source']
+        output = options['output'] or os.path.join(source, 'subset')
+        os.makedirs(output, exist_ok=True)
+
+        css = []
+        report = []
+        for filename, family, weight in FONT_FACES:
+            source_path = os.path.join(source, filename)
+            if not os.path.exists(source_path):
+                raise CommandError(f'Font not found: {source_path}')
+            base_name = os.path.splitext(filename)[0]
+            original_size = os.path.getsize(source_path)
+
+            subset_sizes = {}
+            for range_name, ranges in UNICODE_RANGES.items():
+                unicodes = [code for first, last in ranges for code in range(first, last + 1)]
+
+                subset_options = subset.Options()
+                subset_options.flavor = 'woff2'
+                # Keep every GSUB/GPOS feature: Bangla conjuncts and vowel signs depend on them
+                subset_options.layout_features = ['*']
+                subset_options.hinting = False
+                subset_options.desubroutinize = True
+                subset_options.drop_tables += ['meta']
+
+                font = subset.load_font(source_path, subset_options)
+                subsetter = subset.Subsetter(subset_options)
+                subsetter.populate(unicodes=unicodes)
+                subsetter.subset(font)
+
+                out_name = f'{base_name}.{range_name}.woff2'
+                subset.save_font(font, os.path.join(output, out_name), subset_options)
+                font.close()
+
+                subset_sizes[range_name] = os.path.getsize(os.path.join(output, out_name))
+                css.append(CSS_TEMPLATE.format(
+                    family=family, filename=out_name, weight=weight,
+                    unicode_range=format_unicode_range(ranges),
+                ))
+
+            report.append((filename, original_size, subset_sizes))
+
+        with open(os.path.join(output, 'fonts.css'), 'w') as f:
+            f.write('/* Generated by `python manage.py subset_fonts`, do not edit */\n')
+            f.write('\n'.join(css))
+
+        self.write_report(report)
+
+    def write_report(self, report):
+        """Bytes a page downloads per font, before and after"""
+        range_names = list(UNICODE_RANGES)
+        header = f'{"font":<30} {"ttf":>10} ' + ' '.join(f'{name:>10}' for name in range_names) + f' {"saved":>8}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        total_before = total_after = 0
+        for filename, original_size, subset_sizes in report:
+            after = sum(subset_sizes.values())
+            total_before += original_size
+            total_after += after
+            self.stdout.write(
+                f'{filename:<30} {original_size:>10} '
+                + ' '.join(f'{subset_sizes[name]:>10}' for name in range_names)
+                + f' {100 - after * 100 / original_size:>7.1f}%'
+            )
+
+        bangla_only = sum(sizes['bangla'] for _, _, sizes in report)
+        self.stdout.write('-' * len(header))
+        self.stdout.write(self.style.SUCCESS(
+            f'Font bytes per page: {total_before} before, {total_after} after (all ranges), '
+            f'{bangla_only} for a Bangla-only page'
+        ))
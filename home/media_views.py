@@ -0,0 +1,259 @@
+"""
+Production serving for /media/ and /static/ files
+
+Replaces django.views.static.serve with a view that:
+- hands the file to the front-end server (X-Accel-Redirect / X-Sendfile) when configured
+- otherwise returns a FileResponse the WSGI server can push with os.sendfile
+- answers Range requests (PDF viewers), ETag and If-Modified-Since validators
+- picks the .br/.gz siblings of static files and marks fingerprinted names immutable
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Bigger chunks for the pure-Python fallback (FileResponse defaults to 4 KB)
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# name.0123456789ab.css as written by ManifestStaticFilesStorage
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Preference order when the client accepts several encodings
+PRECOMPRESSED_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+DEFAULT_CACHE_MAX_AGE = {
+    'media': 7 * 24 * 60 * 60,
+    'static': 24 * 60 * 60,
+    'sitemap': 10 * 60,
+}
+
+# Kinds of files written with .br/.gz siblings (collectstatic, home.sitemap_builder)
+PRECOMPRESSED_KINDS = ('static', 'sitemap')
+
+
+class FileRange:
+    """
+    File-like view of bytes [start, start + length) of an open file.
+    Keeps fileno() so the WSGI server can still use os.sendfile, which sends
+    Content-Length bytes from the current offset of the descriptor.
+    """
+    def __init__(self, fileobj, start, length):
+        self.file = fileobj
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(stat):
+    """Validator from size and modification time (no file read needed), same idea as nginx"""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _etag_matches(etag, header):
+    """Weak comparison as required for If-None-Match / If-Range"""
+    if not header:
+        return False
+    etags = parse_etags(header)
+    if '*' in etags:
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return any((e[2:] if e.startswith('W/') else e) == bare for e in etags)
+
+
+def is_not_modified(request, etag, last_modified):
+    """Evaluate If-None-Match (preferred) or If-Modified-Since"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        return _etag_matches(etag, if_none_match)
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(last_modified) <= if_modified_since
+
+
+def parse_range(header, size):
+    """
+    Parse a single "bytes=" range. Returns (start, end) inclusive, None when
+    the header should be ignored (full response), or False if unsatisfiable.
+    Multiple ranges are ignored and answered with the full file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _sendfile_response(kind, path, fullpath, content_type):
+    """Let nginx / Apache / lighttpd send the file if a backend is configured"""
+    backend = getattr(settings, 'SENDFILE_BACKEND', None)
+    if not backend:
+        return None
+
+    response = HttpResponse(content_type=content_type)
+    if backend == 'nginx':
+        # nginx needs an `internal` location pointing at the same directory
+        prefixes = getattr(settings, 'SENDFILE_PREFIXES', {})
+        prefix = prefixes.get(kind)
+        if not prefix:
+            return None
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(path)
+    elif backend in ('apache', 'lighttpd'):
+        response['X-Sendfile'] = fullpath
+    else:
+        return None
+    return response
+
+
+def _precompressed_variants(fullpath, original_mtime):
+    """
+    (encoding, path, stat) for the .br / .gz siblings collectstatic wrote next
+    to a static file. Siblings older than the original are stale and ignored
+    (whitenoise copies the original's mtime, so compare whole seconds).
+    """
+    variants = []
+    for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+        try:
+            sibling_stat = os.stat(fullpath + suffix)
+        except OSError:
+            continue
+        if int(sibling_stat.st_mtime) >= int(original_mtime):
+            variants.append((encoding, fullpath + suffix, sibling_stat))
+    return variants
+
+
+def _accepted_variant(request, variants):
+    """Pick the first sibling whose encoding the client accepts"""
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if not accept_encoding:
+        return None
+    accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+    for variant in variants:
+        if variant[0] in accepted:
+            return variant
+    return None
+
+
+@require_safe
+def serve(request, path, document_root=None, kind='media'):
+    """
+    Serve a file below document_root.
+    Usage in urls.py:
+        re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT, 'kind': 'media'})
+    """
+    try:
+        fullpath = safe_join(document_root, path)
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404('File not found')
+
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404('File not found')
+    if not os.path.isfile(fullpath):
+        raise Http404('File not found')
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+    sendfile_backend = getattr(settings, 'SENDFILE_BACKEND', None)
+
+    # Static files and sitemaps: use the gzip/Brotli siblings written next to them.
+    # With a front-end server configured, its gzip_static/brotli_static does this.
+    variants = []
+    if kind in PRECOMPRESSED_KINDS and not sendfile_backend:
+        variants = _precompressed_variants(fullpath, stat.st_mtime)
+    serve_path = fullpath
+    if variants and 'HTTP_RANGE' not in request.META:
+        variant = _accepted_variant(request, variants)
+        if variant:
+            encoding, serve_path, stat = variant
+
+    etag = file_etag(stat)
+    last_modified = http_date(stat.st_mtime)
+    if kind == 'static' and HASHED_NAME_RE.search(path):
+        # Fingerprinted by the manifest storage: the content can never change
+        cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        max_age = getattr(settings, f'{kind.upper()}_CACHE_MAX_AGE', DEFAULT_CACHE_MAX_AGE.get(kind, 0))
+        cache_control = f'public, max-age={max_age}' if max_age else None
+
+    def add_validators(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        response['Accept-Ranges'] = 'bytes'
+        if cache_control:
+            response['Cache-Control'] = cache_control
+        if variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    if is_not_modified(request, etag, stat.st_mtime):
+        return add_validators(HttpResponseNotModified())
+
+    # Hand off to the front-end server; it handles Range itself
+    response = _sendfile_response(kind, path, fullpath, content_type)
+    if response is not None:
+        return add_validators(response)
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header:
+        # If-Range: only honour the range if the client's copy is still current
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range or if_range in (etag, last_modified):
+            byte_range = parse_range(range_header, stat.st_size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return add_validators(response)
+
+    fileobj = open(serve_path, 'rb')
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(FileRange(fileobj, start, length), content_type=content_type, status=206)
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    else:
+        response = FileResponse(fileobj, content_type=content_type)
+    response.block_size = STREAM_BLOCK_SIZE
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return add_validators(response)
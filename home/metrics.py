@@ -0,0 +1,242 @@
+"""
+Prometheus metrics without a client library
+
+Counters and histograms are kept per thread (no lock on the hot path) and
+merged when a worker publishes them through home.worker_state, at most every
+METRICS_PUBLISH_INTERVAL seconds. /metrics adds up the files of every worker
+and renders the text exposition format.
+
+    MIDDLEWARE = [..., 'home.middleware.MetricsMiddleware', ...]
+    METRICS_TOKEN = '...'       # scraper sends "Authorization: Bearer ..."
+
+Settings:
+    METRICS_ENABLED            False removes the middleware (default True)
+    METRICS_TOKEN              bearer token accepted by /metrics (staff users can always read it)
+    METRICS_PUBLISH_INTERVAL   seconds between publications per worker (default 5)
+    METRICS_WORKER_MAX_AGE     seconds after which an exited worker's numbers are dropped (default 3600)
+
+Counters of a worker that exited disappear after METRICS_WORKER_MAX_AGE,
+which Prometheus sees as a counter reset (rate() handles it).
+"""
+import os
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from home import worker_state
+
+STATE_NAME = 'metrics'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 30, 50, 100)
+
+_published_at = 0
+
+
+class Metric:
+    """Values per label tuple, one dict per thread"""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        REGISTRY[name] = self
+
+    def _shard(self):
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def reset(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self):
+        """{labels: value} of this process"""
+        totals = {}
+        for shard in list(self._shards):
+            for labels, value in shard.copy().items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # Non-cumulative bucket counts (last one is +Inf), then sum
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        state[index] += 1
+        state[-1] += value
+
+    def collect(self):
+        totals = {}
+        for shard in list(self._shards):
+            for labels, state in shard.copy().items():
+                total = totals.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+                for index, value in enumerate(list(state)):
+                    total[index] += value
+        return totals
+
+
+REGISTRY = {}
+
+REQUEST_DURATION = Histogram(
+    'jagoron_http_request_duration_seconds', 'Time spent in Django per request', ('route', 'method'),
+)
+REQUESTS = Counter('jagoron_http_requests_total', 'Requests by route and status class', ('route', 'status'))
+REQUEST_QUERIES = Histogram(
+    'jagoron_http_request_queries', 'SQL queries per request', ('route',), buckets=QUERY_BUCKETS,
+)
+DB_QUERIES = Counter('jagoron_db_queries_total', 'SQL queries by database alias', ('alias',))
+DB_QUERY_SECONDS = Counter('jagoron_db_query_seconds_total', 'Time spent in SQL queries', ('alias',))
+CACHE_REQUESTS = Counter('jagoron_cache_requests_total', 'Cache lookups by cache and result', ('cache', 'result'))
+
+
+def record_cache(cache_name, hit):
+    CACHE_REQUESTS.inc((cache_name, 'hit' if hit else 'miss'))
+
+
+def _pool_gauges():
+    """Connection pool gauges of this process (pooled backend only)"""
+    pool_module = sys.modules.get('core.db_pool.pool')
+    if pool_module is None:
+        return {}
+    gauges = {}
+    for stats in pool_module.all_stats():
+        for key in ('open', 'idle', 'in_use', 'max_size'):
+            gauges.setdefault(f'jagoron_db_pool_{key}', {})[(stats['alias'],)] = stats[key]
+        for key in ('checkouts', 'connects', 'waits', 'timeouts', 'reconnects'):
+            gauges.setdefault(f'jagoron_db_pool_{key}_total', {})[(stats['alias'],)] = stats[key]
+        gauges.setdefault('jagoron_db_pool_wait_seconds_total', {})[(stats['alias'],)] = stats['wait_time']
+    return gauges
+
+
+def snapshot():
+    """This process's metrics as JSON-compatible data"""
+    return {
+        'metrics': {
+            name: [[list(labels), value] for labels, value in metric.collect().items()]
+            for name, metric in REGISTRY.items()
+        },
+        'pool': {
+            name: [[list(labels), value] for labels, value in values.items()]
+            for name, values in _pool_gauges().items()
+        },
+    }
+
+
+def maybe_publish():
+    global _published_at
+    now = time.monotonic()
+    if now - _published_at > getattr(settings, 'METRICS_PUBLISH_INTERVAL', 5):
+        _published_at = now
+        worker_state.publish(STATE_NAME, snapshot())
+
+
+def _merge(total, value):
+    if isinstance(value, list):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+    return (total or 0) + value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def render():
+    """Text exposition format of every worker's metrics"""
+    states = worker_state.collect(
+        STATE_NAME, max_age=getattr(settings, 'METRICS_WORKER_MAX_AGE', 3600), include_self=False,
+    )
+    states[os.getpid()] = snapshot()
+
+    merged = {name: {} for name in REGISTRY}
+    pool = {}
+    for state in states.values():
+        for name, items in state.get('metrics', {}).items():
+            if name not in merged:
+                continue
+            for labels, value in items:
+                key = tuple(labels)
+                merged[name][key] = _merge(merged[name].get(key), value)
+        for name, items in state.get('pool', {}).items():
+            for labels, value in items:
+                key = tuple(labels)
+                pool.setdefault(name, {})[key] = pool.get(name, {}).get(key, 0) + value
+
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for labels, value in sorted(merged[name].items()):
+            if metric.kind == 'counter':
+                lines.append(f'{name}{_labels(metric.labelnames, labels)} {_format_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                le = (('le', bound),)
+                lines.append(f'{name}_bucket{_labels(metric.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(metric.labelnames, labels)} {_format_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(metric.labelnames, labels)} {cumulative}')
+
+    for name, values in sorted(pool.items()):
+        kind = 'counter' if name.endswith('_total') else 'gauge'
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(values.items()):
+            lines.append(f'{name}{_labels(("alias",), labels)} {_format_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _after_fork_in_child():
+    # The master only warms up, but never report its numbers twice
+    for metric in REGISTRY.values():
+        metric.reset()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
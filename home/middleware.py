@@ -1,9 +1,22 @@
 """
-Middleware for URL Redirection
+Middleware for URL Redirection, asset preload hints, replica routing, request stats,
+metrics, on-demand profiling, request log context and surrogate keys
 """
+import logging
+import random
+import re
+import time
+import uuid
+
 from django.shortcuts import redirect
 from django.http import HttpResponsePermanentRedirect, HttpResponseRedirect
-from home.models import URLRedirection
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from core import db_router, log
+from home import metrics, profiling, purge, request_stats, snapshots
+from home.storage import get_preconnect_origins, get_preload_assets
+
+logger = logging.getLogger(__name__)
 
 
 class URLRedirectionMiddleware:
@@ -17,22 +30,275 @@ class URLRedirectionMiddleware:
         # Check for URL redirection before processing the request
         path = request.path
         
-        # Try to find an active redirection
+        # Active redirections are kept in a snapshot instead of a query per request
         try:
-            redirection = URLRedirection.objects.filter(
-                old_url=path,
-                is_active=True
-            ).first()
+            redirection = snapshots.redirects().get(path)
             
             if redirection:
+                new_url, redirect_type = redirection
                 # Determine redirect type
-                if redirection.redirect_type == '301':
-                    return HttpResponsePermanentRedirect(redirection.new_url)
+                if redirect_type == '301':
+                    return HttpResponsePermanentRedirect(new_url)
                 else:  # 302
-                    return HttpResponseRedirect(redirection.new_url)
+                    return HttpResponseRedirect(new_url)
         except Exception:
             # If there's any error (e.g., database not ready), just continue
             pass
         
         response = self.get_response(request)
         return response
+
+
+
+class PreloadHeaderMiddleware:
+    """
+    Add `Link: rel=preload` headers for the critical fonts to HTML pages.
+    CDNs (Cloudflare, Fastly) turn these into 103 Early Hints, so the browser
+    starts fetching fonts while the page is still being rendered.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.link_header = None
+
+    def build_link_header(self):
+        links = []
+        for origin, crossorigin in get_preconnect_origins():
+            links.append(f'<{origin}>; rel=preconnect' + ('; crossorigin' if crossorigin else ''))
+        for url, as_type, mime in get_preload_assets():
+            link = f'<{url}>; rel=preload; as={as_type}; type="{mime}"'
+            if as_type == 'font':
+                # Fonts are always fetched in CORS mode
+                link += '; crossorigin'
+            links.append(link)
+        return ', '.join(links)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.status_code != 200 or response.streaming:
+            return response
+        if not response.get('Content-Type', '').startswith('text/html'):
+            return response
+
+        # Hashed URLs only change on deploy, which restarts the workers
+        if self.link_header is None:
+            self.link_header = self.build_link_header()
+        if self.link_header and 'Link' not in response:
+            response['Link'] = self.link_header
+        return response
+
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let public GET/HEAD requests read from the replicas (core.db_router).
+    A request that writes pins the browser to the primary for
+    PRIMARY_PIN_SECONDS, so editors and reviewers see their own changes.
+    """
+    # Admin, editor uploads and account pages always use the primary
+    PRIMARY_ONLY_PREFIXES = ('/jag-admin/', '/admin/', '/ckeditor5/')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, 'PRIMARY_PIN_COOKIE', 'primary_pin')
+        self.pin_seconds = getattr(settings, 'PRIMARY_PIN_SECONDS', 15)
+
+    def use_replica(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if request.path.startswith(self.PRIMARY_ONLY_PREFIXES):
+            return False
+        return self.cookie_name not in request.COOKIES
+
+    def __call__(self, request):
+        if not self.use_replica(request):
+            tokens = db_router.begin_primary_reads()
+            try:
+                response = self.get_response(request)
+            finally:
+                wrote = db_router.end_routing(tokens)
+            # GET side effects (view counters) do not pin the session
+            if wrote and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+                response.set_cookie(
+                    self.cookie_name, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax',
+                )
+            return response
+
+        tokens = db_router.begin_replica_reads()
+        try:
+            return self.get_response(request)
+        finally:
+            db_router.end_routing(tokens)
+
+
+
+class RequestStatsMiddleware:
+    """
+    Record query count, DB time, template time and Python time of every view
+    (home.request_stats). Static and media files are not recorded.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_STATS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.skip_prefixes = request_stats.untracked_prefixes()
+        request_stats.install_template_timer()
+
+    def __call__(self, request):
+        if self.skip_prefixes and request.path.startswith(self.skip_prefixes):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with request_stats.measure() as timings:
+            response = self.get_response(request)
+        request_stats.record(request, response, time.perf_counter() - started, timings)
+        return response
+
+
+
+class MetricsMiddleware:
+    """
+    Request latency, status and query metrics per route for /metrics
+    (home.metrics). Static and media files are not recorded.
+    """
+    # Anything else is reported as "other" to bound the label values
+    METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.skip_prefixes = request_stats.untracked_prefixes()
+
+    def __call__(self, request):
+        if self.skip_prefixes and request.path.startswith(self.skip_prefixes):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        # Shares RequestStatsMiddleware's execute_wrapper when both are installed
+        with request_stats.measure() as timings:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        route = request_stats.get_url_name(request)
+        method = request.method if request.method in self.METHODS else 'other'
+        metrics.REQUEST_DURATION.observe(elapsed, (route, method))
+        metrics.REQUESTS.inc((route, f'{response.status_code // 100}xx'))
+        metrics.REQUEST_QUERIES.observe(timings.queries, (route,))
+        for alias, (queries, seconds) in timings.aliases.items():
+            metrics.DB_QUERIES.inc((alias,), queries)
+            metrics.DB_QUERY_SECONDS.inc((alias,), seconds)
+        metrics.maybe_publish()
+        return response
+
+
+
+class ProfilingMiddleware:
+    """
+    Profile single requests on demand (home.profiling): staff users send
+    `X-Profile: 1` (or `cprofile`) or `?_profile=1`, and PROFILER_SAMPLE_RATE
+    picks random requests. Not installed at all unless PROFILER_ENABLED.
+    """
+    HEADER = 'X-Profile'
+    QUERY_PARAM = '_profile'
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0)
+
+    def get_mode(self, request):
+        """'sample', 'cprofile' or None when this request is not profiled"""
+        flag = request.headers.get(self.HEADER) or request.GET.get(self.QUERY_PARAM)
+        if flag:
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_staff:
+                return 'cprofile' if flag == 'cprofile' else 'sample'
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+    def __call__(self, request):
+        mode = self.get_mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response, profiler = profiling.profile_call(lambda: self.get_response(request), mode)
+        elapsed = time.perf_counter() - started
+        try:
+            filename = profiling.save_profile(profiler, request_stats.get_url_name(request), elapsed)
+        except OSError as e:
+            logger.warning(f"Could not save the profile of {request.path}: {e}")
+            return response
+        response['X-Profile-Id'] = filename
+        return response
+
+
+
+class RequestLogMiddleware:
+    """
+    Give every log record of a request its id, method, path and elapsed time
+    (core.log) and return the id in X-Request-ID. An id sent by the proxy is
+    kept so its access log and ours can be joined. Requests slower than
+    REQUEST_LOG_SLOW_MS are logged as warnings.
+    """
+    REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'REQUEST_LOG_SLOW_MS', 1000)
+
+    def __call__(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        if not self.REQUEST_ID_RE.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+
+        tokens = log.begin_request(request_id, request.method, request.path)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if self.slow_ms and elapsed_ms > self.slow_ms:
+                logger.warning(
+                    f"Slow request: {request.method} {request.path} took {elapsed_ms:.0f}ms",
+                    extra={'status_code': response.status_code},
+                )
+        finally:
+            log.end_request(tokens)
+        response['X-Request-ID'] = request_id
+        return response
+
+
+
+class SurrogateKeyMiddleware:
+    """
+    Send the keys the view tagged its response with (home.purge) in a
+    Surrogate-Key header (SURROGATE_KEY_HEADER), so a caching proxy or CDN
+    can drop exactly the pages a change affects. Untagged responses (admin,
+    forms, errors) get no header.
+
+    It also gives the responses of @purge.proxy_max_age views their s-maxage
+    once the response is final, so place it above SessionMiddleware,
+    CsrfViewMiddleware and MessageMiddleware (right after SecurityMiddleware):
+    a response that gained a cookie on the way out must not be shared.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = getattr(settings, 'SURROGATE_KEY_HEADER', 'Surrogate-Key')
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+
+        token = purge.begin_response()
+        try:
+            response = self.get_response(request)
+        finally:
+            keys = purge.end_response(token)
+        if keys and response.status_code in (200, 304) and self.header not in response:
+            response[self.header] = ' '.join(sorted(keys | {purge.SITE_KEY}))
+        purge.apply_proxy_max_age(request, response)
+        return response
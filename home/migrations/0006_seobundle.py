@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0005_electionlivescore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SEOBundle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('news', 'News'), ('section', 'Section'), ('subsection', 'SubSection'), ('page', 'Page')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('version', models.CharField(max_length=40)),
+                ('meta_tags', models.TextField(blank=True)),
+                ('json_ld', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'SEO Bundle',
+                'verbose_name_plural': 'SEO Bundles',
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+    ]
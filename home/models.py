@@ -1,7 +1,6 @@
 from django.db import models
 from django_ckeditor_5.fields import CKEditor5Field
 from django.conf import settings
-from PIL import Image
 import os
 import logging
 from django.core.files.images import get_image_dimensions
@@ -361,6 +360,9 @@ class News(models.Model):
 
 
     def convert_to_webp(self, image_field):
+        # PIL is only needed when an image is saved, keep it out of worker boot
+        from PIL import Image
+
         try:
             # Safely get the image path
             if not hasattr(image_field, 'path'):
@@ -398,6 +400,8 @@ class News(models.Model):
             return None
 
     def compress_and_resize_image(self, image_path):
+        from PIL import Image
+
         try:
             with Image.open(image_path) as img:
                 original_format = img.format
@@ -430,7 +434,7 @@ class News(models.Model):
 
                     quality -= 5
 
-                logger.info(f"Image compressed: {image_path}, Final quality: {quality}")
+                logger.debug(f"Image compressed: {image_path}, Final quality: {quality}")
 
         except Exception as e:
             logger.error(f"Error compressing image {image_path}: {e}")
@@ -451,17 +455,33 @@ class News(models.Model):
             except Exception as e:
                 logger.error(f"Error deleting main image: {e}")
 
+        if self.pdf_file:
+            try:
+                if os.path.isfile(self.pdf_file.path):
+                    os.remove(self.pdf_file.path)
+            except Exception as e:
+                logger.error(f"Error deleting pdf file: {e}")
+
         super().delete(*args, **kwargs)
 
     def get_absolute_url(self):
         """Generate URL using section english_title and news ID, including subsection if available"""
-        if self.section and self.section.english_title:
-            if self.sub_section and self.sub_section.english_title:
-                return f'/{self.section.english_title}/{self.sub_section.english_title}/{self.id}/'
+        return self.build_url(
+            self.id,
+            self.section.english_title if self.section else None,
+            self.sub_section.english_title if self.sub_section else None,
+        )
+
+    @staticmethod
+    def build_url(news_id, section_slug, sub_section_slug):
+        """get_absolute_url() from bare values, for callers that only fetch the slugs"""
+        if section_slug:
+            if sub_section_slug:
+                return f'/{section_slug}/{sub_section_slug}/{news_id}/'
             else:
-                return f'/{self.section.english_title}/{self.id}/'
+                return f'/{section_slug}/{news_id}/'
         # Fallback to old format if no section or english_title
-        return f'/news/detail/{self.id}/'
+        return f'/news/detail/{news_id}/'
 
     def __str__(self):
         return self.title or 'Untitled News'
@@ -875,6 +895,35 @@ class SubSectionSEO(SEOMetadata):
         verbose_name_plural = "SubSection SEO"
 
 
+class SEOBundle(models.Model):
+    """
+    Rendered meta tags and JSON-LD of one news, section, subsection or page
+    (built by home.seo when the object or its SEO inline changes)
+    """
+    KIND_CHOICES = [
+        ('news', 'News'),
+        ('section', 'Section'),
+        ('subsection', 'SubSection'),
+        ('page', 'Page'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    # Site settings and templates the bundle was built with (home.seo.version)
+    version = models.CharField(max_length=40)
+    meta_tags = models.TextField(blank=True)
+    # Tag name (article, breadcrumb) -> <script type="application/ld+json">
+    json_ld = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "SEO Bundle"
+        verbose_name_plural = "SEO Bundles"
+        unique_together = ("kind", "object_id")
+
+    def __str__(self):
+        return f"SEO bundle for {self.kind} {self.object_id}"
+
+
 class RobotsTxt(models.Model):
     """Model to store robots.txt content"""
     content = models.TextField(
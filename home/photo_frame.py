@@ -0,0 +1,176 @@
+"""
+Profile photo frame generator (jagoron-1lakh campaign)
+
+Compositing runs in a small process pool so the web workers only wait on a
+future instead of burning CPU in PIL. Every pool process loads and recolors
+the logo once (_init_worker) and reuses it for all the photos it frames.
+
+Settings:
+    PHOTO_FRAME_WORKERS      processes per web worker (default 2)
+    PHOTO_FRAME_MAX_PENDING  photos queued or in progress before we answer 429 (default 8)
+    PHOTO_FRAME_TIMEOUT      seconds to wait for a result (default 30)
+    PHOTO_FRAME_MAX_UPLOAD   upload size limit in bytes (default 15 MB)
+"""
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FRAME_SIZE = 1000
+LOGO_PATH = os.path.join('static', 'image', 'fav-logo1.png')
+
+# Output formats: name -> (PIL format, content type, save options)
+OUTPUT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 90, 'method': 4}),
+    'png': ('PNG', 'image/png', {'compress_level': 6}),
+}
+
+
+class PhotoFrameBusy(Exception):
+    """Too many photos are already waiting for a pool process"""
+
+
+class PhotoFrameUnavailable(Exception):
+    """The pool could not take the photo or a pool process died while framing it"""
+
+
+class InvalidImage(Exception):
+    """The upload is not an image PIL can decode (raised in the pool process)"""
+
+
+# Per pool process: the logo, resized and recolored once
+_logo = None
+
+
+def _init_worker(logo_path):
+    """Pool initializer: prepare the logo overlay once per process"""
+    global _logo
+    from PIL import Image
+
+    logo = Image.open(logo_path)
+    if logo.mode != 'RGBA':
+        logo = logo.convert('RGBA')
+    logo = logo.resize((FRAME_SIZE, FRAME_SIZE), Image.LANCZOS)
+
+    # Darken the red parts and make the whole logo 60% opaque
+    new_logo_data = []
+    for r, g, b, a in logo.getdata():
+        if a > 0:
+            if r > g and r > b:
+                new_logo_data.append((max(0, r - 40), 0, 0, int(a * 0.6)))
+            else:
+                new_logo_data.append((r, g, b, int(a * 0.6)))
+        else:
+            new_logo_data.append((r, g, b, a))
+    logo.putdata(new_logo_data)
+    _logo = logo
+
+
+def compose(image_bytes, output_format):
+    """Runs in a pool process: frame the uploaded photo and return the encoded image"""
+    from PIL import Image, ImageEnhance, ImageFilter
+
+    try:
+        uploaded = Image.open(io.BytesIO(image_bytes))
+        # JPEG: let libjpeg decode at a reduced scale that still covers the frame
+        uploaded.draft('RGB', (FRAME_SIZE, FRAME_SIZE))
+
+        # Greyscale first so the LANCZOS resize works on 2 channels instead of 4
+        uploaded_bw = uploaded.convert('LA')
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+        # Unknown format, truncated data, oversized or broken header
+        raise InvalidImage(str(e)) from None
+
+    scale_ratio = max(FRAME_SIZE / uploaded_bw.width, FRAME_SIZE / uploaded_bw.height)
+    new_width = int(uploaded_bw.width * scale_ratio)
+    new_height = int(uploaded_bw.height * scale_ratio)
+    uploaded_bw = uploaded_bw.resize((new_width, new_height), Image.LANCZOS).convert('RGBA')
+
+    # Wash the photo out so the logo stands out
+    transparent_layer = Image.new('RGBA', (new_width, new_height), (255, 255, 255, 120))
+    uploaded_bw = Image.alpha_composite(uploaded_bw, transparent_layer)
+
+    upload_position = ((FRAME_SIZE - new_width) // 2, (FRAME_SIZE - new_height) // 2)
+    combined = Image.new('RGB', (FRAME_SIZE, FRAME_SIZE), 'white')
+    combined.paste(uploaded_bw, upload_position, uploaded_bw)
+    combined.paste(_logo, (0, 0), _logo)
+
+    combined = ImageEnhance.Contrast(combined).enhance(1.5)
+    combined = combined.filter(ImageFilter.SHARPEN)
+
+    pil_format, _, save_options = OUTPUT_FORMATS[output_format]
+    buffer = io.BytesIO()
+    combined.save(buffer, format=pil_format, **save_options)
+    return buffer.getvalue()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None
+
+
+def _get_executor():
+    """One pool per web worker process, created on first use (after gunicorn forks)"""
+    global _executor, _pending
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'PHOTO_FRAME_WORKERS', 2)
+            # Never fork a web worker that may already run request threads:
+            # forkserver children come from a clean single-threaded server process
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(method),
+                initializer=_init_worker,
+                initargs=(os.path.join(settings.BASE_DIR, LOGO_PATH),),
+            )
+        if _pending is None:
+            _pending = threading.BoundedSemaphore(getattr(settings, 'PHOTO_FRAME_MAX_PENDING', 8))
+        return _executor
+
+
+def _reset_executor(broken):
+    """Drop a pool whose process died (OOM on a huge upload) so the next call starts a new one"""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def generate(image_bytes, output_format='webp'):
+    """
+    Frame a photo in the pool. Raises PhotoFrameBusy when the queue is full,
+    InvalidImage when the upload cannot be decoded, PhotoFrameUnavailable when
+    the pool is broken and concurrent.futures.TimeoutError when the result
+    takes too long. Returns (image bytes, content type).
+    """
+    executor = _get_executor()
+    pending = _pending
+    if not pending.acquire(blocking=False):
+        raise PhotoFrameBusy()
+
+    try:
+        future = executor.submit(compose, image_bytes, output_format)
+    except (BrokenProcessPool, RuntimeError, OSError) as e:
+        # Broken or shut down pool, or the forkserver could not start a process
+        pending.release()
+        _reset_executor(executor)
+        raise PhotoFrameUnavailable(f'Could not submit to the photo frame pool: {e}') from e
+    # Free the slot when the pool is done, even if we stopped waiting for it
+    future.add_done_callback(lambda f: pending.release())
+
+    try:
+        data = future.result(timeout=getattr(settings, 'PHOTO_FRAME_TIMEOUT', 30))
+    except BrokenProcessPool as e:
+        logger.error('Photo frame pool process died, restarting the pool')
+        _reset_executor(executor)
+        raise PhotoFrameUnavailable('A photo frame pool process died') from e
+    return data, OUTPUT_FORMATS[output_format][1]
@@ -0,0 +1,184 @@
+"""
+On-demand profiling of single requests
+
+ProfilingMiddleware (home.middleware) profiles a request when a staff user
+sends `X-Profile: 1` or `?_profile=1`, or at random with PROFILER_SAMPLE_RATE.
+The default sampling profiler reads the request thread's stack from
+sys._current_frames() every PROFILER_INTERVAL seconds and saves the counts in
+the collapsed-stack format read by flamegraph.pl, speedscope and inferno.
+`X-Profile: cprofile` / `?_profile=cprofile` (or interpreters without
+sys._current_frames) use cProfile instead and save a .prof file for pstats or
+snakeviz. Saved profiles are listed at /admin/profiles/.
+
+    MIDDLEWARE = [..., 'django.contrib.auth.middleware.AuthenticationMiddleware',
+                  'home.middleware.ProfilingMiddleware', ...]
+    PROFILER_ENABLED = True
+
+Settings:
+    PROFILER_ENABLED       the middleware removes itself unless True (default False)
+    PROFILER_SAMPLE_RATE   fraction of all requests profiled automatically (default 0)
+    PROFILER_INTERVAL      seconds between stack samples (default 0.005)
+    PROFILER_DIR           where profiles are saved (default: <tmp>/jagoron-profiles)
+    PROFILER_MAX_FILES     older profiles are deleted beyond this count (default 50)
+"""
+import cProfile
+import functools
+import logging
+import os
+import re
+import sys
+import sysconfig
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_EXTENSIONS = ('.collapsed', '.prof')
+SAFE_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def profile_dir():
+    return getattr(settings, 'PROFILER_DIR', os.path.join(tempfile.gettempdir(), 'jagoron-profiles'))
+
+
+@functools.lru_cache(maxsize=4096)
+def _short_filename(filename):
+    """Path relative to the project or site-packages, which keeps the flame graph readable"""
+    prefixes = [str(getattr(settings, 'BASE_DIR', '')), sysconfig.get_paths()['purelib'], sysconfig.get_paths()['stdlib']]
+    for prefix in prefixes:
+        if prefix and filename.startswith(prefix):
+            return filename[len(prefix):].lstrip(os.sep)
+    return filename
+
+
+def _frame_label(code):
+    # ';' separates the frames in the collapsed format (the count follows the last space)
+    label = f'{code.co_name} ({_short_filename(code.co_filename)}:{code.co_firstlineno})'
+    return label.replace(';', ':')
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        labels = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def output(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def sampling_available():
+    return hasattr(sys, '_current_frames')
+
+
+def profile_call(func, mode='sample'):
+    """Run func() under a SamplingProfiler or cProfile; returns (result, profiler)"""
+    if mode == 'sample' and sampling_available():
+        profiler = SamplingProfiler(threading.get_ident(), getattr(settings, 'PROFILER_INTERVAL', 0.005))
+        profiler.start()
+        try:
+            result = func()
+        finally:
+            profiler.stop()
+        return result, profiler
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func)
+    return result, profiler
+
+
+def save_profile(profiler, label, elapsed):
+    """Write the profile and prune the directory; returns the file name"""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    label = SAFE_NAME_RE.sub('_', label)[:60]
+    base = f'{stamp}_{label}_{int(elapsed * 1000)}ms_{os.getpid()}'
+    if isinstance(profiler, SamplingProfiler):
+        filename = f'{base}.collapsed'
+        with open(os.path.join(directory, filename), 'w', encoding='utf-8') as f:
+            f.write(profiler.output())
+    else:
+        filename = f'{base}.prof'
+        profiler.dump_stats(os.path.join(directory, filename))
+
+    prune(directory)
+    return filename
+
+
+def prune(directory=None):
+    """Keep the newest PROFILER_MAX_FILES profiles"""
+    directory = directory or profile_dir()
+    max_files = getattr(settings, 'PROFILER_MAX_FILES', 50)
+    for entry in list_profiles(directory)[max_files:]:
+        try:
+            os.remove(os.path.join(directory, entry['name']))
+        except OSError:
+            pass
+
+
+def list_profiles(directory=None):
+    """Saved profiles, newest first"""
+    directory = directory or profile_dir()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+    entries = []
+    for name in names:
+        if not name.endswith(PROFILE_EXTENSIONS):
+            continue
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        entries.append({
+            'name': name,
+            'size': stat.st_size,
+            'modified': datetime.fromtimestamp(stat.st_mtime),
+            'format': 'collapsed stacks' if name.endswith('.collapsed') else 'cProfile',
+        })
+    entries.sort(key=lambda entry: entry['name'], reverse=True)
+    return entries
+
+
+def get_profile_path(name):
+    """Absolute path of a saved profile, or None for anything outside the directory"""
+    if os.path.basename(name) != name or not name.endswith(PROFILE_EXTENSIONS):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.isfile(path) else None
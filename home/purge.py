@@ -0,0 +1,252 @@
+"""
+Surrogate keys and precise purging for a caching reverse proxy / CDN
+
+Views tag their response with the objects it shows (add_keys). With
+home.middleware.SurrogateKeyMiddleware in MIDDLEWARE (right after
+SecurityMiddleware, see proxy_max_age) every tagged GET response carries
+them in a `Surrogate-Key` header (SURROGATE_KEY_HEADER, e.g. 'Cache-Tag'
+for Cloudflare), together with the catch-all key `site`:
+
+    news-<id>  section-<id>  subsection-<id>  tag-<id>  home  sitemap  scoreboard
+
+When a row changes, home.signals collects the keys it affects and, once the
+transaction commits, a background thread sends them to PURGE_ENDPOINT in
+batches of PURGE_BATCH_SIZE:
+
+    POST <PURGE_ENDPOINT>
+    Surrogate-Key: news-12 section-3 home ...
+    Authorization: Bearer <PURGE_TOKEN>
+    {"keys": ["news-12", "section-3", "home", ...]}
+
+Without PURGE_ENDPOINT nothing is sent. `python manage.py purge_proxy`
+runs a small caching proxy that understands these requests, for local tests.
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import get_max_age, patch_cache_control
+
+from home import commit_batch
+
+logger = logging.getLogger(__name__)
+
+SITE_KEY = 'site'
+HOME_KEY = 'home'
+SITEMAP_KEY = 'sitemap'
+SCOREBOARD_KEY = 'scoreboard'
+
+# Keys of the response being built, set by SurrogateKeyMiddleware
+_response_keys = contextvars.ContextVar('surrogate_keys', default=None)
+
+
+# -- tagging responses ---------------------------------------------------------------
+
+def news_key(news_id):
+    return f'news-{news_id}'
+
+
+def section_key(section_id):
+    return f'section-{section_id}'
+
+
+def subsection_key(subsection_id):
+    return f'subsection-{subsection_id}'
+
+
+def tag_key(tag_id):
+    return f'tag-{tag_id}'
+
+
+def news_keys(news, tag_ids=None):
+    """Keys of an article and of the listings it appears on"""
+    keys = [news_key(news.pk)]
+    if news.section_id:
+        keys.append(section_key(news.section_id))
+    if news.sub_section_id:
+        keys.append(subsection_key(news.sub_section_id))
+    if tag_ids is None:
+        tag_ids = news.tags.values_list('pk', flat=True)
+    keys.extend(tag_key(tag_id) for tag_id in tag_ids)
+    return keys
+
+
+def begin_response():
+    return _response_keys.set(set())
+
+
+def end_response(token):
+    keys = _response_keys.get()
+    _response_keys.reset(token)
+    return keys
+
+
+def add_keys(*keys):
+    """Tag the current response (a no-op outside SurrogateKeyMiddleware)"""
+    keys_set = _response_keys.get()
+    if keys_set is not None:
+        keys_set.update(key for key in keys if key)
+
+
+def proxy_max_age(setting, default):
+    """
+    Let the proxy keep anonymous responses of the view for `setting` seconds
+    (s-maxage; browsers still revalidate). For pages that are purged by key
+    when they change and render their times in the browser.
+
+    The view only marks its response: cookies are added after it returns
+    (CSRF, session, messages), so SurrogateKeyMiddleware, which runs outside
+    those middlewares, decides with the final response (apply_proxy_max_age).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            response.proxy_max_age = getattr(settings, setting, default)
+            return response
+        return wrapper
+    return decorator
+
+
+def apply_proxy_max_age(request, response):
+    """s-maxage for a response marked by proxy_max_age, unless it is personal"""
+    seconds = getattr(response, 'proxy_max_age', None)
+    user = getattr(request, 'user', None)
+    if (
+        seconds and request.method in ('GET', 'HEAD') and response.status_code in (200, 304)
+        and not response.cookies and not (user is not None and user.is_authenticated)
+    ):
+        if get_max_age(response) is None:
+            patch_cache_control(response, max_age=0)
+        patch_cache_control(response, s_maxage=seconds)
+
+
+# -- purging -------------------------------------------------------------------------
+
+def enabled():
+    return bool(getattr(settings, 'PURGE_ENDPOINT', None))
+
+
+def _flush(keys):
+    dispatcher.submit(keys)
+
+
+def purge(*keys):
+    """Purge these keys once the current transaction commits (nothing if it rolls back)"""
+    if not enabled() or not keys:
+        return
+    commit_batch.add(_flush, keys)
+
+
+def send(keys):
+    """One purge request; raises on network errors and non-2xx answers"""
+    endpoint = settings.PURGE_ENDPOINT
+    headers = {
+        'Content-Type': 'application/json',
+        'Surrogate-Key': ' '.join(keys),
+    }
+    token = getattr(settings, 'PURGE_TOKEN', None)
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    body = json.dumps({'keys': list(keys)}).encode('utf-8')
+    request = urllib.request.Request(endpoint, data=body, headers=headers, method='POST')
+    with urllib.request.urlopen(request, timeout=getattr(settings, 'PURGE_TIMEOUT', 5)) as response:
+        response.read()
+
+
+class PurgeDispatcher:
+    """
+    Background thread that merges the keys of recent commits and sends them
+    in batches, so saves never wait for the CDN API. Started lazily in each
+    process (threads do not survive the fork of the server workers).
+
+    A batch that fails is retried PURGE_RETRIES times (default 5) with a
+    backoff doubling from PURGE_RETRY_DELAY seconds (default 1) up to
+    PURGE_RETRY_MAX_DELAY (default 60); new commits are sent meanwhile.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.retries = []          # (due, keys, attempt), only touched by the thread
+        self.thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def submit(self, keys):
+        self.ensure_started()
+        self.queue.put(set(keys))
+
+    def ensure_started(self):
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+                return
+            if self.pid != os.getpid():
+                # Forked: the parent's queue and retries are the parent's business
+                self.queue = queue.Queue()
+                self.retries = []
+            # Otherwise only the thread died: keep what is queued
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.run, name='purge-dispatcher', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            timeout = None
+            if self.retries:
+                timeout = max(min(due for due, _, _ in self.retries) - time.monotonic(), 0)
+            try:
+                keys = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                keys = set()
+            # Merge whatever else has been committed meanwhile
+            while True:
+                try:
+                    keys |= self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if keys:
+                self.dispatch(sorted(keys))
+
+            now = time.monotonic()
+            due = [retry for retry in self.retries if retry[0] <= now]
+            self.retries = [retry for retry in self.retries if retry[0] > now]
+            for _, retry_keys, attempt in due:
+                self.dispatch(retry_keys, attempt)
+
+    def dispatch(self, keys, attempt=0):
+        batch_size = getattr(settings, 'PURGE_BATCH_SIZE', 256)
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            try:
+                send(batch)
+                self.sent += len(batch)
+            except (OSError, urllib.error.URLError) as e:
+                self.retry(batch, attempt, e)
+
+    def retry(self, keys, attempt, error):
+        if attempt >= getattr(settings, 'PURGE_RETRIES', 5):
+            self.failed += len(keys)
+            logger.error(
+                f"Purge of {len(keys)} surrogate keys failed after {attempt + 1} attempts: {error}",
+                extra={'keys': ' '.join(keys)},
+            )
+            return
+        delay = min(
+            getattr(settings, 'PURGE_RETRY_DELAY', 1) * 2 ** attempt,
+            getattr(settings, 'PURGE_RETRY_MAX_DELAY', 60),
+        )
+        logger.warning(f"Purge of {len(keys)} surrogate keys failed, retrying in {delay}s: {error}")
+        self.retries.append((time.monotonic() + delay, keys, attempt + 1))
+
+
+dispatcher = PurgeDispatcher()
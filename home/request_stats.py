@@ -0,0 +1,258 @@
+"""
+Per-request cost accounting: SQL queries, DB time, template time, Python time
+
+RequestStatsMiddleware (home.middleware) times every view and keeps the last
+REQUEST_STATS_BUFFER requests of each worker in a ring buffer. Each worker
+publishes its buffer through home.worker_state at most every
+REQUEST_STATS_PUBLISH_INTERVAL seconds; the staff report at
+/admin/request-stats/ merges them.
+
+    MIDDLEWARE = [..., 'home.middleware.RequestStatsMiddleware', ...]
+    QUERY_BUDGETS = {'home': 15, 'news_detail': 20, '*': 30}
+
+Settings:
+    REQUEST_STATS_ENABLED            False removes the middleware (default True)
+    REQUEST_STATS_BUFFER             requests kept per worker (default 2000)
+    REQUEST_STATS_PUBLISH_INTERVAL   seconds between buffer publications (default 5)
+    QUERY_BUDGETS                    url name -> max queries, '*' for every other view;
+                                     requests over budget log a warning
+"""
+import contextvars
+import functools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from home import worker_state
+
+logger = logging.getLogger(__name__)
+
+STATE_NAME = 'request_stats'
+
+# Fields of a record, in order
+FIELDS = ('timestamp', 'url_name', 'path', 'status', 'total_ms', 'queries', 'db_ms', 'template_ms', 'python_ms')
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+_records = None
+_records_lock = threading.Lock()
+_published_at = 0
+_template_timer_installed = False
+
+
+class RequestTimings:
+    """
+    Counters of one request; also the execute_wrapper for every DB connection.
+    `aliases` holds (queries, seconds) per database alias.
+    """
+    __slots__ = ('queries', 'db_time', 'template_time', 'template_depth', 'aliases')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.aliases = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db_time += elapsed
+            self.queries += 1
+            alias = context['connection'].alias
+            queries, seconds = self.aliases.get(alias, (0, 0.0))
+            self.aliases[alias] = (queries + 1, seconds + elapsed)
+
+
+def start(timings):
+    return _current.set(timings)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+@contextmanager
+def measure():
+    """
+    The RequestTimings of the current request. The outermost caller
+    (RequestStatsMiddleware or MetricsMiddleware, whichever comes first)
+    installs the execute_wrapper; the others share it, so each query is
+    wrapped once. Counts then cover the request from the outermost caller on.
+    """
+    timings = _current.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = RequestTimings()
+    token = start(timings)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            yield timings
+    finally:
+        stop(token)
+
+
+def untracked_prefixes():
+    """URL prefixes of static and media files, which the request middlewares skip"""
+    return tuple(
+        '/' + url.lstrip('/')
+        for url in (getattr(settings, 'STATIC_URL', None), getattr(settings, 'MEDIA_URL', None))
+        if url and '://' not in url
+    )
+
+
+def install_template_timer():
+    """
+    Time the Django template backend's render(). Only the outermost render of
+    a request is timed (include/render_to_string calls are nested in it) and
+    the queries that lazy querysets run while rendering count as DB time.
+    """
+    global _template_timer_installed
+    if _template_timer_installed:
+        return
+    _template_timer_installed = True
+
+    from django.template.backends.django import Template
+
+    original_render = Template.render
+
+    @functools.wraps(original_render)
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None or timings.template_depth:
+            return original_render(self, context, request)
+        timings.template_depth += 1
+        started = time.perf_counter()
+        db_before = timings.db_time
+        try:
+            return original_render(self, context, request)
+        finally:
+            timings.template_depth -= 1
+            timings.template_time += time.perf_counter() - started - (timings.db_time - db_before)
+
+    Template.render = render
+
+
+def get_query_budget(url_name):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(url_name, budgets.get('*'))
+
+
+def _get_records():
+    global _records
+    if _records is None:
+        with _records_lock:
+            if _records is None:
+                _records = deque(maxlen=getattr(settings, 'REQUEST_STATS_BUFFER', 2000))
+    return _records
+
+
+def get_url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+def record(request, response, elapsed, timings):
+    """Store one request in this worker's ring buffer and check its query budget"""
+    global _published_at
+    url_name = get_url_name(request)
+    total_ms = elapsed * 1000
+    db_ms = timings.db_time * 1000
+    template_ms = timings.template_time * 1000
+    python_ms = max(total_ms - db_ms - template_ms, 0.0)
+
+    records = _get_records()
+    with _records_lock:
+        records.append((
+            round(time.time(), 3), url_name, request.path[:200], response.status_code,
+            round(total_ms, 2), timings.queries, round(db_ms, 2), round(template_ms, 2), round(python_ms, 2),
+        ))
+
+    budget = get_query_budget(url_name)
+    if budget is not None and timings.queries > budget:
+        logger.warning(
+            f"Query budget exceeded for {url_name}: {timings.queries} queries (budget {budget}), "
+            f"{db_ms:.1f}ms in the database, path {request.path}"
+        )
+
+    now = time.monotonic()
+    if now - _published_at > getattr(settings, 'REQUEST_STATS_PUBLISH_INTERVAL', 5):
+        _published_at = now
+        publish()
+
+
+def publish():
+    with _records_lock:
+        records = list(_get_records())
+    worker_state.publish(STATE_NAME, records)
+
+
+def collect_records():
+    """Records of every worker; this worker's live buffer replaces its published copy"""
+    records = []
+    for worker_records in worker_state.collect(STATE_NAME, include_self=False).values():
+        records.extend(tuple(item) for item in worker_records)
+    with _records_lock:
+        records.extend(_get_records())
+    return records
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def summarize(records):
+    """Per url name: counts, latency percentiles and average cost split"""
+    groups = {}
+    for item in records:
+        groups.setdefault(item[1], []).append(item)
+
+    rows = []
+    for url_name, items in groups.items():
+        count = len(items)
+        totals = sorted(item[4] for item in items)
+        queries = [item[5] for item in items]
+        budget = get_query_budget(url_name)
+        rows.append({
+            'url_name': url_name,
+            'count': count,
+            'p50': percentile(totals, 0.50),
+            'p95': percentile(totals, 0.95),
+            'p99': percentile(totals, 0.99),
+            'max': totals[-1],
+            'avg_queries': round(sum(queries) / count, 1),
+            'max_queries': max(queries),
+            'avg_db_ms': round(sum(item[6] for item in items) / count, 2),
+            'avg_template_ms': round(sum(item[7] for item in items) / count, 2),
+            'avg_python_ms': round(sum(item[8] for item in items) / count, 2),
+            'budget': budget,
+            'over_budget': sum(1 for value in queries if budget is not None and value > budget),
+        })
+    rows.sort(key=lambda row: row['p95'], reverse=True)
+    return rows
+
+
+def top_offenders(records, limit=20):
+    """The slowest single requests and the ones with the most queries"""
+    as_dicts = [dict(zip(FIELDS, item)) for item in records]
+    slowest = sorted(as_dicts, key=lambda item: item['total_ms'], reverse=True)[:limit]
+    most_queries = sorted(as_dicts, key=lambda item: item['queries'], reverse=True)[:limit]
+    return slowest, most_queries
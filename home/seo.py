@@ -0,0 +1,268 @@
+"""
+Precomputed SEO meta tags and JSON-LD
+
+The SEO template tags (templatetags/seo_tags.py) used to build everything
+on every render: SiteInfo and the one-to-one *SEO row of the page, the
+article categories, PIL opening the og:image, and the Newspaper schema
+walking every section and subsection. Now they emit strings built earlier:
+- every News, NavbarItem, SubSection and Default_pages has an SEOBundle row
+  with its meta tags and, for news, the Article and BreadcrumbList JSON-LD.
+  It is rebuilt once the transaction that saves the object or its SEO inline
+  commits (home.signals), or on first use when missing or outdated
+- the site-wide parts (Newspaper, Organization and WebSite JSON-LD, the meta
+  tags of the home page and of pages without an object) are built once per
+  settings version: when the site_info or navigation snapshot is reloaded
+
+A bundle is outdated when its version differs from the current one: a hash
+of the site-wide parts, the navigation, the release (conditional.get_version)
+and BUNDLE_FORMAT. Editing the site info or a section therefore rebuilds the
+bundles lazily as the pages are visited.
+
+Absolute URLs depend on the host of the request, so the builders run with a
+PlaceholderRequest and the origin and current URL are filled in when the
+tag renders. After bulk imports that bypass the signals:
+    python manage.py build_seo_bundles
+"""
+import hashlib
+import json
+import logging
+from urllib.parse import urlsplit
+
+from django.db import DatabaseError, transaction
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from home import commit_batch, conditional, snapshots
+from home.models import Default_pages, NavbarItem, News, SEOBundle, SubSection
+
+logger = logging.getLogger(__name__)
+
+# Bump when the builders change what a bundle contains
+BUNDLE_FORMAT = 1
+
+ORIGIN = '__seo_origin__'
+CURRENT_URL = '__seo_current_url__'
+
+NEWS = 'news'
+SECTION = 'section'
+SUBSECTION = 'subsection'
+PAGE = 'page'
+
+KINDS = {
+    NEWS: News,
+    SECTION: NavbarItem,
+    SUBSECTION: SubSection,
+    PAGE: Default_pages,
+}
+
+# Context variable -> bundle kind, in the order seo_meta_tags looks at them
+SUBJECTS = (
+    ('selected_subsection', SUBSECTION),
+    ('selected_section', SECTION),
+    ('news', NEWS),
+    ('page', PAGE),
+)
+CONTEXT_NAMES = {kind: name for name, kind in SUBJECTS}
+
+# JSON-LD built once for the whole site (the news bundles hold article and breadcrumb)
+SITE_SCHEMAS = ('newspaper', 'organization', 'website')
+
+STATE_KEY = 'home.seo'
+
+_site = None
+
+
+class PlaceholderRequest:
+    """The part of a request the SEO builders use, with placeholders for the host and URL"""
+
+    def __init__(self, path=''):
+        self.path = path
+
+    def build_absolute_uri(self, location=None):
+        if location is None:
+            return CURRENT_URL
+        if urlsplit(location).scheme or location.startswith('//'):
+            return location
+        return ORIGIN + location
+
+
+def _render_meta(data):
+    return render_to_string('seo/meta_tags.html', data)
+
+
+def _build_site():
+    from home.templatetags import seo_tags
+
+    home_context = {'request': PlaceholderRequest('/')}
+    context = {'request': PlaceholderRequest()}
+    site = {
+        'home_meta': _render_meta(seo_tags.seo_meta_tags(home_context)),
+        'meta': _render_meta(seo_tags.seo_meta_tags(context)),
+        'newspaper': str(seo_tags.newspaper_schema(context)),
+        'organization': str(seo_tags.organization_schema(context)),
+        'website': str(seo_tags.website_schema(context)),
+    }
+    # Section titles and URLs end up in the breadcrumbs of the news bundles
+    navigation = snapshots.navigation()
+    sections = [
+        (item.id, item.title, item.get_absolute_url())
+        for item in navigation['navbar_items'] + navigation['subsections']
+    ]
+    payload = json.dumps([BUNDLE_FORMAT, conditional.get_version(), site, sections], ensure_ascii=False)
+    site['version'] = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    return site
+
+
+def site_bundle():
+    """The site-wide strings and the current bundle version, rebuilt with the snapshots"""
+    global _site
+    site_info = snapshots.site_info()
+    navigation = snapshots.navigation()
+    cached = _site
+    if cached is None or cached[0] is not site_info or cached[1] is not navigation:
+        cached = _site = (site_info, navigation, _build_site())
+    return cached[2]
+
+
+def version():
+    return site_bundle()['version']
+
+
+def render(kind, obj):
+    """The meta tags and JSON-LD of one object, with placeholders for the host"""
+    from home.templatetags import seo_tags
+
+    context = {'request': PlaceholderRequest(), CONTEXT_NAMES[kind]: obj}
+    json_ld = {}
+    if kind == NEWS:
+        json_ld = {
+            'article': str(seo_tags.article_schema(context)),
+            'breadcrumb': str(seo_tags.breadcrumb_schema(context)),
+        }
+    return {'meta_tags': _render_meta(seo_tags.seo_meta_tags(context)), 'json_ld': json_ld}
+
+
+def build(kind, obj, current_version=None):
+    """Render the bundle of obj and store it; returns it even if it could not be stored"""
+    bundle = render(kind, obj)
+    try:
+        # A savepoint: two requests may build the same bundle at once
+        with transaction.atomic():
+            SEOBundle.objects.update_or_create(
+                kind=kind, object_id=obj.pk,
+                defaults={'version': current_version or version(), **bundle},
+            )
+    except DatabaseError as e:
+        logger.warning(f"Could not store the SEO bundle of {kind} {obj.pk}: {e}")
+    return bundle
+
+
+def get(kind, obj, current_version=None):
+    """The stored bundle of obj, built now if it is missing or outdated"""
+    current_version = current_version or version()
+    try:
+        row = (
+            SEOBundle.objects.filter(kind=kind, object_id=obj.pk)
+            .values_list('version', 'meta_tags', 'json_ld').first()
+        )
+    except DatabaseError as e:
+        logger.warning(f"Could not read the SEO bundle of {kind} {obj.pk}: {e}")
+        return render(kind, obj)
+    if row and row[0] == current_version:
+        return {'meta_tags': row[1], 'json_ld': row[2]}
+    return build(kind, obj, current_version)
+
+
+def rebuild(items):
+    """
+    Rebuild the bundles of these (kind, object id) pairs, dropping those of
+    deleted objects. Errors are logged, not raised: this runs after an admin
+    save and the next page view builds a missing bundle anyway.
+    """
+    try:
+        current_version = version()
+    except Exception as e:
+        logger.error(f"Could not rebuild SEO bundles: {e}", exc_info=True)
+        return
+    for kind, object_id in items:
+        try:
+            obj = KINDS[kind].objects.filter(pk=object_id).first()
+            if obj is None:
+                SEOBundle.objects.filter(kind=kind, object_id=object_id).delete()
+            else:
+                build(kind, obj, current_version)
+        except Exception as e:
+            logger.error(f"Could not rebuild the SEO bundle of {kind} {object_id}: {e}", exc_info=True)
+
+
+def schedule(kind, object_id):
+    """Rebuild the bundle once the current transaction commits (see sitemap_builder.schedule)"""
+    commit_batch.add(rebuild, [(kind, object_id)])
+
+
+# -- rendering ----------------------------------------------------------------------
+
+def _state(context):
+    """Lookups shared by the SEO tags of one page render"""
+    state = context.render_context.get(STATE_KEY)
+    if state is None:
+        request = context.get('request')
+        origin = current_url = ''
+        if request is not None:
+            origin = request.build_absolute_uri('/')[:-1]
+            current_url = request.build_absolute_uri()
+        state = context.render_context[STATE_KEY] = {
+            'site': site_bundle(),
+            'bundles': {},
+            'origin': origin,
+            'current_url': current_url,
+        }
+    return state
+
+
+def _bundle(state, kind, obj):
+    key = (kind, obj.pk)
+    if key not in state['bundles']:
+        state['bundles'][key] = get(kind, obj, state['site']['version'])
+    return state['bundles'][key]
+
+
+def _fill_html(text, state):
+    return mark_safe(
+        text.replace(ORIGIN, escape(state['origin'])).replace(CURRENT_URL, escape(state['current_url']))
+    )
+
+
+def _fill_json(text, state):
+    # json.dumps minus the quotes: the placeholders sit inside JSON strings
+    return mark_safe(
+        text.replace(ORIGIN, json.dumps(state['origin'], ensure_ascii=False)[1:-1])
+        .replace(CURRENT_URL, json.dumps(state['current_url'], ensure_ascii=False)[1:-1])
+    )
+
+
+def meta_tags(context):
+    """The meta tags of the page: the home page, its subject (see SUBJECTS) or the plain ones"""
+    state = _state(context)
+    request = context.get('request')
+    if request is not None and request.path == '/':
+        return _fill_html(state['site']['home_meta'], state)
+    for name, kind in SUBJECTS:
+        obj = context.get(name)
+        if obj and isinstance(obj, KINDS[kind]):
+            return _fill_html(_bundle(state, kind, obj)['meta_tags'], state)
+    return _fill_html(state['site']['meta'], state)
+
+
+def json_ld(context, name):
+    """One <script type="application/ld+json"> (SITE_SCHEMAS, or NEWS_SCHEMAS of context['news'])"""
+    state = _state(context)
+    if name in SITE_SCHEMAS:
+        return _fill_json(state['site'][name], state)
+    news = context.get('news')
+    if not news or not isinstance(news, News):
+        return ''
+    if name == 'breadcrumb' and context.get('request') is None:
+        return ''
+    return _fill_json(_bundle(state, NEWS, news)['json_ld'].get(name, ''), state)
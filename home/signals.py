@@ -0,0 +1,177 @@
+"""
+Signal handlers for the home app
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from home import freshness, purge, seo, sitemap_builder, snapshots
+from home.models import (
+    Default_pages, ElectionLiveScore, NavbarItem, News, NewsSEO, PageSEO, SectionSEO, SiteInfo,
+    SubSection, SubSectionSEO, Tag, URLRedirection,
+)
+
+# Model -> snapshot that has to be rebuilt when a row changes
+SNAPSHOT_MODELS = {
+    SiteInfo: 'site_info',
+    NavbarItem: 'navigation',
+    SubSection: 'navigation',
+    Default_pages: 'navigation',
+    URLRedirection: 'redirects',
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_snapshots(sender, **kwargs):
+    """
+    Rebuild the read-only snapshots when the admin edits the rows behind them.
+    After the commit: a worker that saw the new generation earlier would
+    reload the old rows and keep them for SNAPSHOT_TTL.
+    """
+    name = SNAPSHOT_MODELS.get(sender)
+    if name:
+        transaction.on_commit(partial(snapshots.invalidate, name))
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_freshness(sender, raw=False, **kwargs):
+    """
+    The lastmods of the article's section, subsection, tags and categories
+    moved. Connected before the sitemap receivers: on_commit callbacks run in
+    order, and the sitemaps read these maps.
+    """
+    if not raw:
+        transaction.on_commit(freshness.invalidate)
+
+
+@receiver(m2m_changed, sender=News.tags.through)
+@receiver(m2m_changed, sender=News.category.through)
+def invalidate_freshness_m2m(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        kind = 'tag' if sender is News.tags.through else 'category'
+        transaction.on_commit(partial(freshness.invalidate, kind))
+
+
+# Model -> sitemap files to rebuild when a row changes (News is handled below)
+SITEMAP_MODELS = {
+    NavbarItem: (sitemap_builder.SECTION, sitemap_builder.INDEX),
+    SubSection: (sitemap_builder.SECTION, sitemap_builder.INDEX),
+    Tag: (sitemap_builder.TOPIC, sitemap_builder.INDEX),
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def rebuild_sitemaps(sender, instance, **kwargs):
+    """Rewrite the sitemap files a change affects, after the transaction commits"""
+    if kwargs.get('raw'):
+        return
+    if sender is News:
+        sitemap_builder.schedule(*sitemap_builder.news_targets(instance))
+    elif sender in SITEMAP_MODELS:
+        sitemap_builder.schedule(*SITEMAP_MODELS[sender])
+
+
+@receiver(m2m_changed, sender=News.tags.through)
+def rebuild_topic_sitemap(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        sitemap_builder.schedule(sitemap_builder.TOPIC, sitemap_builder.INDEX)
+
+
+# Model -> surrogate keys to purge from the proxy cache when a row changes
+# (News and Tag are handled below). Navigation and site info are on every page.
+PURGE_MODELS = {
+    SiteInfo: (purge.SITE_KEY,),
+    NavbarItem: (purge.SITE_KEY,),
+    SubSection: (purge.SITE_KEY,),
+    Default_pages: (purge.SITE_KEY,),
+    ElectionLiveScore: (purge.SCOREBOARD_KEY,),
+}
+
+
+@receiver(pre_save, sender=News)
+def remember_news_listings(sender, instance, raw=False, **kwargs):
+    """Note the section and subsection an edit may move the article out of"""
+    if raw or not instance.pk or not purge.enabled():
+        return
+    instance._purge_previous = (
+        News.objects.filter(pk=instance.pk).values_list('section_id', 'sub_section_id').first()
+    )
+
+
+@receiver(post_save, sender=News)
+def purge_news(sender, instance, raw=False, **kwargs):
+    if raw or not purge.enabled():
+        return
+    keys = purge.news_keys(instance) + [purge.HOME_KEY, purge.SITEMAP_KEY]
+    previous = getattr(instance, '_purge_previous', None)
+    if previous:
+        section_id, sub_section_id = previous
+        if section_id:
+            keys.append(purge.section_key(section_id))
+        if sub_section_id:
+            keys.append(purge.subsection_key(sub_section_id))
+    purge.purge(*keys)
+
+
+@receiver(pre_delete, sender=News)
+def purge_deleted_news(sender, instance, **kwargs):
+    # Before the delete, while the tags are still linked
+    if purge.enabled():
+        purge.purge(*purge.news_keys(instance), purge.HOME_KEY, purge.SITEMAP_KEY)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def purge_models(sender, instance, **kwargs):
+    if kwargs.get('raw') or not purge.enabled():
+        return
+    if sender is Tag:
+        purge.purge(purge.tag_key(instance.pk))
+    elif sender in PURGE_MODELS:
+        purge.purge(*PURGE_MODELS[sender])
+
+
+@receiver(m2m_changed, sender=News.tags.through)
+def purge_news_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Tagging changes the article page and the topic pages on both sides"""
+    if not purge.enabled() or action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if action == 'pre_clear':
+        # pk_set is empty for clear(); take the links before they go
+        related = instance.news if reverse else instance.tags
+        pk_set = set(related.values_list('pk', flat=True))
+    if reverse:
+        # tag.news.add(...): instance is the tag, pk_set holds news ids
+        purge.purge(purge.tag_key(instance.pk), *(purge.news_key(pk) for pk in pk_set or ()))
+    else:
+        purge.purge(purge.news_key(instance.pk), *(purge.tag_key(pk) for pk in pk_set or ()))
+
+
+# Model -> (SEO bundle kind, field holding the id of the object it describes)
+SEO_MODELS = {
+    News: (seo.NEWS, 'pk'),
+    NavbarItem: (seo.SECTION, 'pk'),
+    SubSection: (seo.SUBSECTION, 'pk'),
+    Default_pages: (seo.PAGE, 'pk'),
+    NewsSEO: (seo.NEWS, 'news_id'),
+    SectionSEO: (seo.SECTION, 'section_id'),
+    SubSectionSEO: (seo.SUBSECTION, 'subsection_id'),
+    PageSEO: (seo.PAGE, 'page_id'),
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def rebuild_seo_bundles(sender, instance, **kwargs):
+    """Re-render the meta tags and JSON-LD of the object, after the transaction commits"""
+    if kwargs.get('raw') or sender not in SEO_MODELS:
+        return
+    kind, field = SEO_MODELS[sender]
+    object_id = getattr(instance, field)
+    if object_id:
+        seo.schedule(kind, object_id)
@@ -0,0 +1,271 @@
+"""
+Pre-built sitemap files
+
+The sitemaps used to be rendered on every crawler request. They are now
+written as files below SITEMAP_ROOT (default <MEDIA_ROOT>/sitemaps) and the
+sitemap views only send them, with Last-Modified/ETag and a .gz sibling for
+clients that accept gzip. A file is rebuilt when:
+- a News row (or a section, subsection or tag) is saved or deleted: once the
+  transaction commits, only the files it affects are rebuilt (home.signals)
+- it is older than SITEMAP_MAX_AGE seconds (SITEMAP_NEWS_MAX_AGE for the
+  48-hour Google News file, which also changes as scheduled articles go live
+  and old ones age out); the next request for it rebuilds it
+- `python manage.py build_sitemaps` runs (after bulk imports such as
+  generate_corpus, which bypass the signals)
+
+Each file is written to a temporary file and renamed into place, so readers
+never see a half-written sitemap. The <loc> URLs start with SITEMAP_BASE_URL,
+or https://<domain of the current Site>.
+"""
+import gzip
+import logging
+import os
+import re
+import tempfile
+import time
+
+from django.conf import settings
+from django.http import Http404
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import commit_batch, purge
+
+logger = logging.getLogger(__name__)
+
+INDEX = 'sitemap.xml'
+GOOGLE_NEWS = 'news-sitemap.xml'
+NEWS_INDEX = 'regular-news-sitemap.xml'
+SECTION = 'section-sitemap.xml'
+TOPIC = 'topic-sitemap.xml'
+STATIC_NAMES = (GOOGLE_NEWS, SECTION, TOPIC, NEWS_INDEX, INDEX)
+
+SHARD_RE = re.compile(r'^news-(\d{4})-(\d{2})(?:-p(\d+))?\.xml$')
+
+
+def sitemap_root():
+    root = getattr(settings, 'SITEMAP_ROOT', None)
+    return str(root) if root else os.path.join(settings.MEDIA_ROOT, 'sitemaps')
+
+
+def get_site_url():
+    base_url = getattr(settings, 'SITEMAP_BASE_URL', None)
+    if base_url:
+        return base_url.rstrip('/')
+    from django.contrib.sites.models import Site
+    return f"https://{Site.objects.get_current().domain}"
+
+
+def shard_name(year, month, page=1):
+    """File name of one page of a month of the regular news sitemap"""
+    suffix = f'-p{page}' if page > 1 else ''
+    return f'news-{year:04d}-{month:02d}{suffix}.xml'
+
+
+def max_age(name):
+    if name == GOOGLE_NEWS:
+        return getattr(settings, 'SITEMAP_NEWS_MAX_AGE', 10 * 60)
+    return getattr(settings, 'SITEMAP_MAX_AGE', 60 * 60)
+
+
+def is_fresh(name):
+    try:
+        mtime = os.stat(os.path.join(sitemap_root(), name)).st_mtime
+    except OSError:
+        return False
+    return time.time() - mtime < max_age(name)
+
+
+def render(name, site_url):
+    """
+    The content of a sitemap file as an iterable of str, or None if there is
+    no such sitemap (a month without published news)
+    """
+    from .google_news_sitemap_view import google_news_context
+    from .sitemap_views import news_shard_entries, section_sitemap_items, sitemap_index_entries, topic_sitemap_items
+    from .sitemaps import SITEMAPS, NewsSitemap
+
+    if name == INDEX:
+        context = {'sitemaps': sitemap_index_entries(site_url, SITEMAPS)}
+        return [render_to_string('sitemap_index.xml', context)]
+    if name == NEWS_INDEX:
+        return [render_to_string('sitemap_index.xml', {'sitemaps': news_shard_entries(site_url)})]
+    if name == GOOGLE_NEWS:
+        return [render_to_string('google_news_sitemap.xml', google_news_context(site_url))]
+    if name == TOPIC:
+        return [render_to_string('topic_sitemap.xml', {'items': topic_sitemap_items(site_url)})]
+    if name == SECTION:
+        return [render_to_string('topic_sitemap.xml', {'items': section_sitemap_items(site_url)})]
+
+    match = SHARD_RE.match(name)
+    if not match:
+        return None
+    year, month, page = int(match[1]), int(match[2]), int(match[3] or 1)
+    if not 1 <= month <= 12:
+        return None
+    sitemap = NewsSitemap()
+    if not sitemap.shard_items(year, month, page).exists():
+        return None
+    return sitemap.iter_xml(site_url, year, month, page)
+
+
+def _replace(path, write):
+    """Call write(fileobj) on a temporary file, then rename it over path"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write(name, chunks):
+    """Atomically write <name> and <name>.gz, streaming the chunks into both"""
+    root = sitemap_root()
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, name)
+    gz_fd, gz_tmp_path = tempfile.mkstemp(dir=root, prefix='.tmp-')
+    try:
+        with os.fdopen(gz_fd, 'wb') as gz_file:
+            with gzip.GzipFile(filename='', mode='wb', fileobj=gz_file, mtime=0) as compressor:
+                def write_both(f):
+                    for chunk in chunks:
+                        data = chunk.encode('utf-8')
+                        f.write(data)
+                        compressor.write(data)
+                _replace(path, write_both)
+            gz_file.flush()
+            os.fsync(gz_file.fileno())
+        os.chmod(gz_tmp_path, 0o644)
+        # After the .xml, so the sibling is never older than its original
+        os.replace(gz_tmp_path, path + '.gz')
+    except BaseException:
+        try:
+            os.unlink(gz_tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def remove(name):
+    for path in (name, name + '.gz'):
+        try:
+            os.unlink(os.path.join(sitemap_root(), path))
+        except FileNotFoundError:
+            pass
+
+
+def build(name, site_url=None):
+    """(Re)write one sitemap file; False (and the file removed) if it has no content"""
+    chunks = render(name, site_url or get_site_url())
+    if chunks is None:
+        remove(name)
+        return False
+    write(name, chunks)
+    return True
+
+
+def month_names(year, month):
+    """Every file of a month: its current pages plus pages left on disk"""
+    from .sitemaps import NewsSitemap
+
+    names = {shard_name(year, month, page) for page in range(1, NewsSitemap().month_pages(year, month) + 1)}
+    prefix = shard_name(year, month)[:-len('.xml')]
+    try:
+        names.update(entry for entry in os.listdir(sitemap_root()) if entry.startswith(prefix) and entry.endswith('.xml'))
+    except FileNotFoundError:
+        pass
+    return names
+
+
+def rebuild(targets):
+    """
+    Rebuild file names and (year, month) shards. Errors are logged, not raised:
+    this runs after an admin save and the TTL will retry.
+    """
+    try:
+        names = set()
+        for target in targets:
+            if isinstance(target, tuple):
+                names.update(month_names(*target))
+            else:
+                names.add(target)
+        site_url = get_site_url()
+    except Exception as e:
+        logger.error(f"Could not rebuild sitemaps: {e}", exc_info=True)
+        return
+
+    # Shards first, the indexes list them
+    for name in sorted(names, key=lambda name: name in (NEWS_INDEX, INDEX)):
+        try:
+            build(name, site_url)
+        except Exception as e:
+            logger.error(f"Could not rebuild sitemap {name}: {e}", exc_info=True)
+
+
+def schedule(*targets):
+    """
+    Rebuild these files / (year, month) shards once the current transaction
+    commits. The calls of one transaction are merged into one rebuild, and a
+    rollback drops them (home.commit_batch).
+    """
+    commit_batch.add(rebuild, targets)
+
+
+def news_targets(news):
+    """What a change to this article affects"""
+    targets = [GOOGLE_NEWS, SECTION, TOPIC, NEWS_INDEX, INDEX]
+    if news.created_at:
+        created = timezone.localtime(news.created_at)
+        targets.append((created.year, created.month))
+    return targets
+
+
+def build_all():
+    """Rebuild every sitemap file and drop the shards of months that no longer have news"""
+    from .sitemaps import NewsSitemap
+
+    site_url = get_site_url()
+    names = [shard_name(shard['year'], shard['month'], shard['page']) for shard in NewsSitemap().shards()]
+    for name in names:
+        build(name, site_url)
+    for name in STATIC_NAMES:
+        build(name, site_url)
+
+    current = set(names)
+    try:
+        entries = os.listdir(sitemap_root())
+    except FileNotFoundError:
+        entries = []
+    stale = [entry for entry in entries if SHARD_RE.match(entry) and entry not in current]
+    for name in stale:
+        remove(name)
+    return names + list(STATIC_NAMES), stale
+
+
+def serve(request, name):
+    """Send a sitemap file, (re)building it first if it is missing or too old"""
+    from .media_views import serve as serve_file
+
+    purge.add_keys(purge.SITEMAP_KEY)
+    if not is_fresh(name):
+        try:
+            exists = build(name)
+        except Exception as e:
+            logger.error(f"Could not build sitemap {name}: {e}", exc_info=True)
+            # Keep serving the previous file if there is one
+            exists = os.path.exists(os.path.join(sitemap_root(), name))
+            if not exists:
+                raise
+        if not exists:
+            raise Http404("No such sitemap")
+    return serve_file(request, name, document_root=sitemap_root(), kind='sitemap')
@@ -1,61 +1,107 @@
 """
-Custom sitemap index view to generate the correct sitemap URLs
+Custom sitemap views to generate the correct sitemap URLs
+
+Every view serves a file pre-built by home.sitemap_builder; the *_items /
+*_entries helpers below produce what goes into those files.
 """
 from django.contrib.sitemaps import Sitemap
-from django.template.response import TemplateResponse
-from django.contrib.sites.shortcuts import get_current_site
+from django.db import DatabaseError
+from django.http import Http404
 from django.utils import timezone
 from django.urls import reverse
-from .sitemaps import GoogleNewsSitemap, TopicSitemap
+from .sitemaps import GoogleNewsSitemap, NewsSitemap, SectionSitemap, TopicSitemap
+from . import sitemap_builder
+
+
+def news_shard_entries(site_url):
+    """Sitemap index entries for the monthly news sitemap shards"""
+    entries = []
+    for shard in NewsSitemap().shards():
+        url_path = reverse('news-sitemap-shard', kwargs={
+            'year': f"{shard['year']:04d}",
+            'month': f"{shard['month']:02d}",
+        })
+        if shard['page'] > 1:
+            url_path += f"?p={shard['page']}"
+        entries.append({
+            'location': f"{site_url}{url_path}",
+            'lastmod': shard['lastmod'],
+        })
+    return entries
+
+
+def news_sitemap_index(request):
+    """
+    /sitemaps/regular-news-sitemap.xml: an index of the monthly shards, so the
+    URL already submitted to search engines keeps working
+    """
+    return sitemap_builder.serve(request, 'regular-news-sitemap.xml')
+
+
+def news_sitemap_shard(request, year, month):
+    """One month of the regular news sitemap (?p=2 for months over the URL limit)"""
+    year, month = int(year), int(month)
+    try:
+        page = int(request.GET.get('p', 1))
+    except ValueError:
+        raise Http404("Invalid page")
+    if not 1 <= month <= 12 or page < 1:
+        raise Http404("No such sitemap")
+    return sitemap_builder.serve(request, sitemap_builder.shard_name(year, month, page))
+
+
+def sitemap_items(sitemap, items, site_url):
+    """<url> entries for topic_sitemap.xml"""
+    result = []
+    for item in items:
+        try:
+            lastmod = sitemap.lastmod(item)
+            result.append({
+                'location': f"{site_url}{sitemap.location(item)}",
+                'lastmod': lastmod.strftime('%Y-%m-%d') if lastmod else timezone.now().strftime('%Y-%m-%d'),
+                'changefreq': sitemap.changefreq,
+                'priority': sitemap.priority,
+            })
+        except DatabaseError:
+            # Not a bad item: an empty file would replace the good one
+            raise
+        except Exception:
+            continue
+    return result
+
+
+def topic_sitemap_items(site_url):
+    """
+    Topic sitemap entries; <loc> keeps Unicode (Bengali) characters. Errors
+    are raised so sitemap_builder keeps the previous file
+    """
+    sitemap = TopicSitemap()
+    return sitemap_items(sitemap, sitemap.items(), site_url)
+
+
+def section_sitemap_items(site_url):
+    """Section and subsection sitemap entries (errors are raised, as above)"""
+    sitemap = SectionSitemap()
+    return sitemap_items(sitemap, sitemap.items(), site_url)
 
 
 def topic_sitemap_view(request):
     """
     Custom view for Topic sitemap that allows Unicode (Bengali) characters in <loc>
     """
-    try:
-        sitemap = TopicSitemap()
-        items = list(sitemap.items())
-        
-        # Get site info
-        current_site = get_current_site(request)
-        protocol = 'https' if request.is_secure() else 'http'
-        site_url = f"{protocol}://{current_site.domain}"
-        
-        # Prepare items
-        sitemap_items = []
-        for item in items:
-            try:
-                sitemap_items.append({
-                    'location': f"{site_url}{sitemap.location(item)}",
-                    'lastmod': sitemap.lastmod(item).strftime('%Y-%m-%d') if sitemap.lastmod(item) else timezone.now().strftime('%Y-%m-%d'),
-                    'changefreq': sitemap.changefreq,
-                    'priority': sitemap.priority,
-                })
-            except Exception:
-                continue
-        
-        return TemplateResponse(
-            request,
-            'topic_sitemap.xml',
-            {'items': sitemap_items},
-            content_type='application/xml'
-        )
-    except Exception:
-        # Return empty on error
-        return TemplateResponse(
-            request,
-            'topic_sitemap.xml',
-            {'items': []},
-            content_type='application/xml'
-        )
-
-
-
-def custom_sitemap_index(request, sitemaps):
+    return sitemap_builder.serve(request, 'topic-sitemap.xml')
+
+
+def section_sitemap_view(request):
+    """Sitemap for sections and subsections"""
+    return sitemap_builder.serve(request, 'section-sitemap.xml')
+
+
+def sitemap_index_entries(site_url, sitemaps):
     """
-    Custom sitemap index view that generates URLs in the format:
+    Sitemap index entries in the format:
     /sitemaps/news-sitemap.xml (Google News sitemap)
+    /sitemaps/news-2026-01.xml (regular news sitemap, one per month)
     /sitemaps/section-sitemap.xml
     /sitemaps/topic-sitemap.xml
     """
@@ -65,56 +111,34 @@ def custom_sitemap_index(request, sitemaps):
         'topic': 'topic-sitemap',
         'category': 'category-sitemap',
     }
-    
-    # Build sitemap entries with custom URLs
-    current_site = get_current_site(request)
-    protocol = 'https' if request.is_secure() else 'http'
-    
+
     sitemaps_list = []
     for section, site in sitemaps.items():
         # Special handling for Google News sitemap
         if section == 'news':
-            # Use GoogleNewsSitemap to get lastmod
-            google_news_sitemap = GoogleNewsSitemap()
-            items = list(google_news_sitemap.items())
-            lastmod = None
-            if items:
-                try:
-                    lastmods = []
-                    for item in items[:100]:  # Limit to first 100 items for performance
-                        try:
-                            item_lastmod = google_news_sitemap.lastmod(item)
-                            if item_lastmod:
-                                lastmods.append(item_lastmod)
-                        except Exception:
-                            continue
-                    if lastmods:
-                        lastmod = max(lastmods)
-                except Exception:
-                    try:
-                        if items[0]:
-                            lastmod = google_news_sitemap.lastmod(items[0])
-                    except Exception:
-                        pass
+            # Newest article in the Google News window, one aggregate query
+            lastmod = GoogleNewsSitemap().latest_lastmod()
             
             # Build URL for Google News sitemap
             try:
                 url_path = reverse('google-news-sitemap')
-                loc = f"{protocol}://{current_site.domain}{url_path}"
+                loc = f"{site_url}{url_path}"
             except Exception:
-                loc = f"{protocol}://{current_site.domain}/sitemaps/news-sitemap.xml"
-            
+                loc = f"{site_url}/sitemaps/news-sitemap.xml"
+
             sitemaps_list.append({
                 'location': loc,
                 'lastmod': lastmod,
             })
+            # The regular news sitemap, one shard per month
+            sitemaps_list.extend(news_shard_entries(site_url))
         else:
             # Regular sitemap handling
             if isinstance(site, type) and issubclass(site, Sitemap):
                 site_instance = site()
             else:
                 site_instance = site
-            
+
             # Get the last modification date (most recent update)
             items = list(site_instance.items())
             lastmod = None
@@ -138,25 +162,25 @@ def custom_sitemap_index(request, sitemaps):
                             lastmod = site_instance.lastmod(items[0])
                     except Exception:
                         pass
-            
+
             # Use custom URL name if available
             url_name = sitemap_url_map.get(section, f'sitemap-{section}')
-            
+
             # Build the URL
             try:
                 url_path = reverse(url_name)
-                loc = f"{protocol}://{current_site.domain}{url_path}"
+                loc = f"{site_url}{url_path}"
             except Exception:
                 # Fallback to default format
-                loc = f"{protocol}://{current_site.domain}/sitemaps/{section}-sitemap.xml"
-            
+                loc = f"{site_url}/sitemaps/{section}-sitemap.xml"
+
             sitemaps_list.append({
                 'location': loc,
                 'lastmod': lastmod,
             })
-    
-    # Render the sitemap index template
-    return TemplateResponse(request, 'sitemap_index.xml', {
-        'sitemaps': sitemaps_list,
-    }, content_type='application/xml')
+    return sitemaps_list
+
 
+def custom_sitemap_index(request):
+    """Sitemap index (/sitemap.xml) listing every sitemap in home.sitemaps.SITEMAPS"""
+    return sitemap_builder.serve(request, 'sitemap.xml')
@@ -1,30 +1,94 @@
 """
 Sitemap configuration for Jagoron News
 """
+import math
 from django.contrib.sitemaps import Sitemap
+from django.db.models import Count, Max
+from django.db.models.functions import TruncMonth
 from django.urls import reverse
-from .models import News, NavbarItem, SubSection, Category, SiteInfo, Tag
+from .models import News, NavbarItem, SubSection, Category, Tag
+from . import freshness, snapshots
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 from urllib.parse import quote
+from xml.sax.saxutils import escape
 
 
 class NewsSitemap(Sitemap):
-    """Regular sitemap for news articles"""
+    """
+    Regular sitemap for news articles, sharded by the month the article was
+    published in (/sitemaps/news-2026-01.xml). The archive only grows, so a
+    shard is streamed from a server-side cursor that fetches just the id,
+    slugs and updated_at of each article instead of whole News rows.
+    """
     changefreq = 'daily'
     priority = 0.8
-    
-    def items(self):
-        """Return all published news articles"""
-        return News.published.all().order_by('-created_at')
-    
-    def lastmod(self, obj):
-        """Return the last modification date"""
-        return obj.updated_at
-    
-    def location(self, obj):
-        """Return the URL for the news article"""
-        return obj.get_absolute_url()
+    limit = 50000  # Max URLs per sitemap file; bigger months get ?p=2, ...
+    chunk_size = 2000
+
+    def shards(self):
+        """
+        One entry per month (and page) that has published news, newest first:
+        [{'year', 'month', 'page', 'lastmod'}]. A single aggregate query.
+        """
+        months = (
+            News.published
+            .annotate(month=TruncMonth('created_at'))
+            .values('month')
+            .annotate(lastmod=Max('updated_at'), count=Count('id'))
+            .order_by('-month')
+        )
+        shards = []
+        for row in months:
+            pages = max(1, math.ceil(row['count'] / self.limit))
+            for page in range(1, pages + 1):
+                shards.append({
+                    'year': row['month'].year,
+                    'month': row['month'].month,
+                    'page': page,
+                    'lastmod': row['lastmod'],
+                })
+        return shards
+
+    def month_news(self, year, month):
+        """Published news created in that month (in the current time zone, as TruncMonth)"""
+        tz = timezone.get_current_timezone()
+        start = datetime(year, month, 1, tzinfo=tz)
+        end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=tz)
+        return News.published.filter(created_at__gte=start, created_at__lt=end)
+
+    def month_pages(self, year, month):
+        """Number of shard pages of a month (0 if it has no published news)"""
+        return math.ceil(self.month_news(year, month).count() / self.limit)
+
+    def shard_items(self, year, month, page=1):
+        """(id, section slug, subsection slug, updated_at) rows of one shard"""
+        offset = (page - 1) * self.limit
+        return (
+            self.month_news(year, month)
+            .order_by('created_at', 'id')
+            .values_list('id', 'section__english_title', 'sub_section__english_title', 'updated_at')
+            [offset:offset + self.limit]
+        )
+
+    def iter_xml(self, site_url, year, month, page=1):
+        """Yield the <urlset> of one shard in chunks of `chunk_size` entries"""
+        yield (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        )
+        tail = f'<changefreq>{self.changefreq}</changefreq><priority>{self.priority}</priority></url>\n'
+        buffer = []
+        rows = self.shard_items(year, month, page).iterator(chunk_size=self.chunk_size)
+        for news_id, section_slug, sub_section_slug, updated_at in rows:
+            loc = escape(site_url + News.build_url(news_id, section_slug, sub_section_slug))
+            lastmod = timezone.localtime(updated_at).isoformat(timespec='seconds')
+            buffer.append(f'<url><loc>{loc}</loc><lastmod>{lastmod}</lastmod>{tail}')
+            if len(buffer) >= self.chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+        buffer.append('</urlset>\n')
+        yield ''.join(buffer)
 
 
 class GoogleNewsSitemap(Sitemap):
@@ -36,8 +100,8 @@ class GoogleNewsSitemap(Sitemap):
     priority = 1.0
     limit = 1000  # Google News max limit
     
-    def items(self):
-        """Return only news articles from the last 48 hours"""
+    def window(self):
+        """Published news from the last 48 hours, newest first"""
         # Get news from last 48 hours
         # Use timezone-aware datetime
         now = timezone.now()
@@ -46,17 +110,27 @@ class GoogleNewsSitemap(Sitemap):
         # Query for published news from last 48 hours
         # Use created_at (publication date) not updated_at
         # For scheduled news, use scheduled_publish_at if it exists and is in the past
-        queryset = News.published.filter(
+        return News.published.filter(
             created_at__gte=cutoff_time
-        ).order_by('-created_at')[:1000]  # Max 1000 URLs
-        
-        # Debug: Log the query results
-        import logging
-        logger = logging.getLogger(__name__)
-        count = queryset.count()
-        logger.info(f"GoogleNewsSitemap.items(): Found {count} news items from last 48 hours (cutoff: {cutoff_time})")
-        
-        return queryset
+        ).order_by('-created_at')[:self.limit]  # Max 1000 URLs
+    
+    def items(self):
+        """Return only news articles from the last 48 hours"""
+        return self.with_related(self.window())
+    
+    def with_related(self, queryset):
+        """Fetch what an entry needs (section, subsection, categories) with the articles"""
+        return queryset.select_related('section', 'sub_section').prefetch_related('category')
+    
+    def versions(self):
+        """(id, updated_at) of the articles in the window, one cheap query"""
+        return list(self.window().values_list('id', 'updated_at'))
+    
+    def latest_lastmod(self):
+        """Newest lastmod (created_at) in the window"""
+        return News.published.filter(
+            created_at__gte=timezone.now() - timedelta(hours=48)
+        ).aggregate(latest=Max('created_at'))['latest']
     
     def lastmod(self, obj):
         """Return the publication date (created_at for Google News)"""
@@ -68,7 +142,7 @@ class GoogleNewsSitemap(Sitemap):
     
     def get_publication_name(self):
         """Get the publication name from SiteInfo"""
-        site_info = SiteInfo.objects.first()
+        site_info = snapshots.site_info()
         return site_info.name if site_info and site_info.name else "জাগরণ নিউজ"
     
     def get_publication_language(self):
@@ -154,16 +228,9 @@ class SectionSitemap(Sitemap):
     
     def lastmod(self, item):
         """Return the last modification date"""
-        # Get the most recent news update for this section/subsection
-        obj = item['obj']
-        if item['type'] == 'section':
-            latest_news = News.published.filter(section=obj).order_by('-updated_at').first()
-        else:  # subsection
-            latest_news = News.published.filter(sub_section=obj).order_by('-updated_at').first()
-        
-        if latest_news:
-            return latest_news.updated_at
-        return timezone.now()
+        # The most recent news update for this section/subsection
+        kind = 'section' if item['type'] == 'section' else 'sub_section'
+        return freshness.get(kind).get(item['obj'].pk) or timezone.now()
     
     def location(self, item):
         """Return the URL for the section or subsection"""
@@ -178,25 +245,12 @@ class TopicSitemap(Sitemap):
     
     def items(self):
         """Return all tags that have published news"""
-        # Only include tags that have published news
-        tags_with_news = Tag.objects.filter(
-            news__isnull=False
-        ).distinct()
-        
-        # Filter to only those with published news
-        result = []
-        for tag in tags_with_news:
-            if News.published.filter(tags=tag).exists():
-                result.append(tag)
-        
-        return result
+        self.lastmods = freshness.get('tag')
+        return list(Tag.objects.filter(pk__in=list(self.lastmods)))
     
     def lastmod(self, obj):
         """Return the last modification date of the most recent news with this tag"""
-        latest_news = News.published.filter(tags=obj).order_by('-updated_at').first()
-        if latest_news:
-            return latest_news.updated_at
-        return timezone.now()
+        return self.lastmods.get(obj.pk) or timezone.now()
     
     def location(self, obj):
         """Return the URL for the tag in format /topic/{tag-name}"""
@@ -211,26 +265,13 @@ class CategorySitemap(Sitemap):
     priority = 0.6
     
     def items(self):
-        """Return all categories that have news"""
-        # Only include categories that have published news
-        categories_with_news = Category.objects.filter(
-            news__isnull=False
-        ).distinct()
-        
-        # Filter to only those with published news
-        result = []
-        for category in categories_with_news:
-            if News.published.filter(category=category).exists():
-                result.append(category)
-        
-        return result
+        """Return all categories that have published news"""
+        self.lastmods = freshness.get('category')
+        return list(Category.objects.filter(pk__in=list(self.lastmods)))
     
     def lastmod(self, obj):
         """Return the last modification date of the most recent news in this category"""
-        latest_news = News.published.filter(category=obj).order_by('-updated_at').first()
-        if latest_news:
-            return latest_news.updated_at
-        return timezone.now()
+        return self.lastmods.get(obj.pk) or timezone.now()
     
     def location(self, obj):
         """Return the URL for the category"""
@@ -241,3 +282,12 @@ class CategorySitemap(Sitemap):
         category_name = quote(obj.name) if obj.name else ''
         return f'/news/?category={category_name}'
 
+
+
+# Sitemaps listed in the sitemap index (/sitemap.xml)
+SITEMAPS = {
+    'news': NewsSitemap,
+    'section': SectionSitemap,
+    'topic': TopicSitemap,
+    'category': CategorySitemap,
+}
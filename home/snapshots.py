@@ -0,0 +1,167 @@
+"""
+Read-only snapshots of data every page needs (site info, navigation, redirects)
+
+The rows change a few times a month but were queried on every request by the
+context processor, the redirect middleware and the SEO tags. A snapshot is
+loaded once per process (core.warmup loads them in the master before the
+workers fork, so the objects are shared copy-on-write) and rebuilt when:
+- a post_save/post_delete signal in this process invalidates it once the
+  transaction commits (home.signals)
+- another process invalidated it: the generation stamp in the cache changed
+  (needs a shared cache backend; checked every SNAPSHOT_CHECK_INTERVAL seconds)
+- it is older than SNAPSHOT_TTL seconds
+
+Treat the returned objects as read-only: they are shared by all requests.
+"""
+import logging
+import threading
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+
+from home import metrics
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'home:snapshot:{name}'
+
+
+class Snapshot:
+    """A lazily loaded, process-wide value rebuilt by `loader` when stale"""
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.value = None
+        self.loaded = False
+        self.loaded_at = 0
+        self.loaded_ns = 0
+        self.checked_at = 0
+        self.generation = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Run the loader (DB only, no cache access: this also runs before fork)"""
+        with self.lock:
+            # Wall clock, comparable with the generation stamps of other processes
+            started = time.time_ns()
+            self.value = self.loader()
+            self.loaded_ns = started
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+            # Force a generation check on first use in every worker
+            self.checked_at = 0
+        return self.value
+
+    def is_stale(self):
+        now = time.monotonic()
+        if now - self.loaded_at > getattr(settings, 'SNAPSHOT_TTL', 300):
+            return True
+        if now - self.checked_at > getattr(settings, 'SNAPSHOT_CHECK_INTERVAL', 5):
+            self.checked_at = now
+            try:
+                generation = cache.get(GENERATION_KEY.format(name=self.name))
+            except Exception:
+                return False
+            if self.generation is None:
+                # First check since a load (e.g. before fork): an invalidation
+                # published after the loader started is newer than our copy
+                self.generation = generation
+                if generation is not None and generation > self.loaded_ns:
+                    return True
+            elif generation != self.generation:
+                self.generation = generation
+                return True
+        return False
+
+    def get(self):
+        # site_info can legitimately be None, hence the separate flag
+        hit = self.loaded and not self.is_stale()
+        metrics.record_cache(f'snapshot.{self.name}', hit)
+        if not hit:
+            try:
+                self.load()
+            except Exception as e:
+                # Keep serving the previous snapshot if the database hiccups
+                logger.error(f"Could not load snapshot {self.name}: {e}")
+                if not self.loaded:
+                    raise
+        return self.value
+
+    def invalidate(self):
+        """Drop this process's copy and tell the other processes through the cache"""
+        self.loaded = False
+        self.generation = time.time_ns()
+        try:
+            cache.set(GENERATION_KEY.format(name=self.name), self.generation, None)
+        except Exception as e:
+            logger.warning(f"Could not publish snapshot invalidation for {self.name}: {e}")
+
+
+def _load_site_info():
+    from home.models import SiteInfo
+    return SiteInfo.objects.first()
+
+
+def _load_navigation():
+    from home.models import Default_pages, NavbarItem, SubSection
+
+    navbar_items = tuple(NavbarItem.objects.filter(is_active=True).order_by('position'))
+    subsections = tuple(
+        SubSection.objects.filter(is_active=True).select_related('section').order_by('position')
+    )
+    # Group subsections by section, as the header template expects
+    subsection_map = {}
+    for sub in subsections:
+        if sub.section:
+            subsection_map.setdefault(sub.section.id, []).append(sub)
+
+    return MappingProxyType({
+        'navbar_items': navbar_items,
+        'subsections': subsections,
+        'subsection_map': MappingProxyType({key: tuple(value) for key, value in subsection_map.items()}),
+        'default_pages': tuple(Default_pages.objects.all()),
+    })
+
+
+def _load_redirects():
+    from home.models import URLRedirection
+    return MappingProxyType({
+        old_url: (new_url, redirect_type)
+        for old_url, new_url, redirect_type in URLRedirection.objects.filter(is_active=True)
+        .values_list('old_url', 'new_url', 'redirect_type')
+    })
+
+
+SNAPSHOTS = {
+    'site_info': Snapshot('site_info', _load_site_info),
+    'navigation': Snapshot('navigation', _load_navigation),
+    'redirects': Snapshot('redirects', _load_redirects),
+}
+
+
+def site_info():
+    """The SiteInfo row (or None)"""
+    return SNAPSHOTS['site_info'].get()
+
+
+def navigation():
+    """navbar_items, subsections, subsection_map and default_pages"""
+    return SNAPSHOTS['navigation'].get()
+
+
+def redirects():
+    """old_url -> (new_url, redirect_type) for the active redirections"""
+    return SNAPSHOTS['redirects'].get()
+
+
+def invalidate(name):
+    SNAPSHOTS[name].invalidate()
+
+
+def load_all():
+    """Load every snapshot now (used by the pre-fork warm-up)"""
+    for snapshot in SNAPSHOTS.values():
+        snapshot.load()
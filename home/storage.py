@@ -0,0 +1,49 @@
+"""
+Static asset pipeline for Jagoron News
+
+collectstatic with StaticAssetStorage writes every file under a content-hashed
+name (style.3f2a9c81b7d4.css) plus .gz and .br siblings, so /static/ can be
+served with `Cache-Control: immutable` (see home.media_views.serve).
+
+Enable in settings:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'home.storage.StaticAssetStorage'},
+    }
+    MIDDLEWARE += ['home.middleware.PreloadHeaderMiddleware']
+"""
+from django.conf import settings
+from django.templatetags.static import static
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+# Assets every page needs before first paint: (path, as, type)
+# Only the Bangla subsets: the Latin ones are small and not always needed
+DEFAULT_PRELOAD_ASSETS = [
+    ('fonts/subset/fonts.css', 'style', 'text/css'),
+    ('fonts/subset/NotoSerifBengali-Medium.bangla.woff2', 'font', 'font/woff2'),
+    ('fonts/subset/NotoSerifBengali-Bold.bangla.woff2', 'font', 'font/woff2'),
+]
+
+# Third-party origins to connect to early: (origin, crossorigin)
+# Empty since the fonts are self-hosted (see the subset_fonts command)
+DEFAULT_PRECONNECT_ORIGINS = []
+
+
+class StaticAssetStorage(CompressedManifestStaticFilesStorage):
+    """
+    Hashed names + gzip/Brotli siblings (Brotli needs the `Brotli` package).
+    A file missing from the manifest falls back to its plain name instead of
+    raising, so a forgotten collectstatic never takes pages down.
+    """
+    manifest_strict = False
+
+
+def get_preload_assets():
+    """(url, as, type) for the critical assets, resolved to their hashed URLs"""
+    assets = getattr(settings, 'PRELOAD_ASSETS', DEFAULT_PRELOAD_ASSETS)
+    return [(static(path), as_type, mime) for path, as_type, mime in assets]
+
+
+def get_preconnect_origins():
+    """Origins to open a connection to while the HTML is still downloading"""
+    return getattr(settings, 'PRECONNECT_ORIGINS', DEFAULT_PRECONNECT_ORIGINS)
@@ -0,0 +1,32 @@
+"""
+Template tags for critical asset hints
+"""
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from home.storage import get_preconnect_origins, get_preload_assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def preload_assets():
+    """
+    <link rel="preconnect"> / <link rel="preload"> tags for the critical assets.
+    Same list as PreloadHeaderMiddleware, for clients that ignore the header.
+    """
+    preconnects = format_html_join(
+        '\n    ', '<link rel="preconnect" href="{}"{}>',
+        (
+            (origin, format_html(' crossorigin') if crossorigin else '')
+            for origin, crossorigin in get_preconnect_origins()
+        ),
+    )
+    preloads = format_html_join(
+        '\n    ', '<link rel="preload" href="{}" as="{}" type="{}"{}>',
+        (
+            (url, as_type, mime, format_html(' crossorigin') if as_type == 'font' else '')
+            for url, as_type, mime in get_preload_assets()
+        ),
+    )
+    return format_html('{}\n    {}', preconnects, preloads)
@@ -1,5 +1,6 @@
 from django import template
-from bs4 import BeautifulSoup
+
+from home import bangla
 
 register = template.Library()
 
@@ -8,6 +9,9 @@ def clean_rich_text(value):
     if not value:
         return ''
     
+    # Imported here: bs4 costs worker boot time and memory even on pages without rich text
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(value, 'html.parser')
     
     # CKEditor 5 relies on classes and sometimes inline styles for alignment and resizing.
@@ -22,10 +26,8 @@ def clean_rich_text(value):
 
 @register.filter
 def to_bengali(value):
-    bengali_digits = ['০', '১', '২', '৩', '৪', '৫', '৬', '৭', '৮', '৯']
-    value_str = str(value)
-    bengali_value = ''.join([bengali_digits[int(digit)] for digit in value_str if digit.isdigit()])
-    return bengali_value
+    # Digits only: "12:30" -> "১২৩০"
+    return bangla.digits_only(value)
 
 
 @register.filter
@@ -1,17 +1,54 @@
 """
 Template tags for SEO meta tags and structured data
+
+The tags emit the strings precomputed by home.seo. The functions below
+them build those strings: they run with a home.seo.PlaceholderRequest when a
+bundle is (re)built, not on every render.
 """
 from django import template
 from django.utils.safestring import mark_safe
 from django.conf import settings
-from home.models import SiteInfo
+from home import seo, snapshots
 import json
 from datetime import datetime
 
 register = template.Library()
 
 
-@register.inclusion_tag('seo/meta_tags.html', takes_context=True)
+@register.simple_tag(takes_context=True, name='seo_meta_tags')
+def cached_meta_tags(context):
+    """Title, description, canonical, Open Graph and Twitter tags of the page"""
+    return seo.meta_tags(context)
+
+
+@register.simple_tag(takes_context=True, name='article_schema')
+def cached_article_schema(context):
+    return seo.json_ld(context, 'article')
+
+
+@register.simple_tag(takes_context=True, name='breadcrumb_schema')
+def cached_breadcrumb_schema(context):
+    return seo.json_ld(context, 'breadcrumb')
+
+
+@register.simple_tag(takes_context=True, name='organization_schema')
+def cached_organization_schema(context):
+    return seo.json_ld(context, 'organization')
+
+
+@register.simple_tag(takes_context=True, name='website_schema')
+def cached_website_schema(context):
+    return seo.json_ld(context, 'website')
+
+
+@register.simple_tag(takes_context=True, name='newspaper_schema')
+def cached_newspaper_schema(context):
+    return seo.json_ld(context, 'newspaper')
+
+
+# -- builders (home.seo) -------------------------------------------------------------
+
+
 def seo_meta_tags(context):
     """
     Generate all SEO meta tags (title, description, author, OG, Twitter)
@@ -23,7 +60,7 @@ def seo_meta_tags(context):
     selected_subsection = context.get('selected_subsection')
     
     # Get site info
-    site_info = SiteInfo.objects.first()
+    site_info = snapshots.site_info()
     site_name = site_info.name if site_info else "জাগরণ নিউজ"
     
     # Get current URL
@@ -227,7 +264,6 @@ def seo_meta_tags(context):
     return seo_data
 
 
-@register.simple_tag(takes_context=True)
 def article_schema(context):
     """
     Generate Article structured data (JSON-LD) for news articles
@@ -238,7 +274,7 @@ def article_schema(context):
     if not news:
         return ''
     
-    site_info = SiteInfo.objects.first()
+    site_info = snapshots.site_info()
     site_name = site_info.name if site_info else "জাগরণ নিউজ"
     site_url = request.build_absolute_uri('/') if request else ''
     
@@ -287,13 +323,12 @@ def article_schema(context):
     return mark_safe(f'<script type="application/ld+json">{json.dumps(schema, ensure_ascii=False, indent=2)}</script>')
 
 
-@register.simple_tag(takes_context=True)
 def organization_schema(context):
     """
     Generate Organization structured data (JSON-LD) - should be on all pages
     """
     request = context.get('request')
-    site_info = SiteInfo.objects.first()
+    site_info = snapshots.site_info()
     
     if not site_info:
         return ''
@@ -313,7 +348,6 @@ def organization_schema(context):
     return mark_safe(f'<script type="application/ld+json">{json.dumps(schema, ensure_ascii=False, indent=2)}</script>')
 
 
-@register.simple_tag(takes_context=True)
 def breadcrumb_schema(context):
     """
     Generate Breadcrumb structured data (JSON-LD)
@@ -362,13 +396,12 @@ def breadcrumb_schema(context):
     return mark_safe(f'<script type="application/ld+json">{json.dumps(schema, ensure_ascii=False, indent=2)}</script>')
 
 
-@register.simple_tag(takes_context=True)
 def website_schema(context):
     """
     Generate Website structured data (JSON-LD) - for homepage
     """
     request = context.get('request')
-    site_info = SiteInfo.objects.first()
+    site_info = snapshots.site_info()
     
     if not site_info:
         return ''
@@ -386,13 +419,12 @@ def website_schema(context):
     return mark_safe(f'<script type="application/ld+json">{json.dumps(schema, ensure_ascii=False, indent=2)}</script>')
 
 
-@register.simple_tag(takes_context=True)
 def newspaper_schema(context):
     """
     Generate comprehensive Newspaper structured data (JSON-LD) - should be on all pages
     """
     request = context.get('request')
-    site_info = SiteInfo.objects.first()
+    site_info = snapshots.site_info()
     
     if not site_info:
         return ''
@@ -411,11 +443,11 @@ def newspaper_schema(context):
     # Build hasPart array dynamically from sections and subsections
     has_part = []
     
-    # Get all active sections and subsections
-    from home.models import NavbarItem, SubSection
+    # Active sections and subsections from the navigation snapshot
+    navigation = snapshots.navigation()
     
     # Add sections
-    for section in NavbarItem.objects.filter(is_active=True).order_by('position'):
+    for section in navigation['navbar_items']:
         if section.english_title:  # Only add sections with slugs
             section_url = request.build_absolute_uri(section.get_absolute_url()) if request else section.get_absolute_url()
             has_part.append({
@@ -425,7 +457,7 @@ def newspaper_schema(context):
             })
     
     # Add subsections
-    for subsection in SubSection.objects.filter(is_active=True).select_related('section').order_by('position'):
+    for subsection in navigation['subsections']:
         if subsection.english_title and subsection.section and subsection.section.english_title:
             subsection_url = request.build_absolute_uri(subsection.get_absolute_url()) if request else subsection.get_absolute_url()
             has_part.append({
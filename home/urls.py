@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import fragment_views, views
 from django.views.generic import TemplateView # <-- ADD THIS LINE
 
 urlpatterns = [
@@ -18,6 +18,12 @@ urlpatterns = [
     path('ajax/get-subsections/', views.get_subsections, name='get_subsections'),
     path('news/detail/<int:news_id>/', views.news_detail_redirect, name='news_detail_old'),
     path('news/react/<int:news_id>/', views.react_to_news, name='react_to_news'),
+    # Parts of the article page loaded by its script (the article itself is cacheable)
+    path('news/<int:news_id>/reactions/', fragment_views.news_reactions, name='news_reactions'),
+    path('news/<int:news_id>/reviews/', fragment_views.news_reviews, name='news_reviews'),
+    path('news/<int:news_id>/review-form/', fragment_views.news_review_form, name='news_review_form'),
+    path('news/<int:news_id>/review/', fragment_views.post_review, name='post_review'),
+    path('news/<int:news_id>/view/', fragment_views.news_view, name='news_view'),
     path('news/', views.news_page, name='news_page'),  # Old format for backward compatibility
     # path('default-pages/<str:link>/', views.default_page_detail, name='default_page_detail'),
     # path('<slug:slug>/', views.default_page_detail, name='default_page_detail'),
@@ -31,6 +37,9 @@ urlpatterns = [
     path('admin/dashboard/image-stats/', views.dashboard_image_stats, name='dashboard_image_stats'),
     path('admin/dashboard/reporter-stats/', views.dashboard_reporter_stats, name='dashboard_reporter_stats'),
     path('admin/dashboard/content-stats/', views.dashboard_content_stats, name='dashboard_content_stats'),
+    path('admin/request-stats/', views.request_stats_report, name='request_stats_report'),
+    path('admin/profiles/', views.profile_list, name='profile_list'),
+    path('admin/profiles/<str:name>', views.profile_download, name='profile_download'),
     # News detail with subsection (must be before other patterns to match integers)
     path('<str:section_slug>/<str:subsection_slug>/<int:news_id>/', views.news_detail_with_subsection, name='news_detail_subsection'),
     # News detail with section only (must be before subsection pattern to match integers)
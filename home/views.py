@@ -1,38 +1,42 @@
 from django.shortcuts import redirect, render
 
-from home.forms import ReviewForm
 from home.models import *
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.shortcuts import render, get_object_or_404
 from django.utils.timezone import now
 from django.utils.timesince import timesince
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_safe
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Count, Q
 from django.utils import timezone
-import io
-import base64
 from home.templatetags.bangla_filters import convert_to_bangla_number
-# from rembg import remove
-from PIL import Image, ImageEnhance, ImageFilter
+from home import conditional, metrics, photo_frame, profiling, purge, request_stats
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 import random
 from datetime import date, datetime, timedelta
 from calendar import monthrange
+import hmac
 import json
+import logging
 import os
+import sys
 import uuid
 from calendar import monthrange
 
+logger = logging.getLogger(__name__)
+
 # Create your views here.
 
 def custom_404_view(request, exception):
     return render(request, '404.html', status=404)
 
 
+@conditional.conditional(conditional.robots_txt_inputs)
 def robots_txt_view(request):
     """
     Serve robots.txt file from database
@@ -46,7 +50,28 @@ def robots_txt_view(request):
     return response
 
 
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint (home.metrics), for staff users or a scraper
+    sending `Authorization: Bearer <METRICS_TOKEN>`
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.headers.get('Authorization', '')
+    authorized = request.user.is_staff or bool(
+        token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+    )
+    if not authorized:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+
+    response = HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    response['X-Robots-Tag'] = 'noindex'
+    return response
+
+
+@purge.proxy_max_age('HOME_PROXY_MAX_AGE', 120)
 def home(request):
+    purge.add_keys(purge.HOME_KEY)
     navbar = NavbarItem.objects.filter(is_active=True)
 
     banners = BannerImage.objects.filter(is_active=True).select_related('section')
@@ -199,6 +224,8 @@ def get_subsections(request):
 
 
 
+@purge.proxy_max_age('LISTING_PROXY_MAX_AGE', 300)
+@conditional.conditional(conditional.news_listing_inputs)
 def news_page_by_slug(request, section_slug, subsection_slug=None):
     """
     Handle slug-based URLs for sections and subsections
@@ -263,8 +290,10 @@ def news_page_by_slug(request, section_slug, subsection_slug=None):
             return redirect(f'/news/?section={selected_section.id}&sub_section={selected_subsection.id}')
         
         news_list = News.published.filter(section=selected_section, sub_section=selected_subsection)
+        purge.add_keys(purge.subsection_key(selected_subsection.id))
     else:
         news_list = News.published.filter(section=selected_section)
+        purge.add_keys(purge.section_key(selected_section.id))
     
     # Filter by tag if provided
     if tag_slug:
@@ -352,6 +381,7 @@ def news_page_by_slug(request, section_slug, subsection_slug=None):
     return render(request, 'pages/news.html', context)
 
 
+@purge.proxy_max_age('LISTING_PROXY_MAX_AGE', 300)
 def topic_news_page(request, tag_name):
     """
     Handle news page filtered by topic (tag)
@@ -378,6 +408,7 @@ def topic_news_page(request, tag_name):
         
     # Get all news for this tag
     news_list = News.published.filter(tags=selected_tag).order_by('-created_at')
+    purge.add_keys(purge.tag_key(selected_tag.id))
     
     paginator = Paginator(news_list, 20)
     
@@ -657,6 +688,7 @@ def get_relevant_news(current_news, limit=8):
 
 def news_detail_redirect(request, news_id):
     """Redirect old news detail URLs to new format with section slug"""
+    purge.add_keys(purge.news_key(news_id))
     try:
         news = News.objects.get(id=news_id)
         if news.section and news.section.english_title:
@@ -675,6 +707,7 @@ def news_detail_redirect(request, news_id):
         raise Http404("News not found")
 
 
+@conditional.conditional(conditional.news_detail_inputs)
 def _news_detail_handler(request, section_slug, news_id, subsection_slug=None):
     """Internal handler for news detail views"""
     # Allow viewing scheduled news in detail (for preview), but check if published
@@ -723,9 +756,9 @@ def _news_detail_handler(request, section_slug, news_id, subsection_slug=None):
         return redirect('news_detail_subsection', section_slug=news.section.english_title, 
                      subsection_slug=news.sub_section.english_title, news_id=news_id)
 
-    news_view, created = NewsView.objects.get_or_create(news=news)
-    news_view.count += 1
-    news_view.save()
+    # Reads are counted by the page (fragment_views.news_view): 304s and
+    # proxy hits never get here
+    purge.add_keys(*purge.news_keys(news))
 
     navbar = NavbarItem.objects.all()
     
@@ -743,39 +776,8 @@ def _news_detail_handler(request, section_slug, news_id, subsection_slug=None):
     most_read_news = [News.published.get(id=news_id) for news_id in most_read_news_ids if News.published.filter(id=news_id).exists()]
 
 
-    reaction_counts = NewsReaction.objects.filter(news=news)\
-        .values('reaction')\
-        .annotate(count=Count('reaction'))
-
-    # Convert to dict: {'love': 10, 'clap': 5, ...}
-    counts = {r['reaction']: r['count'] for r in reaction_counts}
-    total = sum(counts.values())
-
-
-    reviews = news.reviews.select_related('user').order_by('-created_at')
-    form = ReviewForm()
-
-    if request.method == 'POST':
-        if request.user.is_authenticated:
-            form = ReviewForm(request.POST)
-            if form.is_valid():
-                review = form.save(commit=False)
-                review.news = news
-                review.user = request.user
-                review.save()
-                # Get english_title for redirect
-                if news.section and news.section.english_title:
-                    if news.sub_section and news.sub_section.english_title:
-                        return redirect('news_detail_subsection', section_slug=news.section.english_title, 
-                                     subsection_slug=news.sub_section.english_title, news_id=news.pk)
-                    else:
-                        return redirect('news_detail', section_slug=news.section.english_title, news_id=news.pk)
-                else:
-                    # Fallback to old format if no section or english_title
-                    return redirect('news_detail', section_slug='news', news_id=news.pk)
-        else:
-            form.add_error(None, "মন্তব্য করতে হলে আপনাকে লগইন করতে হবে।")
-
+    # Reactions and reviews are loaded by the page (home.fragment_views), so
+    # the article is the same for every anonymous reader
     context = {
         'news': news,
         'navbar': navbar,
@@ -783,18 +785,18 @@ def _news_detail_handler(request, section_slug, news_id, subsection_slug=None):
         'main_news': main_news,
         'elected_news': elected_news,
         'most_read_news': most_read_news,
-        'reaction_counts': counts,
-        'reaction_total': total,
-        'reviews': reviews,
-        'form': form,
     }
     return render(request, 'pages/news_detail.html', context)
 
+@require_safe
+@purge.proxy_max_age('ARTICLE_PROXY_MAX_AGE', 300)
 def news_detail(request, section_slug, news_id):
     """News detail view for section-only URLs"""
     return _news_detail_handler(request, section_slug, news_id, subsection_slug=None)
 
 
+@require_safe
+@purge.proxy_max_age('ARTICLE_PROXY_MAX_AGE', 300)
 def news_detail_with_subsection(request, section_slug, subsection_slug, news_id):
     """News detail view for URLs with subsection"""
     return _news_detail_handler(request, section_slug, news_id, subsection_slug=subsection_slug)
@@ -830,91 +832,41 @@ def default_page_detail(request, slug):
 
 def generate_photo(request):
     if request.method == 'POST':
-        try:
-            
-            from rembg import remove
-            
-            uploaded_image = request.FILES.get('image')
-
-            uploaded = Image.open(uploaded_image)
-
-            # uploaded_no_bg = remove(uploaded) 
-
-            uploaded_bw = uploaded_no_bg.convert('LA').convert('RGBA')
-
-            background = Image.new('RGB', (1000, 1000), 'white')
-
-            width_ratio = 1000 / uploaded_bw.width
-            height_ratio = 1000 / uploaded_bw.height
-            scale_ratio = max(width_ratio, height_ratio)
-
-            new_width = int(uploaded_bw.width * scale_ratio)
-            new_height = int(uploaded_bw.height * scale_ratio)
-
-            uploaded_bw = uploaded_bw.resize((new_width, new_height), Image.LANCZOS)
+        uploaded_image = request.FILES.get('image')
+        if not uploaded_image:
+            return JsonResponse({'status': 'error', 'message': 'No image uploaded'}, status=400)
+        if uploaded_image.size > getattr(settings, 'PHOTO_FRAME_MAX_UPLOAD', 15 * 1024 * 1024):
+            return JsonResponse({'status': 'error', 'message': 'Image is too large'}, status=400)
 
-            transparent_layer = Image.new('RGBA', (new_width, new_height), (255, 255, 255, 120))  # 100 = more transparent
-            uploaded_bw = Image.alpha_composite(uploaded_bw, transparent_layer)
+        output_format = request.POST.get('format', 'webp')
+        if output_format not in photo_frame.OUTPUT_FORMATS:
+            output_format = 'webp'
 
-            upload_position = (
-                (1000 - new_width) // 2,
-                (1000 - new_height) // 2
-            )
-
-            temp_layer = Image.new('RGBA', (1000, 1000), (0, 0, 0, 0))
-
-            temp_layer.paste(uploaded_bw, upload_position, uploaded_bw)
-
-            background.paste(temp_layer, (0, 0), temp_layer)
-
-            logo = Image.open('static/image/fav-logo1.png')
-
-            if logo.mode != 'RGBA':
-                logo = logo.convert('RGBA')
-
-            logo = logo.resize((1000, 1000), Image.LANCZOS)
-
-            logo_data = list(logo.getdata())
-            new_logo_data = []
-
-            TARGET_RED = (130, 0, 0)
-
-            for r, g, b, a in logo_data:
-                if a > 0:
-                    if r > g and r > b:
-                        new_logo_data.append((max(0, r - 40), 0, 0, int(a * 0.6)))
-                    else:
-                        new_logo_data.append((r, g, b, int(a * 0.6)))
-                else:
-                    new_logo_data.append((r, g, b, a))
-
-            logo.putdata(new_logo_data)
-
-            combined = Image.new('RGB', (1000, 1000), 'white')
-            combined.paste(background, (0, 0))
-            combined.paste(logo, (0, 0), logo)
-
-            enhancer = ImageEnhance.Contrast(combined)
-            combined = enhancer.enhance(1.5)
-            
-            # 🆕 Step: Apply a Sharpen filter
-            combined = combined.filter(ImageFilter.SHARPEN)
-
-            buffer = io.BytesIO()
-            # combined.save(buffer, format='PNG', quality=95)
-            combined.save(buffer, format='PNG', quality=95, optimize=True)
-            image_str = base64.b64encode(buffer.getvalue()).decode()
-
-            return JsonResponse({
-                'status': 'success',
-                'image': f'data:image/png;base64,{image_str}'
-            })
+        try:
+            # Compositing runs in the photo frame process pool, not on this thread
+            image_data, content_type = photo_frame.generate(uploaded_image.read(), output_format)
+        except photo_frame.PhotoFrameBusy:
+            response = JsonResponse({'status': 'error', 'message': 'Too many requests, please try again in a few seconds'}, status=429)
+            response['Retry-After'] = '5'
+            return response
+        except photo_frame.InvalidImage:
+            return JsonResponse({'status': 'error', 'message': 'Could not read the image, please upload a photo'}, status=400)
+        except FuturesTimeoutError:
+            return JsonResponse({'status': 'error', 'message': 'Processing took too long, please try again'}, status=503)
+        except photo_frame.PhotoFrameUnavailable:
+            logger.exception('Photo frame pool unavailable')
+            response = JsonResponse({'status': 'error', 'message': 'The photo service is restarting, please try again'}, status=503)
+            response['Retry-After'] = '5'
+            return response
+        except Exception:
+            logger.exception('Photo frame generation failed')
+            return JsonResponse({'status': 'error', 'message': 'Could not generate the photo, please try again later'}, status=500)
 
-        except Exception as e:
-            return JsonResponse({
-                'status': 'error',
-                'message': str(e)
-            })
+        # Binary image instead of base64 inside JSON
+        response = HttpResponse(image_data, content_type=content_type)
+        response['Content-Disposition'] = f'inline; filename="jagoron_photo.{output_format}"'
+        response['Cache-Control'] = 'no-store'
+        return response
 
     return render(request, 'pages/generate_photo.html')
 
@@ -992,6 +944,38 @@ def admin_dashboard(request):
     """Admin dashboard view with charts"""
     return render(request, 'admin/dashboard.html')
 
+@staff_member_required
+def request_stats_report(request):
+    """Per-view query count and timing report, merged across the workers"""
+    records = request_stats.collect_records()
+    slowest, most_queries = request_stats.top_offenders(records)
+    # Only report the connection pools when the pooled backend is in use
+    pool_module = sys.modules.get('core.db_pool.pool')
+    return render(request, 'admin/request_stats.html', {
+        'rows': request_stats.summarize(records),
+        'slowest': slowest,
+        'most_queries': most_queries,
+        'record_count': len(records),
+        'pool_stats': pool_module.all_stats() if pool_module else [],
+    })
+
+@staff_member_required
+def profile_list(request):
+    """Request profiles saved by ProfilingMiddleware"""
+    return render(request, 'admin/profiles.html', {
+        'profiles': profiling.list_profiles(),
+        'profiler_enabled': getattr(settings, 'PROFILER_ENABLED', False),
+    })
+
+@staff_member_required
+def profile_download(request, name):
+    """Download one saved profile"""
+    path = profiling.get_profile_path(name)
+    if path is None:
+        raise Http404("Profile not found")
+    content_type = 'text/plain; charset=utf-8' if name.endswith('.collapsed') else 'application/octet-stream'
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name, content_type=content_type)
+
 @staff_member_required
 def dashboard_image_stats(request):
     """API endpoint for image upload statistics by month"""
@@ -1424,7 +1408,9 @@ def election_scoreboard_page(request):
     return render(request, "pages/election_scoreboard.html")
 
 
+@conditional.conditional(conditional.scoreboard_inputs, anonymous_only=False)
 def election_scoreboard_api(request):
+    purge.add_keys(purge.SCOREBOARD_KEY)
     obj = ElectionLiveScore.objects.order_by("-updated_at").first()
 
     if not obj:
@@ -0,0 +1,70 @@
+"""
+Small JSON state files shared between the worker processes
+
+Every worker writes its own `<dir>/<name>/<pid>.json` (atomically, with
+os.replace) and any worker can read all of them, so a staff page served by
+one worker can show numbers collected by the others without a shared cache.
+Files that were not refreshed for `max_age` seconds belong to workers that
+exited and are removed when collected.
+
+Settings:
+    WORKER_STATE_DIR   directory for the files (default: <tmp>/jagoron-worker-state)
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def state_dir(name):
+    base = getattr(settings, 'WORKER_STATE_DIR', os.path.join(tempfile.gettempdir(), 'jagoron-worker-state'))
+    return os.path.join(base, name)
+
+
+def publish(name, data):
+    """Replace this process's file for `name` with `data`"""
+    directory = state_dir(name)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    tmp_path = f'{path}.tmp'
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not publish worker state {name}: {e}")
+
+
+def collect(name, max_age=3600, include_self=True):
+    """{pid: data} for every worker that published `name` in the last `max_age` seconds"""
+    directory = state_dir(name)
+    try:
+        filenames = os.listdir(directory)
+    except FileNotFoundError:
+        return {}
+
+    now = time.time()
+    own_pid = os.getpid()
+    states = {}
+    for filename in filenames:
+        pid, ext = os.path.splitext(filename)
+        if ext != '.json' or not pid.isdigit():
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                os.remove(path)
+                continue
+            if int(pid) == own_pid and not include_self:
+                continue
+            with open(path, encoding='utf-8') as f:
+                states[int(pid)] = json.load(f)
+        except (OSError, ValueError):
+            # Removed or being replaced by its worker right now
+            continue
+    return states
@@ -11,4 +11,8 @@ import sys
 #     version = 'Python %s\n' % sys.version.split()[0]
 #     response = '\n'.join([message, version])
 #     return [response.encode()]
-from core.wsgi import application
\ No newline at end of file
+from core.wsgi import application
+
+# No pre-fork warm-up here: Passenger only preloads Ruby apps, every Python
+# worker imports this file itself, so it would only delay each worker's first
+# request (core.warmup; DJANGO_WARMUP=1 still turns it on through core.wsgi)
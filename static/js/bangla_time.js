@@ -0,0 +1,146 @@
+/*
+ * Bangla dates and relative times rendered in the browser.
+ *
+ * Pages stay cacheable because the server only writes machine-readable
+ * timestamps; the text inside the <time> element (bangla_date /
+ * bangla_timesince) is the fallback for readers without JavaScript:
+ *
+ *   <time datetime="2026-01-05T09:30:00+06:00" data-bangla-time="relative">৫ জানুয়ারি ২০২৬</time>
+ *
+ * data-bangla-time modes:
+ *   relative  "৫ মিনিট আগে" for the last 24 hours, the date after that
+ *   date      "৫ জানুয়ারি ২০২৬"
+ *   datetime  "৫ জানুয়ারি ২০২৬ · ৯:৩০ সকাল"
+ *   today     today's date, "৫ জানুয়ারি, ২০২৬" (the header)
+ *
+ * Times are shown in Asia/Dhaka like the server renders them; relative
+ * times are refreshed every minute.
+ */
+(function () {
+    'use strict';
+
+    var TIME_ZONE = 'Asia/Dhaka';
+    var DIGITS = '০১২৩৪৫৬৭৮৯';
+    var MONTHS = [
+        'জানুয়ারি', 'ফেব্রুয়ারি', 'মার্চ', 'এপ্রিল', 'মে', 'জুন',
+        'জুলাই', 'আগস্ট', 'সেপ্টেম্বর', 'অক্টোবর', 'নভেম্বর', 'ডিসেম্বর'
+    ];
+    // Largest unit first, as django's timesince
+    var UNITS = [
+        [365 * 24 * 60 * 60, 'বছর'],
+        [30 * 24 * 60 * 60, 'মাস'],
+        [7 * 24 * 60 * 60, 'সপ্তাহ'],
+        [24 * 60 * 60, 'দিন'],
+        [60 * 60, 'ঘণ্টা'],
+        [60, 'মিনিট']
+    ];
+    var RELATIVE_LIMIT = 24 * 60 * 60;
+
+    var partsFormat = null;
+    try {
+        partsFormat = new Intl.DateTimeFormat('en-US', {
+            timeZone: TIME_ZONE, year: 'numeric', month: 'numeric', day: 'numeric',
+            hour: 'numeric', minute: 'numeric', hourCycle: 'h23'
+        });
+    } catch (e) {
+        // Very old browsers: the local time zone
+    }
+
+    function toBanglaDigits(value) {
+        return String(value).replace(/\d/g, function (d) { return DIGITS[d]; });
+    }
+
+    function dhakaParts(date) {
+        if (!partsFormat) {
+            return {
+                year: date.getFullYear(), month: date.getMonth() + 1, day: date.getDate(),
+                hour: date.getHours(), minute: date.getMinutes()
+            };
+        }
+        var parts = {};
+        partsFormat.formatToParts(date).forEach(function (part) {
+            if (part.type !== 'literal') {
+                parts[part.type] = parseInt(part.value, 10);
+            }
+        });
+        return parts;
+    }
+
+    function period(hour) {
+        if (hour >= 5 && hour < 12) return 'সকাল';
+        if (hour >= 12 && hour < 15) return 'দুপুর';
+        if (hour >= 15 && hour < 18) return 'বিকাল';
+        return 'রাত';
+    }
+
+    function formatDate(date, separator) {
+        var p = dhakaParts(date);
+        return toBanglaDigits(p.day) + ' ' + MONTHS[p.month - 1] + (separator || ' ') + toBanglaDigits(p.year);
+    }
+
+    function formatTime(date) {
+        var p = dhakaParts(date);
+        var minute = p.minute < 10 ? '0' + p.minute : String(p.minute);
+        return toBanglaDigits((p.hour % 12 || 12) + ':' + minute) + ' ' + period(p.hour);
+    }
+
+    function formatRelative(date, now) {
+        var seconds = Math.floor((now - date) / 1000);
+        if (seconds >= RELATIVE_LIMIT || seconds < 0) {
+            return formatDate(date);
+        }
+        for (var i = 0; i < UNITS.length; i++) {
+            var count = Math.floor(seconds / UNITS[i][0]);
+            if (count > 0) {
+                return toBanglaDigits(count) + ' ' + UNITS[i][1] + ' আগে';
+            }
+        }
+        return 'এইমাত্র';
+    }
+
+    function render(el, now) {
+        var mode = el.getAttribute('data-bangla-time');
+        if (mode === 'today') {
+            el.textContent = formatDate(now, ', ');
+            return;
+        }
+        // Django writes microseconds; some browsers only parse milliseconds
+        var date = new Date((el.getAttribute('datetime') || '').replace(/(\.\d{3})\d+/, '$1'));
+        if (isNaN(date.getTime())) {
+            return;
+        }
+        if (mode === 'relative') {
+            el.textContent = formatRelative(date, now);
+            if (!el.title) {
+                el.title = formatDate(date) + ' · ' + formatTime(date);
+            }
+        } else if (mode === 'datetime') {
+            el.textContent = formatDate(date) + ' · ' + formatTime(date);
+        } else {
+            el.textContent = formatDate(date);
+        }
+    }
+
+    function renderAll(root) {
+        var now = new Date();
+        var elements = (root || document).querySelectorAll('time[data-bangla-time]');
+        for (var i = 0; i < elements.length; i++) {
+            render(elements[i], now);
+        }
+    }
+
+    window.banglaTime = {
+        renderAll: renderAll,
+        toBanglaDigits: toBanglaDigits,
+        formatDate: formatDate,
+        formatTime: formatTime,
+        formatRelative: formatRelative
+    };
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', function () { renderAll(); });
+    } else {
+        renderAll();
+    }
+    setInterval(renderAll, 60 * 1000);
+})();